@@ -1,8 +1,10 @@
+import os
 from flask import Flask, jsonify
 from flask_cors import CORS
 
 from models.db import db  
 from models.tables import User, Mail, Todo  # 앱 컨텍스트 안에서 사용 예정
+from models.schema_migrations import run_schema_migrations
 
 # 모듈 임포트
 from config import Config
@@ -13,6 +15,11 @@ from services.attachment_service import AttachmentService
 from services.todo_service import TodoService
 from services.chatbot_service import ChatbotService
 from services.reply_service import ReplyService
+from services.cleanup_scheduler import MailCleanupScheduler
+from services.attachment_idle_worker import AttachmentIdleWorker
+from services.hierarchical_summarizer import HierarchicalSummarizer
+from services.thread_service import ThreadService
+from services.mail_analysis_service import MailAnalysisService
 
 # 라우트 임포트
 from routes.auth_routes import create_auth_routes
@@ -24,8 +31,11 @@ from routes.settings_routes import create_settings_routes
 from routes.signature_routes import create_signature_routes
 from routes.mail_management_routes import create_mail_management_routes
 
-def create_app():
-    """Flask 애플리케이션 팩토리"""
+def create_app(start_background_workers=True):
+    """
+    Flask 애플리케이션 팩토리
+    start_background_workers: 자동 삭제 스케줄러/유휴 분석 워커 시작 여부 (디버그 리로더 감시 프로세스에서는 False)
+    """
     app = Flask(__name__)
     
     # 설정 로드
@@ -46,8 +56,11 @@ def create_app():
     ai_models = AIModels(config)
     session_manager = UserSessionManager(config)
     email_service = EmailService(config, summarizer=ai_models.summarizer)
-    attachment_service = AttachmentService(config, ai_models)
+    summarizer = HierarchicalSummarizer(config)  # 긴 문서/스레드 청크 요약 (메일/첨부파일 공용 캐시)
+    attachment_service = AttachmentService(config, ai_models, summarizer=summarizer)
+    thread_service = ThreadService(config)  # In-Reply-To/References 스레드 인덱스 + 누적 요약
     todo_service = TodoService(config)
+    mail_analyzer = MailAnalysisService(config, todo_service)  # 요약/분류/할일 통합 분석 (mailAnalysisMode=combined)
     chatbot_service = ChatbotService(config, ai_models, email_service)
     reply_service = ReplyService(ai_models)
     
@@ -56,7 +69,9 @@ def create_app():
     auth_routes = create_auth_routes(session_manager, ai_models)
     app.register_blueprint(auth_routes)
     
-    email_routes = create_email_routes(email_service, ai_models, session_manager, attachment_service, todo_service)
+    email_routes = create_email_routes(email_service, ai_models, session_manager, attachment_service, todo_service,
+                                       summarizer=summarizer, thread_service=thread_service,
+                                       mail_analyzer=mail_analyzer)
     app.register_blueprint(email_routes)
     
     todo_routes = create_todo_routes(session_manager, todo_service)
@@ -78,6 +93,20 @@ def create_app():
     mail_mgmt_routes = create_mail_management_routes()
     app.register_blueprint(mail_mgmt_routes)
     
+    # 메일 자동 삭제 스케줄러 (비혼잡 시간대 주기 실행)
+    if config.CLEANUP_SCHEDULER_ENABLED and start_background_workers:
+        cleanup_scheduler = MailCleanupScheduler(app, config)
+        cleanup_scheduler.start()
+        app.extensions['mail_cleanup_scheduler'] = cleanup_scheduler
+    
+    # 분석 보류 첨부파일 유휴 시간 분석 (요청이 들어오면 유휴 타이머 초기화)
+    # 요청을 받지 않는 리로더 감시 프로세스에서는 항상 유휴로 보이므로 시작하지 않음
+    if config.ATTACHMENT_IDLE_WORKER_ENABLED and start_background_workers:
+        attachment_idle_worker = AttachmentIdleWorker(app, attachment_service, config)
+        app.before_request(attachment_idle_worker.touch)
+        attachment_idle_worker.start()
+        app.extensions['attachment_idle_worker'] = attachment_idle_worker
+    
     # 기본 라우트
     @app.route('/', methods=['GET'])
     def health_check():
@@ -127,10 +156,12 @@ if __name__ == '__main__':
     print("🚀 모듈화된 메일 시스템 시작")
     print("=" * 60)
     
-    app = create_app()
+    # debug=True 리로더는 감시 프로세스 + 실제 서버 프로세스(WERKZEUG_RUN_MAIN=true)로 나뉨 → 백그라운드 작업은 서버 프로세스에서만
+    app = create_app(start_background_workers=os.environ.get('WERKZEUG_RUN_MAIN') == 'true')
     
     with app.app_context():
         db.create_all()
+        run_schema_migrations()  # 기존 테이블에 새 컬럼/인덱스 추가 + 기존 메일 첨부파일 요약 채움
 
     # YOLO 모델 미리 로딩 (선택적)
     print("[🔄 YOLO 모델 사전 로딩 시도...]")
@@ -0,0 +1,63 @@
+"""
+이미지 준비 단계 (YOLO/OCR 공용)
+
+첨부파일 바이트를 한 번만 디코딩해 RGB 버퍼를 만들고, 모델별 입력 텐서는 처음 요청될 때 한 번만 생성합니다.
+- 큰 사진은 긴 변 기준 해상도 상한으로 축소 (JPEG는 디코딩 단계에서 축소)
+- 투명 배경은 흰색으로 합성
+- 모델별 텐서는 키 단위로 캐시하므로 YOLO와 OCR이 같은 버퍼를 동시에 사용해도 중복 계산 없음
+"""
+import io
+import numpy as np
+
+# 긴 변 기준 최대 해상도 (YOLO 640, OCR Detector 800 입력 대비 충분한 여유)
+DEFAULT_MAX_IMAGE_SIDE = 4096
+
+
+class PreparedImage:
+    """디코딩된 RGB 이미지 + 모델별 입력 텐서 캐시"""
+
+    def __init__(self, rgb, original_size):
+        self.rgb = rgb                      # (H, W, 3) uint8, 해상도 상한 적용 후
+        self.original_size = original_size  # 원본 (너비, 높이)
+        self._tensors = {}
+
+    @property
+    def size(self):
+        height, width = self.rgb.shape[:2]
+        return width, height
+
+    @property
+    def downscaled(self):
+        return self.size != self.original_size
+
+    def tensor(self, key, build):
+        """모델 입력 텐서 (키별로 처음 요청 시 build(rgb)로 생성, 서로 다른 키는 잠금 없이 동시에 생성 가능)"""
+        tensor = self._tensors.get(key)
+        if tensor is None:
+            tensor = self._tensors.setdefault(key, build(self.rgb))
+        return tensor
+
+
+def prepare_image(image_data, max_side=DEFAULT_MAX_IMAGE_SIDE):
+    """이미지 바이트 → PreparedImage (디코딩 1회)"""
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(image_data))
+    original_size = image.size
+
+    # JPEG는 디코딩 시점에 1/2, 1/4, 1/8 축소 (전체 해상도 디코딩 생략)
+    if max(original_size) > max_side and image.format == 'JPEG':
+        image.draft('RGB', (max_side, max_side))
+
+    # RGBA → RGB 변환
+    if image.mode in ['RGBA', 'LA']:
+        rgb_image = Image.new('RGB', image.size, (255, 255, 255))
+        rgb_image.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
+        image = rgb_image
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.BILINEAR)
+
+    return PreparedImage(np.array(image), original_size)
@@ -0,0 +1,164 @@
+"""
+OCR 실행 여부 사전 판단 (Skip-OCR 게이트)
+
+CRAFT Detector + Recognizer를 돌리기 전에 저비용 지표로 텍스트가 없을 이미지를 걸러냅니다.
+- 크기: 트래킹 픽셀/아이콘 등 너무 작은 이미지
+- 엔트로피: 단색/빈 이미지
+- 에지 밀도: 에지가 거의 없는 이미지, 에지가 적은 사진 (엔트로피 높음 + 에지 밀도 낮음)
+- (선택) 텍스트 유무 소형 분류 모델: 출력 확률이 임계값 미만이면 건너뜀
+임계값은 사용자 설정(MY_EMAIL/ATTACHMENT_OCR)으로 조정하며, 판단 결과와 건너뛴 비율을 기록합니다.
+설정값은 판단 전에 설정 구조(SETTINGS_STRUCTURE)의 min/max로 보정합니다 (숫자가 아니면 기본값).
+"""
+import threading
+
+import numpy as np
+
+from models.settings_structure import SETTINGS_STRUCTURE
+
+# 지표 계산용 축소 크기 (긴 변 기준)
+GATE_ANALYSIS_SIDE = 256
+
+
+def compute_image_metrics(image_np):
+    """축소한 그레이스케일 이미지로 엔트로피/에지 밀도 계산"""
+    import cv2
+
+    gray = cv2.cvtColor(image_np, cv2.COLOR_RGB2GRAY)
+    height, width = gray.shape[:2]
+    scale = GATE_ANALYSIS_SIDE / max(height, width)
+    if scale < 1:
+        gray = cv2.resize(gray, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+
+    # 그레이 히스토그램 엔트로피 (bits)
+    histogram = np.bincount(gray.ravel(), minlength=256)
+    probabilities = histogram[histogram > 0] / gray.size
+    entropy = max(0.0, float(-(probabilities * np.log2(probabilities)).sum()))
+
+    # Canny 에지 픽셀 비율
+    edges = cv2.Canny(gray, 100, 200)
+    edge_density = float(np.count_nonzero(edges)) / edges.size
+
+    return {'entropy': round(entropy, 3), 'edge_density': round(edge_density, 4)}
+
+
+def _gate_fields():
+    """MY_EMAIL/ATTACHMENT_OCR 필드 정의 {필드명: 정의}"""
+    sections = SETTINGS_STRUCTURE['MY_EMAIL']['ATTACHMENT_OCR']['sections']
+    return {name: field for section in sections.values() for name, field in section['fields'].items()}
+
+
+GATE_FIELDS = _gate_fields()
+
+
+def normalize_gate_settings(settings):
+    """
+    사용자 설정 → 비교 가능한 임계값 (숫자는 min/max로 자르고, 변환할 수 없으면 기본값)
+    참/거짓 필드는 bool 또는 'true'/'false' 문자열만 인정
+    """
+    normalized = dict(settings or {})
+    for name, field in GATE_FIELDS.items():
+        value = normalized.get(name, field['default'])
+        if field['type'] == 'number':
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                value = float(field['default'])
+            if value != value:  # NaN
+                value = float(field['default'])
+            value = min(max(value, field['min']), field['max'])
+        elif isinstance(field['default'], bool):
+            if isinstance(value, str):
+                value = {'true': True, 'false': False}.get(value.strip().lower(), field['default'])
+            elif not isinstance(value, bool):
+                value = field['default']
+        normalized[name] = value
+    return normalized
+
+
+class OcrGate:
+    """이미지별 OCR 실행/건너뜀 판단 + 통계"""
+
+    def __init__(self, model_session=None):
+        self.model_session = model_session  # 텍스트 유무 분류 모델 (없으면 지표만 사용)
+        self._lock = threading.Lock()
+        # 모든 사용자 공용 → 파일명 등 파일별 정보 없이 집계만 보관
+        self.stats = {'total': 0, 'skipped': 0, 'reasons': {}}
+
+    def _text_probability(self, image_np):
+        """
+        텍스트 유무 모델 실행 → 텍스트일 확률
+        입력: 모델 입력 크기(1, C, H, W)로 리사이즈한 [0, 1] 이미지 (C=1이면 그레이스케일)
+        출력: 로짓 1개(sigmoid) 또는 [텍스트 없음, 텍스트] 2개(softmax)
+        """
+        import cv2
+
+        input_meta = self.model_session.get_inputs()[0]
+        _, channels, height, width = input_meta.shape
+        resized = cv2.resize(image_np, (width, height), interpolation=cv2.INTER_AREA)
+        if channels == 1:
+            resized = cv2.cvtColor(resized, cv2.COLOR_RGB2GRAY)[:, :, np.newaxis]
+        tensor = np.transpose(resized, (2, 0, 1))[np.newaxis].astype(np.float32) / 255.0
+
+        output = np.asarray(self.model_session.run(None, {input_meta.name: tensor})[0], dtype=np.float32).ravel()
+        if output.size >= 2:
+            exp = np.exp(output[:2] - output[:2].max())
+            return float(exp[1] / exp.sum())
+        return float(1.0 / (1.0 + np.exp(-output[0])))
+
+    def _evaluate(self, prepared, settings):
+        """판단 로직 → (OCR 실행 여부, 사유, 지표)"""
+        original_width, original_height = prepared.original_size
+        metrics = {'width': original_width, 'height': original_height}
+
+        if min(original_width, original_height) < settings['minImageSide'] \
+                or original_width * original_height < settings['minImagePixels']:
+            return False, 'too_small', metrics
+
+        metrics.update(prepared.tensor('ocr_gate_metrics', compute_image_metrics))
+
+        if metrics['entropy'] < settings['minEntropy']:
+            return False, 'low_entropy', metrics
+        if metrics['edge_density'] < settings['minEdgeDensity']:
+            return False, 'low_edge_density', metrics
+        if metrics['entropy'] >= settings['photoEntropy'] and metrics['edge_density'] < settings['photoMaxEdgeDensity']:
+            return False, 'photo_no_text', metrics
+
+        if self.model_session is not None and settings.get('useTextModel'):
+            try:
+                metrics['text_probability'] = round(self._text_probability(prepared.rgb), 4)
+                if metrics['text_probability'] < settings['minTextProbability']:
+                    return False, 'model_no_text', metrics
+            except Exception as e:
+                print(f"[⚠️ OCR 게이트] 텍스트 분류 모델 실행 실패, 지표만 사용: {e}")
+
+        return True, 'text_likely', metrics
+
+    def decide(self, prepared, settings, filename=None):
+        """OCR 실행 여부 판단 후 기록 → {'run_ocr', 'reason', 'metrics', 'thresholds'}"""
+        settings = normalize_gate_settings(settings)
+        if not settings['ocrGateEnabled']:
+            run_ocr, reason, metrics = True, 'gate_disabled', {}
+        else:
+            run_ocr, reason, metrics = self._evaluate(prepared, settings)
+
+        decision = {'run_ocr': run_ocr, 'reason': reason, 'metrics': metrics, 'thresholds': dict(settings)}
+
+        with self._lock:
+            self.stats['total'] += 1
+            if not run_ocr:
+                self.stats['skipped'] += 1
+            self.stats['reasons'][reason] = self.stats['reasons'].get(reason, 0) + 1
+
+        print(f"[🚦 OCR 게이트] {filename}: {'실행' if run_ocr else '건너뜀'} ({reason}) {metrics}")
+        return decision
+
+    def get_stats(self):
+        """판단 통계 (건너뛴 비율 포함)"""
+        with self._lock:
+            total = self.stats['total']
+            return {
+                'total': total,
+                'skipped': self.stats['skipped'],
+                'skip_rate': round(self.stats['skipped'] / total, 4) if total else 0.0,
+                'reasons': dict(self.stats['reasons'])
+            }
@@ -0,0 +1,370 @@
+"""
+EasyOCR ONNX 파이프라인 (NumPy 기반)
+
+메인 프로세스(AIModels)와 상주 OCR 워커(ocr_worker.py)가 함께 사용합니다.
+무거운 패키지(torch/transformers)를 임포트하지 않으므로 QNN venv에서도 단독 실행 가능합니다.
+- Detector: 이미지 크기에 맞춰 해상도 선택, 큰 이미지는 겹침 타일로 나눠 배치 실행 후 경계 박스 병합 → 크롭
+- Recognizer: 모든 크롭을 고정 크기 배치로 묶어 배치당 1회 추론
+- CTC greedy 디코딩 (벡터화)
+"""
+import math
+import numpy as np
+
+# Detector 입력 크기 (높이, 너비) - 고정 입력 모델 기본값
+DETECTOR_INPUT_HEIGHT = 608
+DETECTOR_INPUT_WIDTH = 800
+
+# 적응형 Detector 입력 계획
+DETECTOR_MAX_SIDE = 1600        # 동적 입력 모델의 캔버스 최대 변 길이
+DETECTOR_MAX_UPSCALE = 2.0      # 작은 이미지 최대 확대 배율
+DETECTOR_MIN_TILE_SCALE = 0.5   # 한 장에 넣을 때 이보다 더 줄어들면 타일링 (작은 글자 보존)
+DETECTOR_TILE_OVERLAP = 64      # 타일 간 겹침 (캔버스 픽셀)
+DETECTOR_MAX_TILES = 12         # 이미지당 최대 타일 수
+
+# EasyOCR Recognizer 입력 (고정 크기 1x64x1000) 및 배치 크기 (배치 차원이 동적인 모델에만 적용)
+RECOGNIZER_INPUT_HEIGHT = 64
+RECOGNIZER_INPUT_WIDTH = 1000
+RECOGNIZER_BATCH_SIZE = 16
+
+# easyocr 설정을 읽을 수 없을 때 사용하는 english_g2 문자셋
+EASYOCR_EN_CHARACTERS = "0123456789!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~ €ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+_charset = None
+
+
+def get_charset():
+    """Recognizer 출력 인덱스 → 문자 배열 (0번은 CTC blank)"""
+    global _charset
+    if _charset is None:
+        try:
+            from easyocr.config import recognition_models
+            characters = recognition_models['gen2']['english_g2']['characters']
+        except Exception:
+            characters = EASYOCR_EN_CHARACTERS
+        _charset = np.array(['[blank]'] + list(characters))
+    return _charset
+
+
+def get_detector_input_size(detector_session):
+    """Detector 입력 크기 → (H, W), 높이/너비가 동적인 모델이면 None"""
+    shape = detector_session.get_inputs()[0].shape  # [N, 3, H, W]
+    height, width = shape[2], shape[3]
+    if isinstance(height, int) and isinstance(width, int) and height > 0 and width > 0:
+        return height, width
+    return None
+
+
+def _round_up(value, multiple=32):
+    return int(math.ceil(value / multiple) * multiple)
+
+
+def plan_detector_tiles(image_shape, input_size=(DETECTOR_INPUT_HEIGHT, DETECTOR_INPUT_WIDTH)):
+    """
+    이미지 크기로 Detector 입력 계획 → (캔버스 (H, W), [(x0, y0, x1, y1, 배율), ...])
+    - 작은 이미지: 비율 유지하며 최대 DETECTOR_MAX_UPSCALE배 확대, 한 장
+    - 한 장에 넣어도 DETECTOR_MIN_TILE_SCALE배 이상이면: 비율 유지 축소, 한 장
+    - 그보다 크면: 타일 수가 DETECTOR_MAX_TILES 이하가 되는 가장 큰 배율로 겹침 타일링
+    input_size가 None이면(동적 입력 모델) 이미지 비율에 맞춰 캔버스 크기를 정합니다.
+    """
+    height, width = image_shape[:2]
+
+    if input_size is None:
+        scale = min(DETECTOR_MAX_UPSCALE, DETECTOR_MAX_SIDE / max(height, width))
+        if scale >= DETECTOR_MIN_TILE_SCALE:
+            canvas = (_round_up(height * scale), _round_up(width * scale))
+            return canvas, [(0, 0, width, height, scale)]
+        input_size = (DETECTOR_MAX_SIDE, DETECTOR_MAX_SIDE)
+
+    canvas_height, canvas_width = input_size
+    fit_scale = min(canvas_width / width, canvas_height / height)
+    if fit_scale >= DETECTOR_MIN_TILE_SCALE:
+        return input_size, [(0, 0, width, height, min(fit_scale, DETECTOR_MAX_UPSCALE))]
+
+    # 타일 수 상한 안에서 가장 큰 배율 선택 (원본 해상도부터 0.8배씩 축소)
+    scale = 1.0
+    while scale > fit_scale:
+        columns = max(1, math.ceil((width * scale - DETECTOR_TILE_OVERLAP) / (canvas_width - DETECTOR_TILE_OVERLAP)))
+        rows = max(1, math.ceil((height * scale - DETECTOR_TILE_OVERLAP) / (canvas_height - DETECTOR_TILE_OVERLAP)))
+        if columns * rows <= DETECTOR_MAX_TILES:
+            break
+        scale *= 0.8
+    scale = max(scale, fit_scale)
+
+    # 원본 좌표 기준 타일 크기/간격 (마지막 타일은 이미지 끝에 맞춤)
+    region_width = min(width, canvas_width / scale)
+    region_height = min(height, canvas_height / scale)
+    stride_x = (canvas_width - DETECTOR_TILE_OVERLAP) / scale
+    stride_y = (canvas_height - DETECTOR_TILE_OVERLAP) / scale
+
+    def starts(length, region, stride):
+        positions = [0]
+        while positions[-1] + region < length:
+            positions.append(min(positions[-1] + stride, length - region))
+        return [int(position) for position in positions]
+
+    tiles = [
+        (x0, y0, min(width, int(math.ceil(x0 + region_width))), min(height, int(math.ceil(y0 + region_height))), scale)
+        for y0 in starts(height, region_height, stride_y)
+        for x0 in starts(width, region_width, stride_x)
+    ]
+    return input_size, tiles
+
+
+def prepare_detector_input(image_np, input_size=(DETECTOR_INPUT_HEIGHT, DETECTOR_INPUT_WIDTH)):
+    """
+    Detector 전처리 (계획한 타일별 비율 유지 리사이즈 + 정규화)
+    → {'canvas': (H, W), 'tiles': [...], 'batch': (타일 수, 3, H, W) float32}
+    캔버스 남는 영역은 0(정규화 후 평균색)으로 채웁니다.
+    """
+    import cv2
+    from easyocr.imgproc import normalizeMeanVariance
+
+    canvas, tiles = plan_detector_tiles(image_np.shape, input_size)
+    canvas_height, canvas_width = canvas
+
+    batch = np.zeros((len(tiles), 3, canvas_height, canvas_width), dtype=np.float32)
+    for index, (x0, y0, x1, y1, scale) in enumerate(tiles):
+        region = image_np[y0:y1, x0:x1]
+        resized_width = min(canvas_width, max(1, int(round((x1 - x0) * scale))))
+        resized_height = min(canvas_height, max(1, int(round((y1 - y0) * scale))))
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+        resized = cv2.resize(region, (resized_width, resized_height), interpolation=interpolation)
+        batch[index, :, :resized_height, :resized_width] = np.transpose(normalizeMeanVariance(resized), (2, 0, 1))
+
+    return {'canvas': canvas, 'tiles': tiles, 'batch': batch}
+
+
+def run_session_batched(session, inputs, default_batch_size, input_name="image", prepare=None):
+    """
+    입력 배열을 세션 배치 크기로 나눠 실행 (배치 차원이 고정된 모델은 마지막 배치를 0으로 채움) → 출력[0] 연결
+    prepare가 있으면 inputs는 원본 목록이고, 배치마다 해당 구간만 prepare로 변환해 쌓음 (전체 입력 텐서를 만들지 않음)
+    """
+    batch_dim = session.get_inputs()[0].shape[0]
+    fixed_batch = isinstance(batch_dim, int) and batch_dim > 0
+    batch_size = batch_dim if fixed_batch else default_batch_size
+
+    outputs = []
+    for start in range(0, len(inputs), batch_size):
+        batch = inputs[start:start + batch_size]
+        if prepare is not None:
+            batch = np.stack([prepare(item) for item in batch])
+        valid_count = len(batch)
+        if fixed_batch and valid_count < batch_size:
+            padding = np.zeros((batch_size - valid_count,) + batch.shape[1:], dtype=batch.dtype)
+            batch = np.concatenate([batch, padding])
+        outputs.append(session.run(None, {input_name: batch})[0][:valid_count])
+    return np.concatenate(outputs), batch_size
+
+
+def merge_tile_boxes(boxes, tile_ids):
+    """
+    타일 경계에서 잘리거나 겹침 영역에서 중복 탐지된 박스 병합 (서로 다른 타일의 박스끼리만)
+    - 작은 박스 면적의 30% 이상 겹치면 같은 텍스트
+    - 세로로 절반 이상 겹치면서 가로로 맞닿으면 같은 줄의 잘린 텍스트
+    boxes: [N, 4] (x1, y1, x2, y2) → 병합된 [M, 4]
+    """
+    if len(boxes) <= 1 or len(set(tile_ids)) <= 1:
+        return boxes
+
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    overlap_w = np.minimum(x2[:, None], x2[None, :]) - np.maximum(x1[:, None], x1[None, :])
+    overlap_h = np.minimum(y2[:, None], y2[None, :]) - np.maximum(y1[:, None], y1[None, :])
+    areas = (x2 - x1) * (y2 - y1)
+    heights = y2 - y1
+
+    intersection = np.clip(overlap_w, 0, None) * np.clip(overlap_h, 0, None)
+    duplicated = intersection >= 0.3 * np.minimum(areas[:, None], areas[None, :])
+    same_line = (overlap_h >= 0.5 * np.minimum(heights[:, None], heights[None, :])) & (overlap_w >= 0)
+    tile_ids = np.asarray(tile_ids)
+    connected = (duplicated | same_line) & (tile_ids[:, None] != tile_ids[None, :])
+
+    # 연결된 박스끼리 그룹 (union-find)
+    parent = list(range(len(boxes)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    for i, j in zip(*np.nonzero(np.triu(connected, k=1))):
+        parent[find(i)] = find(j)
+
+    groups = {}
+    for index in range(len(boxes)):
+        groups.setdefault(find(index), []).append(index)
+
+    merged = [
+        [x1[members].min(), y1[members].min(), x2[members].max(), y2[members].max()]
+        for members in groups.values()
+    ]
+    # 원래 읽기 순서(위→아래, 왼→오른쪽) 유지
+    merged.sort(key=lambda box: (box[1], box[0]))
+    return np.array(merged, dtype=np.float32)
+
+
+def detect_text_crops(image_np, detector_session, tag="OCR", detector_input=None):
+    """CRAFT Detector로 텍스트 박스 탐지 (적응형 해상도/타일링) → [(박스 4점, 크롭 이미지), ...]"""
+    from easyocr.craft_utils import getDetBoxes, adjustResultCoordinates
+
+    # 1. Detector 입력 계획 + 전처리 (미리 만든 입력이 모델 입력 크기와 맞으면 재사용)
+    input_size = get_detector_input_size(detector_session)
+    if detector_input is None or (input_size is not None and tuple(detector_input['canvas']) != input_size):
+        detector_input = prepare_detector_input(image_np, input_size)
+    tiles = detector_input['tiles']
+
+    # 2. Detector 실행 (모든 타일을 배치로)
+    results, _ = run_session_batched(detector_session, detector_input['batch'], len(tiles))  # [타일 수, H/2, W/2, 2]
+
+    # 3. Detector 후처리 (타일별 박스 → 원본 좌표)
+    all_boxes = []
+    tile_ids = []
+    for index, (x0, y0, _, _, scale) in enumerate(tiles):
+        score_text = results[index][:, :, 0]
+        score_link = results[index][:, :, 1]
+
+        # 낮은 임계값 사용 (테스트에서 검증됨)
+        boxes, polys, mapper = getDetBoxes(
+            score_text, score_link,
+            text_threshold=0.2, link_threshold=0.15, low_text=0.15, poly=False
+        )
+        if len(boxes) == 0:
+            continue
+
+        boxes = adjustResultCoordinates(boxes, 1 / scale, 1 / scale)
+        for box in boxes:
+            if box is None or len(box) != 4:
+                continue
+            xs = [p[0] + x0 for p in box]
+            ys = [p[1] + y0 for p in box]
+            all_boxes.append([min(xs), min(ys), max(xs), max(ys)])
+            tile_ids.append(index)
+
+    print(f"[🔧 {tag}] 타일 {len(tiles)}개 (배율 {tiles[0][4]:.2f}, 캔버스 {detector_input['canvas']}) → 탐지된 박스: {len(all_boxes)}개")
+
+    if not all_boxes:
+        return []
+
+    merged_boxes = merge_tile_boxes(np.array(all_boxes, dtype=np.float32), tile_ids)
+    if len(merged_boxes) != len(all_boxes):
+        print(f"[🔧 {tag}] 타일 경계 박스 병합: {len(all_boxes)} → {len(merged_boxes)}개")
+
+    orig_h, orig_w = image_np.shape[:2]
+    regions = []
+    for box in merged_boxes:
+        # 박스 좌표 추출 (이미지 범위로 제한)
+        x1, x2 = max(0, int(box[0])), min(orig_w, int(box[2]))
+        y1, y2 = max(0, int(box[1])), min(orig_h, int(box[3]))
+
+        if (x2 - x1) < 5 or (y2 - y1) < 5:
+            continue
+
+        cropped = image_np[y1:y2, x1:x2]
+        if cropped.size == 0:
+            continue
+
+        regions.append(([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], cropped))
+
+    return regions
+
+
+def prepare_recognizer_input(cropped_image):
+    """EasyOCR AlignCollate(keep_ratio_with_pad)와 같은 전처리를 NumPy로 수행 → (H, W) float32"""
+    import cv2
+
+    # 그레이스케일 변환
+    if len(cropped_image.shape) == 3:
+        gray_image = cv2.cvtColor(cropped_image, cv2.COLOR_BGR2GRAY)
+    else:
+        gray_image = cropped_image
+
+    # 높이 64에 맞춰 비율 유지 리사이즈 (최대 너비 1000)
+    h, w = gray_image.shape[:2]
+    resized_w = min(RECOGNIZER_INPUT_WIDTH, int(math.ceil(RECOGNIZER_INPUT_HEIGHT * w / float(h))))
+    resized = cv2.resize(gray_image, (resized_w, RECOGNIZER_INPUT_HEIGHT), interpolation=cv2.INTER_CUBIC)
+
+    # [-1, 1] 정규화 후 오른쪽은 마지막 열로 채움 (NormalizePAD)
+    normalized = (resized.astype(np.float32) / 255.0 - 0.5) / 0.5
+    padded = np.empty((RECOGNIZER_INPUT_HEIGHT, RECOGNIZER_INPUT_WIDTH), dtype=np.float32)
+    padded[:, :resized_w] = normalized
+    if resized_w < RECOGNIZER_INPUT_WIDTH:
+        padded[:, resized_w:] = normalized[:, -1:]
+    return padded
+
+
+def ctc_greedy_decode_batch(logits):
+    """CTC greedy 디코딩 (NumPy 벡터화) → (텍스트 목록, 신뢰도 목록)"""
+    logits = np.asarray(logits, dtype=np.float32)  # [B, T, C]
+
+    # Softmax
+    logits = logits - logits.max(axis=2, keepdims=True)
+    probs = np.exp(logits)
+    probs /= probs.sum(axis=2, keepdims=True)
+
+    indices = probs.argmax(axis=2)  # [B, T]
+    max_probs = np.take_along_axis(probs, indices[..., np.newaxis], axis=2)[..., 0]
+
+    charset = get_charset()
+    indices = np.where(indices < len(charset), indices, 0)
+
+    # blank 제거 + 연속 중복 제거
+    non_blank = indices != 0
+    keep = non_blank.copy()
+    keep[:, 1:] &= indices[:, 1:] != indices[:, :-1]
+
+    chars = charset[indices]
+    texts = [''.join(row[mask]) for row, mask in zip(chars, keep)]
+
+    # 신뢰도 (EasyOCR custom_mean: 비-blank 최대 확률 곱 ** (2 / sqrt(n)))
+    counts = non_blank.sum(axis=1)
+    log_sum = np.where(non_blank, np.log(np.maximum(max_probs, 1e-12)), 0.0).sum(axis=1)
+    confidences = np.where(counts > 0, np.exp(log_sum * 2.0 / np.sqrt(np.maximum(counts, 1))), 0.0)
+
+    return texts, confidences.tolist()
+
+
+def recognize_crops_batched(crops, recognizer_session):
+    """크롭들을 고정 크기(1x64x1000) 배치로 묶어 배치당 1회 추론 → [(텍스트, 신뢰도), ...]"""
+    if not crops:
+        return []
+
+    # 배치 크기가 고정된 모델(NPU 컴파일 등)은 마지막 배치를 채워서 실행
+    # 크롭 전처리는 배치 단위로 → 크롭이 많아도 메모리에는 배치 1개 분량의 입력 텐서만 유지
+    logits, batch_size = run_session_batched(
+        recognizer_session, crops, RECOGNIZER_BATCH_SIZE,
+        prepare=lambda cropped: prepare_recognizer_input(cropped)[np.newaxis]
+    )
+    texts, confidences = ctc_greedy_decode_batch(logits)
+    recognized = list(zip(texts, confidences))
+
+    print(f"[🔥 Recognizer] 크롭 {len(crops)}개 배치 인식 완료 (배치 크기 {batch_size}, 추론 {math.ceil(len(crops) / batch_size)}회)")
+    return recognized
+
+
+def run_ocr_pipeline(images, detector_session, recognizer_session, tag="OCR", detector_inputs=None):
+    """여러 이미지의 박스를 모두 탐지한 뒤 Recognizer는 배치로 한 번에 실행 → 이미지별 [[박스, 텍스트, 신뢰도], ...]"""
+    if detector_inputs is None:
+        detector_inputs = [None] * len(images)
+    regions_per_image = [
+        detect_text_crops(image_np, detector_session, tag, detector_input)
+        for image_np, detector_input in zip(images, detector_inputs)
+    ]
+
+    # 모든 이미지의 크롭을 하나의 목록으로 모아 배치 인식
+    all_crops = [cropped for regions in regions_per_image for _, cropped in regions]
+    recognized = recognize_crops_batched(all_crops, recognizer_session)
+
+    results = []
+    cursor = 0
+    for regions in regions_per_image:
+        text_regions = []
+        for box, _ in regions:
+            recognized_text, confidence = recognized[cursor]
+            cursor += 1
+            if recognized_text:
+                text_regions.append([box, recognized_text, confidence])
+                print(f"[✅ {tag}] '{recognized_text}' (CTC 신뢰도 {confidence:.3f})")
+        results.append(text_regions)
+
+    print(f"[✅ {tag}] 이미지 {len(images)}장, 크롭 {len(all_crops)}개 → {sum(len(r) for r in results)}개 텍스트 영역 인식됨")
+    return results
@@ -0,0 +1,81 @@
+"""
+상주 OCR 워커 (QNN venv에서 단독 실행)
+
+모델은 시작할 때 한 번만 로드하고, stdin으로 받은 요청을 계속 처리합니다.
+- 요청 (JSON 한 줄): {"id": 1, "images": ["...npy", ...]}  # 메모리 맵 .npy 경로
+- 응답 (JSON 한 줄): {"id": 1, "success": true, "results": [[[박스, 텍스트, 신뢰도], ...], ...]}
+- 종료: {"cmd": "exit"}
+stdout은 응답 전용이며 로그는 stderr로 출력합니다.
+
+실행: python ocr_worker.py --detector <onnx> --recognizer <onnx> [--provider qnn|cpu]
+"""
+import sys
+import json
+import argparse
+
+# 응답 채널 분리 (print 로그는 stderr로)
+_protocol_out = sys.stdout
+sys.stdout = sys.stderr
+
+import numpy as np
+import onnxruntime as ort
+
+from ocr_pipeline import run_ocr_pipeline
+
+
+def _create_session(model_path, provider):
+    if provider == "qnn":
+        so = ort.SessionOptions()
+        so.add_session_config_entry("session.disable_cpu_ep_fallback", "0")
+        return ort.InferenceSession(
+            model_path,
+            sess_options=so,
+            providers=["QNNExecutionProvider"],
+            provider_options=[{
+                "backend_path": "QnnHtp.dll",
+                "htp_performance_mode": "high_performance",
+            }]
+        )
+    return ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+
+
+def _respond(payload):
+    _protocol_out.write(json.dumps(payload, ensure_ascii=False) + "\n")
+    _protocol_out.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--detector", required=True)
+    parser.add_argument("--recognizer", required=True)
+    parser.add_argument("--provider", default="qnn", choices=["qnn", "cpu"])
+    args = parser.parse_args()
+
+    detector_session = _create_session(args.detector, args.provider)
+    recognizer_session = _create_session(args.recognizer, args.provider)
+    print(f"[OCR Worker] 모델 로딩 완료 ({args.provider})")
+    _respond({"ready": True})
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        try:
+            request = json.loads(line)
+            if request.get("cmd") == "exit":
+                break
+
+            request_id = request.get("id")
+            # copy-on-write 메모리 맵: 파일은 수정하지 않고 OpenCV에 쓰기 가능한 배열로 전달
+            images = [np.load(path, mmap_mode="c") for path in request["images"]]
+            results = run_ocr_pipeline(images, detector_session, recognizer_session, "OCR Worker")
+            del images  # 메모리 맵 해제 (호출 측에서 버퍼 파일 삭제 가능하도록)
+            _respond({"id": request_id, "success": True, "results": results})
+        except Exception as e:
+            _respond({"id": request_id, "success": False, "error": str(e)})
+
+
+if __name__ == "__main__":
+    main()
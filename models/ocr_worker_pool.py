@@ -0,0 +1,226 @@
+"""
+상주 OCR 워커 풀
+
+이미지마다 PowerShell/venv/모델 로딩을 반복하지 않도록 ocr_worker.py 프로세스를 N개 띄워 둡니다.
+- 이미지 전달: 메모리 맵 .npy 버퍼 (파이프로는 경로만 전송)
+- 부하 분산: 유휴 워커 큐에서 꺼내 쓰므로 먼저 끝난 워커가 다음 요청을 처리
+- 장애 처리: 응답 없음/프로세스 종료 시 해당 요청은 실패(None) 처리 후 백그라운드에서 워커 재시작
+"""
+import os
+import json
+import uuid
+import queue
+import shutil
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+
+class _OcrWorker:
+    """워커 프로세스 1개 (요청은 한 번에 하나씩)"""
+
+    def __init__(self, index, command, env=None, cwd=None):
+        self.index = index
+        self.command = command
+        self.env = env
+        self.cwd = cwd
+        self.process = None
+        self._lines = None
+        self._next_id = 0
+
+    def start(self):
+        self._lines = queue.Queue()
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=None,  # 워커 로그는 서버 콘솔로 그대로 출력
+            text=True,
+            encoding='utf-8',
+            bufsize=1,
+            env=self.env,
+            cwd=self.cwd
+        )
+        threading.Thread(target=self._read_stdout, args=(self.process, self._lines), daemon=True).start()
+
+    @staticmethod
+    def _read_stdout(process, lines):
+        for line in process.stdout:
+            lines.put(line)
+        lines.put(None)  # 프로세스 종료
+
+    def _read_message(self, timeout):
+        while True:
+            line = self._lines.get(timeout=timeout)
+            if line is None:
+                raise RuntimeError(f"OCR 워커 {self.index} 프로세스 종료 (returncode={self.process.poll()})")
+            line = line.strip()
+            if line.startswith('{'):
+                return json.loads(line)
+
+    def wait_ready(self, timeout):
+        message = self._read_message(timeout)
+        if not message.get('ready'):
+            raise RuntimeError(f"OCR 워커 {self.index} 준비 실패: {message}")
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def request(self, image_paths, timeout):
+        self._next_id += 1
+        request_id = self._next_id
+        self.process.stdin.write(json.dumps({'id': request_id, 'images': image_paths}) + "\n")
+        self.process.stdin.flush()
+
+        while True:
+            message = self._read_message(timeout)
+            if message.get('id') == request_id:
+                return message
+
+    def stop(self):
+        if not self.process:
+            return
+        try:
+            if self.is_alive():
+                self.process.stdin.write(json.dumps({'cmd': 'exit'}) + "\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=5)
+        except Exception:
+            pass
+        if self.is_alive():
+            self.process.kill()
+        self.process = None
+
+
+class OcrWorkerPool:
+    """ocr_worker.py 프로세스 풀"""
+
+    def __init__(self, command, num_workers=2, request_timeout=120, ready_timeout=180,
+                 max_start_failures=3, env=None, cwd=None):
+        self.command = command
+        self.num_workers = max(1, num_workers)
+        self.request_timeout = request_timeout
+        self.ready_timeout = ready_timeout
+        self.max_start_failures = max_start_failures
+        self.env = env
+        self.cwd = cwd
+
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._start_failures = 0
+        self._live_workers = 0
+        self._buffer_dir = Path(tempfile.mkdtemp(prefix='mailpilot_ocr_'))
+        self.stats = {'requests': 0, 'failures': 0, 'restarts': 0}
+
+    @property
+    def available(self):
+        """사용 가능한 워커가 남아 있는지"""
+        return not self._started or self._live_workers > 0
+
+    def _ensure_started(self):
+        """첫 요청 시 워커 N개를 동시에 띄우고 준비될 때까지 대기"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+
+            workers = []
+            for index in range(self.num_workers):
+                worker = _OcrWorker(index, self.command, self.env, self.cwd)
+                try:
+                    worker.start()
+                    workers.append(worker)
+                except Exception as e:
+                    print(f"[❌ OCR Pool] 워커 {index} 시작 실패: {e}")
+
+            for worker in workers:
+                try:
+                    worker.wait_ready(self.ready_timeout)
+                    self._live_workers += 1
+                    self._idle.put(worker)
+                except Exception as e:
+                    print(f"[❌ OCR Pool] 워커 {worker.index} 준비 실패: {e}")
+                    worker.stop()
+
+            print(f"[🚀 OCR Pool] 상주 워커 {self._live_workers}/{self.num_workers}개 준비 완료")
+
+    def _write_buffers(self, images):
+        """이미지를 메모리 맵 .npy 파일로 기록 → 경로 목록"""
+        paths = []
+        for image_np in images:
+            path = self._buffer_dir / f"{uuid.uuid4().hex}.npy"
+            buffer = np.lib.format.open_memmap(path, mode='w+', dtype=image_np.dtype, shape=image_np.shape)
+            buffer[...] = image_np
+            buffer.flush()
+            del buffer
+            paths.append(str(path))
+        return paths
+
+    def _restart_in_background(self, worker):
+        def restart():
+            worker.stop()
+            try:
+                worker.start()
+                worker.wait_ready(self.ready_timeout)
+                self._start_failures = 0
+                self.stats['restarts'] += 1
+                print(f"[🔄 OCR Pool] 워커 {worker.index} 재시작 완료")
+                self._idle.put(worker)
+            except Exception as e:
+                worker.stop()
+                self._start_failures += 1
+                print(f"[❌ OCR Pool] 워커 {worker.index} 재시작 실패 ({self._start_failures}회): {e}")
+                if self._start_failures < self.max_start_failures:
+                    threading.Timer(5, restart).start()
+                else:
+                    self._live_workers -= 1
+                    print(f"[❌ OCR Pool] 워커 {worker.index} 중지 (남은 워커 {self._live_workers}개)")
+
+        threading.Thread(target=restart, daemon=True).start()
+
+    def run(self, images):
+        """이미지 목록 OCR → 이미지별 텍스트 영역 목록 (실패 시 None)"""
+        self._ensure_started()
+        if self._live_workers <= 0:
+            return None
+
+        try:
+            worker = self._idle.get(timeout=self.request_timeout)
+        except queue.Empty:
+            print("[⚠️ OCR Pool] 유휴 워커 대기 시간 초과")
+            return None
+
+        self.stats['requests'] += 1
+        paths = self._write_buffers(images)
+        try:
+            response = worker.request(paths, self.request_timeout)
+            self._idle.put(worker)
+            if response.get('success'):
+                return response['results']
+            print(f"[❌ OCR Pool] 워커 {worker.index} 처리 오류: {response.get('error')}")
+            return None
+        except Exception as e:
+            # 응답 없음/프로세스 종료 → 해당 요청은 실패, 워커는 재시작
+            self.stats['failures'] += 1
+            print(f"[❌ OCR Pool] 워커 {worker.index} 실패, 재시작: {e}")
+            self._restart_in_background(worker)
+            return None
+        finally:
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def shutdown(self):
+        """모든 워커 종료 및 버퍼 정리"""
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+        shutil.rmtree(self._buffer_dir, ignore_errors=True)
@@ -0,0 +1,137 @@
+# models/schema_migrations.py
+"""
+시작 시 스키마 보정 (db.create_all() 다음에 실행)
+
+db.create_all()은 없는 테이블만 만들고 기존 테이블에는 컬럼을 추가하지 않습니다.
+여기서는 모델에 있는데 DB 테이블에 없는 컬럼/인덱스를 ALTER TABLE로 추가하고,
+새 컬럼에 채워야 할 값(메일 첨부파일 요약 등)을 기존 데이터에서 채웁니다.
+- 여러 번 실행해도 안전 (이미 있는 컬럼/인덱스/채워진 행은 건너뜀)
+- 기본 키 컬럼은 추가하지 않음 (테이블 재생성 필요)
+"""
+import json
+from sqlalchemy import func, inspect, text
+from sqlalchemy.schema import CreateColumn
+from models.db import db
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def run_schema_migrations():
+    """누락 컬럼/인덱스 추가 → 데이터 채우기 (앱 컨텍스트 안에서 호출)"""
+    added = _add_missing_columns()
+    _add_missing_indexes()
+    backfilled = _backfill_mail_attachment_columns()
+    counted = _backfill_text_chunk_counts()
+    if added or backfilled or counted:
+        print(f"[🛠️ 스키마 보정] 컬럼 {len(added)}개 추가 {added}, 메일 첨부파일 요약 {backfilled}건, 텍스트 청크 수 {counted}건 채움")
+    return added
+
+
+def _add_missing_columns():
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or column.primary_key:
+                continue
+            ddl = CreateColumn(column).compile(dialect=engine.dialect)
+            try:
+                with engine.begin() as connection:
+                    connection.execute(text(f"ALTER TABLE {engine.dialect.identifier_preparer.quote(table.name)} ADD COLUMN {ddl}"))
+                added.append(f"{table.name}.{column.name}")
+            except Exception as e:
+                print(f"[❗스키마 보정] {table.name}.{column.name} 추가 실패: {e}")
+    return added
+
+
+def _add_missing_indexes():
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            try:
+                index.create(bind=engine)
+            except Exception as e:
+                print(f"[❗스키마 보정] 인덱스 {index.name} 생성 실패: {e}")
+
+
+def _backfill_mail_attachment_columns():
+    """
+    mails.has_attachments/attachment_count/attachment_summary가 비어 있는 행을 attachments_data JSON으로 채움
+    (목록 조회는 mail_attachments 행을 읽으므로 파일별 행도 함께 생성)
+    """
+    from models.tables import Mail, MailAttachment, AttachmentTextChunk
+
+    # 첨부파일 JSON이 없는 메일은 한 번에
+    updated = Mail.query.filter(Mail.has_attachments.is_(None), Mail.attachments_data.is_(None)).update(
+        {Mail.has_attachments: False, Mail.attachment_count: 0}, synchronize_session=False
+    )
+    db.session.commit()
+
+    while True:
+        rows = (
+            db.session.query(Mail.user_email, Mail.mail_id, Mail.attachments_data)
+            .filter(Mail.has_attachments.is_(None))
+            .limit(BACKFILL_BATCH_SIZE)
+            .all()
+        )
+        if not rows:
+            break
+        for user_email, mail_id, attachments_data in rows:
+            try:
+                legacy = json.loads(attachments_data) or {}
+            except (TypeError, ValueError):
+                legacy = {}
+            files = legacy.get('files') or []
+            for position, info in enumerate(files):
+                if info.get('content_hash') and info.get('extracted_text') \
+                        and not AttachmentTextChunk.exists(info['content_hash']):
+                    AttachmentTextChunk.replace_text(info['content_hash'], info['extracted_text'])
+                db.session.add(MailAttachment(**MailAttachment.mapping_from_info(user_email, mail_id, position, info)))
+            Mail.query.filter_by(user_email=user_email, mail_id=mail_id).update({
+                Mail.has_attachments: bool(legacy.get('has_attachments', bool(files))),
+                Mail.attachment_count: len(files),
+                Mail.attachment_summary: legacy.get('summary', '')
+            }, synchronize_session=False)
+        db.session.commit()
+        updated += len(rows)
+    return updated
+
+
+def _backfill_text_chunk_counts():
+    """
+    chunk_count가 없는 기존 추출 텍스트에 청크 수 기록
+    청크 번호가 0부터 빠짐없이 이어진 텍스트만 채우고, 중간이 빠진 텍스트는 비워 둠 (다음 저장 때 다시 저장)
+    """
+    from models.tables import AttachmentTextChunk
+
+    rows = (
+        db.session.query(AttachmentTextChunk.content_hash, func.count(), func.max(AttachmentTextChunk.chunk_index))
+        .filter(AttachmentTextChunk.chunk_count.is_(None))
+        .group_by(AttachmentTextChunk.content_hash)
+        .all()
+    )
+    counted = 0
+    for start in range(0, len(rows), BACKFILL_BATCH_SIZE):
+        for content_hash, count, last_index in rows[start:start + BACKFILL_BATCH_SIZE]:
+            if count != last_index + 1:
+                continue
+            AttachmentTextChunk.query.filter_by(content_hash=content_hash).update(
+                {AttachmentTextChunk.chunk_count: count}, synchronize_session=False
+            )
+            counted += 1
+        db.session.commit()
+    return counted
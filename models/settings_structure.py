@@ -22,6 +22,20 @@ SETTINGS_STRUCTURE = {
                             'max': 50
                         }
                     }
+                },
+                'MAIL_ANALYSIS': {
+                    'name': '새 메일 AI 분석',
+                    'fields': {
+                        'mailAnalysisMode': {
+                            'label': '분석 방식',
+                            'type': 'select',
+                            'options': [
+                                {'value': 'separate', 'label': '단계별 (분류/요약/할일 따로)'},
+                                {'value': 'combined', 'label': '통합 (AI 1회로 요약·분류·할일)'}
+                            ],
+                            'default': 'separate'
+                        }
+                    }
                 }
             }
         },
@@ -118,6 +132,197 @@ SETTINGS_STRUCTURE = {
                     }
                 }
             }
+        },
+        'ATTACHMENT_OCR': {
+            'name': '이미지 첨부파일 OCR',
+            'sections': {
+                'OCR_GATE': {
+                    'name': 'OCR 사전 판단 (조건에 걸리면 OCR 건너뜀)',
+                    'fields': {
+                        'ocrGateEnabled': {
+                            'label': 'OCR 사전 판단 사용',
+                            'type': 'select',
+                            'options': [
+                                {'value': True, 'label': '사용'},
+                                {'value': False, 'label': '사용 안 함 (모든 이미지 OCR)'}
+                            ],
+                            'default': True
+                        },
+                        'minImageSide': {
+                            'label': '최소 짧은 변 (px, 미만이면 아이콘/트래킹 픽셀)',
+                            'type': 'number',
+                            'default': 32,
+                            'min': 1,
+                            'max': 1024
+                        },
+                        'minImagePixels': {
+                            'label': '최소 전체 픽셀 수',
+                            'type': 'number',
+                            'default': 16384,
+                            'min': 1,
+                            'max': 4194304
+                        },
+                        'minEntropy': {
+                            'label': '최소 엔트로피 (bits, 미만이면 단색/빈 이미지)',
+                            'type': 'number',
+                            'default': 1.0,
+                            'min': 0,
+                            'max': 8,
+                            'step': 0.1
+                        },
+                        'minEdgeDensity': {
+                            'label': '최소 에지 비율',
+                            'type': 'number',
+                            'default': 0.01,
+                            'min': 0,
+                            'max': 1,
+                            'step': 0.005
+                        },
+                        'photoEntropy': {
+                            'label': '사진 판단 엔트로피 (이상이면서 에지가 적으면 텍스트 없는 사진)',
+                            'type': 'number',
+                            'default': 7.0,
+                            'min': 0,
+                            'max': 8,
+                            'step': 0.1
+                        },
+                        'photoMaxEdgeDensity': {
+                            'label': '사진 판단 최대 에지 비율',
+                            'type': 'number',
+                            'default': 0.05,
+                            'min': 0,
+                            'max': 1,
+                            'step': 0.005
+                        }
+                    }
+                },
+                'TEXT_MODEL': {
+                    'name': '텍스트 유무 분류 모델',
+                    'fields': {
+                        'useTextModel': {
+                            'label': '분류 모델 사용 (모델이 있을 때만)',
+                            'type': 'select',
+                            'options': [
+                                {'value': True, 'label': '사용'},
+                                {'value': False, 'label': '사용 안 함'}
+                            ],
+                            'default': True
+                        },
+                        'minTextProbability': {
+                            'label': '최소 텍스트 확률 (미만이면 건너뜀)',
+                            'type': 'number',
+                            'default': 0.3,
+                            'min': 0,
+                            'max': 1,
+                            'step': 0.05
+                        }
+                    }
+                }
+            }
+        },
+        'ATTACHMENT_ROUTING': {
+            'name': '첨부파일 처리',
+            'sections': {
+                'TYPE_POLICY': {
+                    'name': '종류별 처리 방식',
+                    'fields': {
+                        'imagePolicy': {
+                            'label': '이미지',
+                            'type': 'select',
+                            'options': [
+                                {'value': 'full_ai', 'label': 'AI 분석 전체'},
+                                {'value': 'text_only', 'label': '텍스트만'},
+                                {'value': 'metadata_only', 'label': '파일 정보만'},
+                                {'value': 'skip', 'label': '제외'}
+                            ],
+                            'default': 'full_ai'
+                        },
+                        'pdfPolicy': {
+                            'label': 'PDF',
+                            'type': 'select',
+                            'options': [
+                                {'value': 'full_ai', 'label': 'AI 분석 전체'},
+                                {'value': 'text_only', 'label': '텍스트만'},
+                                {'value': 'metadata_only', 'label': '파일 정보만'},
+                                {'value': 'skip', 'label': '제외'}
+                            ],
+                            'default': 'full_ai'
+                        },
+                        'officePolicy': {
+                            'label': 'Word/PowerPoint/Excel',
+                            'type': 'select',
+                            'options': [
+                                {'value': 'full_ai', 'label': 'AI 분석 전체'},
+                                {'value': 'text_only', 'label': '텍스트만'},
+                                {'value': 'metadata_only', 'label': '파일 정보만'},
+                                {'value': 'skip', 'label': '제외'}
+                            ],
+                            'default': 'full_ai'
+                        },
+                        'otherPolicy': {
+                            'label': '기타 파일',
+                            'type': 'select',
+                            'options': [
+                                {'value': 'metadata_only', 'label': '파일 정보만'},
+                                {'value': 'skip', 'label': '제외'}
+                            ],
+                            'default': 'metadata_only'
+                        }
+                    }
+                },
+                'SIZE_LIMIT': {
+                    'name': '크기 제한',
+                    'fields': {
+                        'imageMaxSizeMB': {
+                            'label': '이미지 최대 크기 (MB)',
+                            'type': 'number',
+                            'default': 20,
+                            'min': 1,
+                            'max': 200
+                        },
+                        'pdfMaxSizeMB': {
+                            'label': 'PDF 최대 크기 (MB)',
+                            'type': 'number',
+                            'default': 50,
+                            'min': 1,
+                            'max': 500
+                        },
+                        'officeMaxSizeMB': {
+                            'label': 'Office 문서 최대 크기 (MB)',
+                            'type': 'number',
+                            'default': 30,
+                            'min': 1,
+                            'max': 500
+                        },
+                        'oversizePolicy': {
+                            'label': '크기 초과 시',
+                            'type': 'select',
+                            'options': [
+                                {'value': 'full_ai', 'label': 'AI 분석 전체'},
+                                {'value': 'text_only', 'label': '텍스트만'},
+                                {'value': 'metadata_only', 'label': '파일 정보만'},
+                                {'value': 'skip', 'label': '제외'}
+                            ],
+                            'default': 'metadata_only'
+                        }
+                    }
+                },
+                'ANALYSIS_TIMING': {
+                    'name': '분석 시점',
+                    'fields': {
+                        'analysisMode': {
+                            'label': '첨부파일 분석 시점',
+                            'type': 'select',
+                            'options': [
+                                {'value': 'eager', 'label': '메일 수신 시 바로'},
+                                {'value': 'lazy', 'label': '처음 열어볼 때 (나머지는 유휴 시간에)'},
+                                {'value': 'idle_only', 'label': '유휴 시간에만'}
+                            ],
+                            'default': 'eager'
+                        }
+                    }
+                }
+            }
         }
     }
 }
@@ -1,7 +1,8 @@
 # models/tables.py
 from models.db import db
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
+import zlib
 
 class User(db.Model):
     __tablename__ = 'user'
@@ -19,9 +20,357 @@ class Mail(db.Model):
     summary = db.Column(db.Text)
     tag = db.Column(db.String(50))
     classification = db.Column(db.Text)
-    attachments_data = db.Column(db.Text)
+    attachments_data = db.deferred(db.Column(db.Text))  # (이전 방식) 첨부파일 전체 JSON - 목록 조회 시 로드하지 않음
     mail_type = db.Column(db.String(10), default='inbox')  # 'inbox' 또는 'sent'
 
+    # 목록 조회용 첨부파일 요약 (수집 시 기록)
+    has_attachments = db.Column(db.Boolean, default=False)
+    attachment_count = db.Column(db.Integer, default=0)
+    attachment_summary = db.Column(db.Text)
+
+    # 파일별 상세 정보는 접근할 때만 로드
+    attachments = db.relationship(
+        'MailAttachment',
+        order_by='MailAttachment.position',
+        cascade='all, delete-orphan',
+        passive_deletes=True
+    )
+
+    def attachment_list_fields(self, files=None):
+        """목록 응답용 첨부파일 필드 (상세 JSON 파싱 없이 컬럼 사용)"""
+        if self.has_attachments is None and self.attachments_data:
+            # 요약 컬럼이 채워지기 전에 저장된 메일
+            try:
+                legacy = json.loads(self.attachments_data)
+                return {
+                    "attachments": [MailAttachment.light_record(info) for info in legacy.get('files', [])],
+                    "has_attachments": legacy.get('has_attachments', False),
+                    "attachment_summary": legacy.get('summary', '')
+                }
+            except (TypeError, ValueError):
+                pass
+
+        return {
+            "attachments": files or [],
+            "has_attachments": bool(self.has_attachments),
+            "attachment_summary": self.attachment_summary or ""
+        }
+
+
+class MailAttachment(db.Model):
+    """메일 첨부파일 (파일당 1행, 처리 결과 전체는 필요할 때만 로드)"""
+    __tablename__ = 'mail_attachments'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_email = db.Column(db.String(100), nullable=False)
+    mail_id = db.Column(db.String(255), nullable=False)
+    position = db.Column(db.Integer, nullable=False, default=0)  # 메일 내 첨부 순서
+    filename = db.Column(db.String(255), nullable=False)
+    type = db.Column(db.String(50))
+    mime_type = db.Column(db.String(100))
+    size = db.Column(db.Integer, default=0)
+    summary = db.Column(db.Text)
+    content_hash = db.Column(db.String(64), index=True)  # 원본 파일 SHA-256 (추출 텍스트 키)
+    text_length = db.Column(db.Integer, default=0)  # 추출 텍스트 전체 길이
+    analysis_pending = db.Column(db.Boolean, default=False, index=True)  # 분석 보류 (조회 시/유휴 시간에 분석)
+    analysis_attempts = db.Column(db.Integer, default=0)  # 일시적 실패로 보류를 유지한 횟수
+    analysis_retry_at = db.Column(db.DateTime)  # 유휴 분석은 이 시각 이후에 다시 시도
+    details = db.deferred(db.Column(db.Text(4294967295)))  # 처리 결과 JSON (추출 텍스트는 AttachmentTextChunk에 저장)
+
+    __table_args__ = (
+        db.ForeignKeyConstraint(
+            ['user_email', 'mail_id'],
+            ['mails.user_email', 'mails.mail_id'],
+            ondelete='CASCADE'
+        ),
+        db.UniqueConstraint('user_email', 'mail_id', 'position', name='unique_mail_attachment_position'),
+        db.Index('idx_mail_attachment_filename', 'user_email', 'mail_id', 'filename'),
+    )
+
+    # 목록 응답에 포함하는 가벼운 필드
+    LIST_FIELDS = ('filename', 'type', 'mime_type', 'size', 'summary')
+    # 같은 원본 파일이라도 행(메일)마다 다른 메타데이터 → 분석 결과 반영 시 유지
+    ROW_METADATA_FIELDS = ('filename', 'mime_type', 'extension')
+
+    @staticmethod
+    def light_record(info):
+        """처리 결과 dict → 목록용 요약 dict"""
+        return {
+            'filename': info.get('filename', ''),
+            'type': info.get('type', 'other'),
+            'mime_type': info.get('mime_type', ''),
+            'size': info.get('size', 0),
+            'summary': info.get('document_summary') or info.get('text_summary') or ''
+        }
+
+    @classmethod
+    def mapping_from_info(cls, user_email, mail_id, position, info):
+        """처리 결과 dict → bulk insert용 행 dict"""
+        content_hash = info.get('content_hash')
+        extracted_text = info.get('extracted_text') or ''
+
+        # 해시가 있으면 추출 텍스트는 별도 압축 저장소에 두고 상세 JSON에서 제외
+        details = dict(info)
+        if content_hash:
+            details.pop('extracted_text', None)
+
+        record = cls.light_record(info)
+        record.update({
+            'user_email': user_email,
+            'mail_id': mail_id,
+            'position': position,
+            'filename': (record['filename'] or f'attachment_{position}')[:255],
+            'content_hash': content_hash,
+            'text_length': len(extracted_text),
+            'analysis_pending': bool(info.get('analysis_pending')),
+            'details': json.dumps(details, ensure_ascii=False, default=str)
+        })
+        return record
+
+    @classmethod
+    def apply_analysis(cls, user_email, content_hash, info):
+        """
+        사용자의 분석 보류 행(같은 원본 해시)에 분석 결과 반영 + 추출 텍스트 저장 → 갱신한 행 수
+        결과는 그 사용자의 라우팅/OCR 설정으로 만든 것이므로 다른 사용자 행은 건드리지 않음 (각자 설정으로 분석/캐시 사용)
+        """
+        rows = cls.query.filter_by(user_email=user_email, content_hash=content_hash, analysis_pending=True).all()
+        for row in rows:
+            current = row.to_dict()
+            merged = dict(info)
+            merged.update({key: current[key] for key in cls.ROW_METADATA_FIELDS if key in current})
+            mapping = cls.mapping_from_info(row.user_email, row.mail_id, row.position, merged)
+            for key in ('type', 'summary', 'text_length', 'analysis_pending', 'details'):
+                setattr(row, key, mapping[key])
+
+        extracted_text = info.get('extracted_text') or ''
+        if extracted_text:
+            AttachmentTextChunk.store_text(content_hash, extracted_text)
+        db.session.commit()
+        return len(rows)
+
+    @classmethod
+    def defer_analysis(cls, user_email, content_hash, retry_base_sec):
+        """
+        일시적 실패 → 사용자의 같은 원본 해시 보류 행은 보류 유지, 시도 횟수 증가 + 다음 시도 시각 (실패마다 간격 2배)
+        → 증가한 시도 횟수
+        """
+        rows = cls.query.filter_by(user_email=user_email, content_hash=content_hash, analysis_pending=True).all()
+        attempts = max((row.analysis_attempts or 0 for row in rows), default=0) + 1
+        retry_at = datetime.utcnow() + timedelta(seconds=retry_base_sec * 2 ** (attempts - 1))
+        for row in rows:
+            row.analysis_attempts = attempts
+            row.analysis_retry_at = retry_at
+        db.session.commit()
+        return attempts
+
+    @classmethod
+    def update_text_length(cls, content_hash, text_length):
+        """같은 원본 파일을 가진 모든 첨부파일 행의 텍스트 길이 갱신"""
+        updated = cls.query.filter_by(content_hash=content_hash).update(
+            {'text_length': text_length}, synchronize_session=False
+        )
+        db.session.commit()
+        return updated
+
+    @classmethod
+    def update_summary(cls, content_hash, summary_key, summary):
+        """같은 원본 파일을 가진 모든 첨부파일 행의 요약 갱신 (목록용 요약 + 상세 JSON)"""
+        rows = cls.query.filter_by(content_hash=content_hash).all()
+        for row in rows:
+            try:
+                details = json.loads(row.details) if row.details else {}
+            except (TypeError, ValueError):
+                details = {}
+            details[summary_key] = summary
+            row.details = json.dumps(details, ensure_ascii=False, default=str)
+            row.summary = summary
+        db.session.commit()
+        return len(rows)
+
+    @classmethod
+    def list_records_by_mail(cls, user_email, mail_ids=None):
+        """메일별 목록용 첨부파일 요약 (상세 컬럼 제외, 쿼리 1회)"""
+        columns = [cls.mail_id] + [getattr(cls, field) for field in cls.LIST_FIELDS]
+        query = db.session.query(*columns).filter(cls.user_email == user_email)
+        if mail_ids is not None:
+            if not mail_ids:
+                return {}
+            query = query.filter(cls.mail_id.in_(mail_ids))
+
+        records = {}
+        for row in query.order_by(cls.mail_id, cls.position):
+            records.setdefault(row[0], []).append(dict(zip(cls.LIST_FIELDS, row[1:])))
+        return records
+
+    def read_text(self, offset=0, limit=None):
+        """추출 텍스트 구간 읽기 (필요한 청크만 압축 해제)"""
+        if self.content_hash:
+            return AttachmentTextChunk.read_range(self.content_hash, offset, limit)
+
+        # 해시 없이 저장된 행은 상세 JSON에 텍스트가 남아 있음
+        text = self.to_dict().get('extracted_text') or ''
+        return text[offset:offset + limit] if limit is not None else text[offset:]
+
+    def to_dict(self, text_preview_chars=0):
+        """처리 결과 반환 (상세 컬럼 로드, 추출 텍스트는 미리보기 길이만큼만)"""
+        try:
+            info = json.loads(self.details) if self.details else {}
+        except (TypeError, ValueError):
+            info = {}
+        info.update({
+            'filename': self.filename,
+            'type': self.type or info.get('type', 'other'),
+            'mime_type': self.mime_type or info.get('mime_type', ''),
+            'size': self.size or info.get('size', 0),
+            'content_hash': self.content_hash,
+            'text_length': self.text_length or 0
+        })
+        if self.content_hash and text_preview_chars:
+            info['extracted_text'] = self.read_text(0, text_preview_chars)
+        return info
+
+
+class AttachmentTextChunk(db.Model):
+    """첨부파일 추출 텍스트 (원본 해시 기준 1회 저장, 고정 길이 청크 + zlib 압축)"""
+    __tablename__ = 'attachment_text_chunks'
+
+    CHUNK_CHARS = 16000  # 청크당 문자 수 (구간 읽기 시 필요한 청크만 해제)
+
+    content_hash = db.Column(db.String(64), primary_key=True)
+    chunk_index = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    data = db.Column(db.LargeBinary(16777215))  # zlib 압축된 UTF-8 텍스트
+    chunk_count = db.Column(db.Integer)  # 텍스트 전체 청크 수 (모든 행에 같은 값, 저장 완료 확인용)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @classmethod
+    def exists(cls, content_hash):
+        """모든 청크가 저장된 텍스트인지 확인 (저장이 중간에 끊겨 일부 청크만 있으면 False)"""
+        stored, expected = db.session.query(
+            db.func.count(cls.chunk_index), db.func.max(cls.chunk_count)
+        ).filter(cls.content_hash == content_hash).one()
+        return bool(stored) and stored == expected
+
+    @classmethod
+    def delete_text(cls, content_hash):
+        """저장된 청크 전체 삭제 (커밋은 호출자)"""
+        cls.query.filter_by(content_hash=content_hash).delete(synchronize_session=False)
+
+    @classmethod
+    def store_text(cls, content_hash, text):
+        """저장된 텍스트가 없거나 불완전하면 새로 저장 (커밋은 호출자) → 저장했으면 True"""
+        if cls.exists(content_hash):
+            return False
+        cls.delete_text(content_hash)
+        db.session.bulk_insert_mappings(cls, cls.build_mappings(content_hash, text))
+        return True
+
+    @classmethod
+    def replace_text(cls, content_hash, text):
+        """저장된 텍스트를 전체 텍스트로 교체 (삭제 + 재삽입을 한 트랜잭션으로)"""
+        cls.delete_text(content_hash)
+        db.session.bulk_insert_mappings(cls, cls.build_mappings(content_hash, text))
+        db.session.commit()
+
+    @classmethod
+    def delete_orphans(cls, content_hashes):
+        """
+        주어진 해시 중 더 이상 어떤 첨부파일 행도 참조하지 않는 텍스트 삭제 (커밋은 호출자) → 삭제한 청크 행 수
+        메일 삭제 후 호출 (첨부파일 행은 메일과 함께 CASCADE 삭제)
+        """
+        content_hashes = {content_hash for content_hash in content_hashes if content_hash}
+        if not content_hashes:
+            return 0
+        referenced = {row[0] for row in db.session.query(MailAttachment.content_hash).filter(
+            MailAttachment.content_hash.in_(content_hashes)
+        ).distinct()}
+        orphans = content_hashes - referenced
+        if not orphans:
+            return 0
+        return cls.query.filter(cls.content_hash.in_(orphans)).delete(synchronize_session=False)
+
+    @classmethod
+    def build_mappings(cls, content_hash, text):
+        """텍스트 → bulk insert용 청크 행 목록"""
+        starts = range(0, len(text), cls.CHUNK_CHARS)
+        return [{
+            'content_hash': content_hash,
+            'chunk_index': index,
+            'chunk_count': len(starts),
+            'data': zlib.compress(text[start:start + cls.CHUNK_CHARS].encode('utf-8'))
+        } for index, start in enumerate(starts)]
+
+    @classmethod
+    def read_range(cls, content_hash, offset=0, limit=None):
+        """[offset, offset+limit) 구간 텍스트 반환"""
+        offset = max(0, int(offset or 0))
+        first_chunk = offset // cls.CHUNK_CHARS
+
+        query = cls.query.filter(cls.content_hash == content_hash, cls.chunk_index >= first_chunk)
+        if limit is not None:
+            last_chunk = (offset + max(0, int(limit)) - 1) // cls.CHUNK_CHARS
+            query = query.filter(cls.chunk_index <= last_chunk)
+
+        text = ''.join(
+            zlib.decompress(chunk.data).decode('utf-8')
+            for chunk in query.order_by(cls.chunk_index)
+        )
+        start = offset - first_chunk * cls.CHUNK_CHARS
+        return text[start:start + limit] if limit is not None else text[start:]
+
+class MailThread(db.Model):
+    """메일 스레드 (In-Reply-To/References 기준, 새 메일만 반영하는 누적 요약)"""
+    __tablename__ = 'mail_threads'
+
+    user_email = db.Column(db.String(100), primary_key=True)
+    thread_id = db.Column(db.String(64), primary_key=True)  # 스레드 첫 메일의 mail_id (Message-ID 해시)
+    subject = db.Column(db.Text)  # Re:/Fwd: 등 접두어를 뗀 제목
+    message_count = db.Column(db.Integer, default=0)
+    last_date = db.Column(db.DateTime)
+    summary = db.Column(db.Text)  # 누적 요약 (새 메일 내용만 더해 갱신)
+    summarized_count = db.Column(db.Integer, default=0)  # 누적 요약에 반영된 메일 수
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'thread_id': self.thread_id,
+            'subject': self.subject or '',
+            'message_count': self.message_count or 0,
+            'last_date': self.last_date.strftime('%Y-%m-%d %H:%M:%S') if self.last_date else None,
+            'summary': self.summary or '',
+            'summarized_count': self.summarized_count or 0
+        }
+
+
+class MailThreadMessage(db.Model):
+    """메일 → 스레드 인덱스 (메일 삭제 시 함께 삭제)"""
+    __tablename__ = 'mail_thread_messages'
+
+    user_email = db.Column(db.String(100), primary_key=True)
+    mail_id = db.Column(db.String(255), primary_key=True)
+    thread_id = db.Column(db.String(64), nullable=False)
+    parent_mail_id = db.Column(db.String(255))  # In-Reply-To 메일 (저장되지 않은 메일일 수 있음)
+
+    __table_args__ = (
+        db.ForeignKeyConstraint(
+            ['user_email', 'mail_id'],
+            ['mails.user_email', 'mails.mail_id'],
+            ondelete='CASCADE'
+        ),
+        db.Index('idx_thread_message_thread', 'user_email', 'thread_id'),
+    )
+
+    @classmethod
+    def thread_ids_for(cls, user_email, mail_ids):
+        """mail_id 목록 → {mail_id: thread_id} (인덱스에 있는 메일만, 쿼리 1회)"""
+        mail_ids = list(mail_ids)
+        if not mail_ids:
+            return {}
+        rows = db.session.query(cls.mail_id, cls.thread_id).filter(
+            cls.user_email == user_email, cls.mail_id.in_(mail_ids)
+        )
+        return {mail_id: thread_id for mail_id, thread_id in rows}
+
+
 class Todo(db.Model):
     __tablename__ = 'todo'
     todo_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -134,7 +483,9 @@ class UserSettings(db.Model):
                 'READ': {
                     # 메일 가져오기 설정
                     'gmailFetchCount': 5,
-                    'itemsPerPage': 10
+                    'itemsPerPage': 10,
+                    # 새 메일 AI 분석 - separate: 단계별(분류/요약/할일) / combined: LLM 1회 통합 분석
+                    'mailAnalysisMode': 'separate'
                 },
                 'WRITE': {
                     # 기본 폰트
@@ -163,6 +514,32 @@ class UserSettings(db.Model):
                         }
                     ],
                     'next_id': 2  # 다음 서명 ID
+                },
+                'ATTACHMENT_OCR': {
+                    # 이미지 첨부파일 OCR 사전 판단 (조건에 걸리면 OCR 건너뜀)
+                    'ocrGateEnabled': True,
+                    'minImageSide': 32,            # 짧은 변(px) 미만: 트래킹 픽셀/아이콘
+                    'minImagePixels': 16384,       # 전체 픽셀 수 미만 (128x128)
+                    'minEntropy': 1.0,             # 그레이 엔트로피(bits) 미만: 단색/빈 이미지
+                    'minEdgeDensity': 0.01,        # 에지 픽셀 비율 미만
+                    'photoEntropy': 7.0,           # 엔트로피 이상이면서
+                    'photoMaxEdgeDensity': 0.05,   # 에지 비율 미만이면 텍스트 없는 사진
+                    'useTextModel': True,          # 텍스트 유무 분류 모델 사용 (모델이 있을 때만)
+                    'minTextProbability': 0.3
+                },
+                'ATTACHMENT_ROUTING': {
+                    # 첨부파일 종류별 처리 정책 (파일 내용으로 종류 판별)
+                    # full_ai: AI 분석 전체 / text_only: 텍스트만 / metadata_only: 파일 정보만 / skip: 제외
+                    'imagePolicy': 'full_ai',
+                    'pdfPolicy': 'full_ai',
+                    'officePolicy': 'full_ai',      # Word/PowerPoint/Excel
+                    'otherPolicy': 'metadata_only',  # 처리기가 없는 종류 (최대 metadata_only)
+                    'imageMaxSizeMB': 20,
+                    'pdfMaxSizeMB': 50,
+                    'officeMaxSizeMB': 30,
+                    'oversizePolicy': 'metadata_only',  # 크기 상한 초과 시 적용 (종류별 정책보다 높아지지 않음)
+                    # 분석 시점 - eager: 메일 수신 시 / lazy: 첫 조회 시 (나머지는 유휴 시간) / idle_only: 유휴 시간에만
+                    'analysisMode': 'eager'
                 }
             }
         }
@@ -213,16 +590,14 @@ class UserSettings(db.Model):
         """카테고리별 서브카테고리 목록"""
         subcategories = {
             'GENERAL': ['READ', 'WRITE', 'THEME'],
-            'MY_EMAIL': ['SIGNATURE_MANAGEMENT']
+            'MY_EMAIL': ['SIGNATURE_MANAGEMENT', 'ATTACHMENT_OCR', 'ATTACHMENT_ROUTING']
         }
         return subcategories.get(category, [])
     
     def update_settings(self, data):
         """설정 업데이트"""
-        if self.settings_data:
-            self.settings_data.update(data)
-        else:
-            self.settings_data = data
+        # JSON 컬럼은 제자리 수정이 감지되지 않으므로 새 dict로 교체
+        self.settings_data = {**(self.settings_data or {}), **data}
         self.updated_at = datetime.utcnow()
         db.session.commit()
         return True
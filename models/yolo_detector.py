@@ -0,0 +1,204 @@
+"""
+YOLO 객체 탐지 서비스
+
+앱 시작 시 로드한 YOLO 세션(NPU → ONNX CPU 순)을 그대로 들고 있으며,
+여러 이미지를 (B, 3, 640, 640) 텐서 하나로 레터박스해 한 번에 추론하고,
+후처리(클래스별 NMS)까지 메인 프로세스에서 NumPy로 처리합니다.
+NPU 세션 실행이 실패하면 해당 세션은 제외하고 다음 세션으로 넘어갑니다.
+"""
+import threading
+import numpy as np
+
+# COCO 클래스 이름 (YOLOv11 기본)
+COCO_CLASS_NAMES = [
+    'person', 'bicycle', 'car', 'motorcycle', 'airplane', 'bus', 'train', 'truck', 'boat',
+    'traffic light', 'fire hydrant', 'stop sign', 'parking meter', 'bench', 'bird', 'cat',
+    'dog', 'horse', 'sheep', 'cow', 'elephant', 'bear', 'zebra', 'giraffe', 'backpack',
+    'umbrella', 'handbag', 'tie', 'suitcase', 'frisbee', 'skis', 'snowboard', 'sports ball',
+    'kite', 'baseball bat', 'baseball glove', 'skateboard', 'surfboard', 'tennis racket',
+    'bottle', 'wine glass', 'cup', 'fork', 'knife', 'spoon', 'bowl', 'banana', 'apple',
+    'sandwich', 'orange', 'broccoli', 'carrot', 'hot dog', 'pizza', 'donut', 'cake',
+    'chair', 'couch', 'potted plant', 'bed', 'dining table', 'toilet', 'tv', 'laptop',
+    'mouse', 'remote', 'keyboard', 'cell phone', 'microwave', 'oven', 'toaster', 'sink',
+    'refrigerator', 'book', 'clock', 'vase', 'scissors', 'teddy bear', 'hair drier', 'toothbrush'
+]
+
+
+def class_aware_nms(boxes, scores, class_ids, iou_threshold=0.45, max_candidates=300):
+    """
+    클래스별 NMS (NumPy 행렬 연산, Cluster-NMS 방식)
+    점수순 IoU 상삼각 행렬에서 '살아남은 박스'가 억제하는 박스를 반복 계산하며,
+    결과는 greedy NMS와 같고 반복마다 파이썬 루프 없이 행렬 연산만 사용합니다.
+    → 유지할 인덱스 (점수 내림차순)
+    """
+    if len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    order = np.argsort(-scores)[:max_candidates]
+    boxes = boxes[order]
+    class_ids = class_ids[order]
+
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    # 쌍별 IoU [N, N]
+    inter_w = np.clip(np.minimum(x2[:, None], x2[None, :]) - np.maximum(x1[:, None], x1[None, :]), 0, None)
+    inter_h = np.clip(np.minimum(y2[:, None], y2[None, :]) - np.maximum(y1[:, None], y1[None, :]), 0, None)
+    intersection = inter_w * inter_h
+    iou = intersection / (areas[:, None] + areas[None, :] - intersection + 1e-6)
+
+    # 점수가 더 높은 박스(i < j)만, 같은 클래스끼리만 억제
+    iou = np.triu(iou, k=1)
+    iou[class_ids[:, None] != class_ids[None, :]] = 0
+
+    keep = np.ones(len(order), dtype=bool)
+    for _ in range(len(order)):
+        new_keep = (iou * keep[:, None]).max(axis=0) <= iou_threshold
+        if np.array_equal(new_keep, keep):
+            break
+        keep = new_keep
+
+    return order[keep]
+
+
+class YoloDetectionService:
+    """상주 YOLO 세션으로 객체 탐지 (요청마다 세션/프로세스를 새로 만들지 않음)"""
+
+    def __init__(self, sessions, input_size=640, conf_threshold=0.5, iou_threshold=0.45, max_candidates=300):
+        # [(이름, 세션), ...] - 앞에 있는 세션 우선
+        self.sessions = [(name, session) for name, session in sessions if session is not None]
+        self.input_size = input_size
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.max_candidates = max_candidates  # NMS에 넣을 최대 후보 수 (IoU 행렬 크기 제한)
+        self._lock = threading.Lock()
+
+        if self.sessions:
+            print(f"[🎯 YOLO 서비스] 사용 세션: {' → '.join(name for name, _ in self.sessions)}")
+
+    @property
+    def available(self):
+        return bool(self.sessions)
+
+    def letterbox(self, image_np):
+        """레터박스 (비율 유지 + 중앙 패딩 114) → ((3, 640, 640) uint8, (scale, pad_x, pad_y))"""
+        import cv2
+
+        original_height, original_width = image_np.shape[:2]
+        scale = min(self.input_size / original_width, self.input_size / original_height)
+        new_width = max(1, int(original_width * scale))
+        new_height = max(1, int(original_height * scale))
+
+        resized = cv2.resize(image_np, (new_width, new_height))
+
+        pad_x = (self.input_size - new_width) // 2
+        pad_y = (self.input_size - new_height) // 2
+
+        # HWC → CHW
+        letterboxed = np.full((3, self.input_size, self.input_size), 114, dtype=np.uint8)
+        letterboxed[:, pad_y:pad_y + new_height, pad_x:pad_x + new_width] = np.transpose(resized, (2, 0, 1))
+        return letterboxed, (scale, pad_x, pad_y)
+
+    def letterbox_batch(self, images, letterboxed=None):
+        """모든 이미지를 (B, 3, 640, 640) uint8 텐서 하나로 (letterboxed: 이미지별로 미리 만든 letterbox 결과)"""
+        if letterboxed is None:
+            letterboxed = [self.letterbox(image_np) for image_np in images]
+
+        batch = np.stack([tensor for tensor, _ in letterboxed])
+        return batch, [info for _, info in letterboxed]
+
+    def _run_session(self, session, batch):
+        """세션 1개로 배치 추론 (배치 차원이 고정된 세션은 크기에 맞춰 나누고 마지막은 채움)"""
+        input_meta = session.get_inputs()[0]
+        batch_dim = input_meta.shape[0]
+
+        if not isinstance(batch_dim, int) or batch_dim <= 0 or batch_dim == len(batch):
+            return session.run(None, {input_meta.name: batch})[0]
+
+        outputs = []
+        for start in range(0, len(batch), batch_dim):
+            chunk = batch[start:start + batch_dim]
+            valid_count = len(chunk)
+            if valid_count < batch_dim:
+                padding = np.full((batch_dim - valid_count,) + chunk.shape[1:], 114, dtype=chunk.dtype)
+                chunk = np.concatenate([chunk, padding])
+            outputs.append(session.run(None, {input_meta.name: chunk})[0][:valid_count])
+        return np.concatenate(outputs)
+
+    def _run(self, batch):
+        """우선순위 순서로 세션 실행 (실패한 세션은 이후 요청에서 제외)"""
+        while self.sessions:
+            name, session = self.sessions[0]
+            try:
+                return self._run_session(session, batch)
+            except Exception as e:
+                print(f"[⚠️ YOLO 서비스] {name} 세션 실행 실패, 다음 세션 사용: {e}")
+                with self._lock:
+                    if self.sessions and self.sessions[0][1] is session:
+                        self.sessions.pop(0)
+        raise RuntimeError("사용 가능한 YOLO 세션 없음")
+
+    def _postprocess(self, predictions, original_shape, scale, pad_x, pad_y):
+        """YOLOv11 출력 (84, 8400) → 탐지 목록"""
+        original_height, original_width = original_shape[:2]
+
+        # 좌표와 신뢰도 분리
+        boxes = predictions[:4]  # x, y, w, h
+        scores = predictions[4:]  # 클래스별 신뢰도
+
+        # 최대 신뢰도와 클래스 ID
+        class_scores = np.max(scores, axis=0)
+        class_ids = np.argmax(scores, axis=0)
+
+        # 신뢰도 임계값 적용
+        valid_indices = class_scores > self.conf_threshold
+        if not np.any(valid_indices):
+            return []
+
+        valid_boxes = boxes[:, valid_indices]
+        valid_scores = class_scores[valid_indices]
+        valid_class_ids = class_ids[valid_indices]
+
+        # 좌표 변환 (중심점, 너비, 높이 -> x1, y1, x2, y2) 후 원본 이미지 좌표로 역변환
+        x1 = np.clip((valid_boxes[0] - valid_boxes[2] / 2 - pad_x) / scale, 0, original_width)
+        y1 = np.clip((valid_boxes[1] - valid_boxes[3] / 2 - pad_y) / scale, 0, original_height)
+        x2 = np.clip((valid_boxes[0] + valid_boxes[2] / 2 - pad_x) / scale, 0, original_width)
+        y2 = np.clip((valid_boxes[1] + valid_boxes[3] / 2 - pad_y) / scale, 0, original_height)
+
+        # 클래스별 NMS 적용
+        keep_indices = class_aware_nms(
+            np.column_stack([x1, y1, x2, y2]), valid_scores, valid_class_ids,
+            iou_threshold=self.iou_threshold, max_candidates=self.max_candidates
+        )
+
+        detections = []
+        for i in keep_indices:
+            class_id = int(valid_class_ids[i])
+            confidence = float(valid_scores[i])
+            class_name = COCO_CLASS_NAMES[class_id] if class_id < len(COCO_CLASS_NAMES) else f"class_{class_id}"
+
+            detections.append({
+                'class': class_name,
+                'confidence': confidence,
+                'class_id': class_id,
+                'bbox': [float(x1[i]), float(y1[i]), float(x2[i]), float(y2[i])]
+            })
+
+        return detections
+
+    def detect(self, image_np, letterboxed=None):
+        """이미지 1장 객체 탐지"""
+        return self.detect_batch([image_np], None if letterboxed is None else [letterboxed])[0]
+
+    def detect_batch(self, images, letterboxed=None):
+        """이미지 목록을 텐서 하나로 묶어 한 번에 추론 → 이미지별 탐지 목록"""
+        if not images:
+            return []
+
+        batch, letterbox_info = self.letterbox_batch(images, letterboxed)
+        predictions = self._run(batch)  # (B, 84, 8400)
+
+        return [
+            self._postprocess(predictions[index], image_np.shape, *letterbox_info[index])
+            for index, image_np in enumerate(images)
+        ]
@@ -1,6 +1,20 @@
 from flask import Blueprint, request, jsonify
 import json
-from models.tables import db, Mail
+from models.tables import db, Mail, MailAttachment
+
+# 추출 텍스트 기본 반환 길이 / 1회 최대 반환 길이
+TEXT_PREVIEW_CHARS = 1000
+MAX_TEXT_RANGE_CHARS = 20000
+
+def _load_legacy_attachments(user_email, email_id):
+    """첨부파일 테이블 도입 이전에 저장된 메일의 JSON 첨부파일 목록"""
+    target_mail = Mail.query.filter_by(user_email=user_email, mail_id=str(email_id)).first()
+    if not target_mail or not target_mail.attachments_data:
+        return []
+    try:
+        return json.loads(target_mail.attachments_data).get('files', [])
+    except json.JSONDecodeError:
+        return []
 
 def create_attachment_routes(attachment_service, session_manager):
     attachment_bp = Blueprint('attachment', __name__)
@@ -26,14 +40,14 @@ def create_attachment_routes(attachment_service, session_manager):
             if not target_mail:
                 return jsonify({"error": "해당 메일을 찾을 수 없습니다."}), 404
             
-            # 첨부파일 데이터 파싱
-            attachments = []
-            if target_mail.attachments_data:
-                try:
-                    attachment_data = json.loads(target_mail.attachments_data)
-                    attachments = attachment_data.get('files', [])
-                except json.JSONDecodeError:
-                    attachments = []
+            # 분석 보류된 첨부파일은 첫 조회 시 분석 (idle_only 사용자는 유휴 시간 분석 결과를 기다림)
+            if attachment_service.analyze_on_access(user_email, target_mail.attachments):
+                db.session.refresh(target_mail)
+            
+            # 파일별 상세 정보 로드 (첨부파일 테이블 → 이전 JSON 순)
+            attachments = [attachment.to_dict(text_preview_chars=TEXT_PREVIEW_CHARS) for attachment in target_mail.attachments]
+            if not attachments:
+                attachments = _load_legacy_attachments(user_email, email_id)
             
             return jsonify({
                 "success": True,
@@ -41,6 +55,7 @@ def create_attachment_routes(attachment_service, session_manager):
                 "subject": target_mail.subject or '',
                 "attachments": attachments,
                 "attachment_count": len(attachments),
+                "analysis_pending_count": sum(1 for att in attachments if att.get('analysis_pending')),
                 "has_yolo_detections": any(att.get('yolo_detections') for att in attachments)
             })
             
@@ -57,40 +72,57 @@ def create_attachment_routes(attachment_service, session_manager):
             filename = data.get("filename", "")
             user_email = data.get("email", "")
             
+            # 추출 텍스트 구간 (offset/limit 또는 page 단위, page는 1부터)
+            limit = min(max(int(data.get("limit", TEXT_PREVIEW_CHARS)), 1), MAX_TEXT_RANGE_CHARS)
+            if data.get("page"):
+                offset = (max(int(data["page"]), 1) - 1) * limit
+            else:
+                offset = max(int(data.get("offset", 0)), 0)
+            
             # 사용자 세션 확인
             if not session_manager.session_exists(user_email):
                 return jsonify({"error": "로그인이 필요합니다."}), 401
             
-            # DB에서 해당 메일 찾기
-            target_mail = Mail.query.filter_by(
-                user_email=user_email, 
-                mail_id=str(email_id)
-            ).first()
+            # 첨부파일 테이블에서 (사용자, 메일, 파일명) 인덱스로 바로 조회
+            attachment_row = MailAttachment.query.filter_by(
+                user_email=user_email,
+                mail_id=str(email_id),
+                filename=filename
+            ).order_by(MailAttachment.position).first()
             
-            if not target_mail or not target_mail.attachments_data:
-                return jsonify({"error": "해당 메일이나 첨부파일을 찾을 수 없습니다."}), 404
+            # 분석 보류된 첨부파일은 첫 조회 시 분석
+            if attachment_row is not None:
+                attachment_service.analyze_on_access(user_email, [attachment_row])
             
-            # 첨부파일 데이터에서 해당 파일 찾기
-            target_attachment = None
-            try:
-                attachment_data = json.loads(target_mail.attachments_data)
-                for attachment in attachment_data.get('files', []):
-                    if attachment.get('filename') == filename:
-                        target_attachment = attachment
-                        break
-            except json.JSONDecodeError:
-                return jsonify({"error": "첨부파일 데이터 파싱 오류"}), 500
+            target_attachment = attachment_row.to_dict() if attachment_row else None
+            if not target_attachment:
+                target_attachment = next(
+                    (attachment for attachment in _load_legacy_attachments(user_email, email_id)
+                     if attachment.get('filename') == filename),
+                    None
+                )
             
             if not target_attachment:
                 return jsonify({"error": "해당 첨부파일을 찾을 수 없습니다."}), 404
             
+            # 요청 구간 텍스트만 읽기 (첨부파일 테이블은 필요한 압축 청크만 해제)
+            if attachment_row:
+                text_length = attachment_row.text_length or 0
+                text_slice = attachment_row.read_text(offset, limit)
+            else:
+                full_text = target_attachment.get('extracted_text', '') or ''
+                text_length = len(full_text)
+                text_slice = full_text[offset:offset + limit]
+            has_more = offset + len(text_slice) < text_length
+            
             # 문서 요약 정보 반환
             response_data = {
                 "success": True,
                 "filename": filename,
                 "file_type": target_attachment.get('type', 'unknown'),
                 "size": target_attachment.get('size', 0),
-                "extraction_success": target_attachment.get('extraction_success', False)
+                "extraction_success": target_attachment.get('extraction_success', False),
+                "analysis_pending": bool(target_attachment.get('analysis_pending'))
             }
             
             # 타입별 상세 정보 추가
@@ -98,16 +130,16 @@ def create_attachment_routes(attachment_service, session_manager):
                 response_data.update({
                     "yolo_detections": target_attachment.get('detected_objects', []),
                     "object_count": target_attachment.get('object_count', 0),
-                    "ocr_text": target_attachment.get('extracted_text', ''),
+                    "ocr_text": text_slice,
                     "text_summary": target_attachment.get('text_summary', '')
                 })
             
             elif target_attachment.get('type', '').startswith('document_'):
                 response_data.update({
-                    "extracted_text": target_attachment.get('extracted_text', '')[:1000],  # 처음 1000자만
+                    "extracted_text": text_slice,
                     "document_summary": target_attachment.get('document_summary', ''),
                     "extraction_method": target_attachment.get('extraction_method', ''),
-                    "full_text_available": len(target_attachment.get('extracted_text', '')) > 1000
+                    "full_text_available": has_more
                 })
                 
                 # 파일 타입별 추가 정보
@@ -118,12 +150,82 @@ def create_attachment_routes(attachment_service, session_manager):
                 if target_attachment.get('sheets'):
                     response_data['sheets'] = target_attachment['sheets']
             
+            # 텍스트 구간 정보 (다음 구간은 next_offset으로 요청)
+            response_data["text_range"] = {
+                "offset": offset,
+                "limit": limit,
+                "returned": len(text_slice),
+                "total_length": text_length,
+                "has_more": has_more,
+                "next_offset": offset + len(text_slice) if has_more else None,
+                "total_pages": (text_length + limit - 1) // limit
+            }
+            
             return jsonify(response_data)
             
         except Exception as e:
             print(f"[❗문서 요약 API 오류] {str(e)}")
             return jsonify({"error": str(e)}), 500
     
+    @attachment_bp.route('/api/ocr-gate-stats', methods=['GET'])
+    def get_ocr_gate_stats():
+        """OCR 게이트 판단 통계 (이미지 OCR 건너뛴 비율/사유)"""
+        try:
+            user_email = request.args.get('email')
+            if not user_email or not session_manager.session_exists(user_email):
+                return jsonify({"error": "로그인이 필요합니다."}), 401
+            
+            return jsonify({"success": True, "stats": attachment_service.get_ocr_gate_stats()})
+        except Exception as e:
+            print(f"[❗OCR 게이트 통계 오류] {str(e)}")
+            return jsonify({"error": str(e)}), 500
+    
+    @attachment_bp.route('/api/attachment-features', methods=['GET'])
+    def get_attachment_features():
+        """첨부파일 처리 기능 + 라우팅 정보 (지원 이미지 형식, 정책 목록, 종류 판별/정책 통계)"""
+        try:
+            user_email = request.args.get('email')
+            if not user_email or not session_manager.session_exists(user_email):
+                return jsonify({"error": "로그인이 필요합니다."}), 401
+            
+            return jsonify({"success": True, "features": attachment_service.get_available_features()})
+        except Exception as e:
+            print(f"[❗첨부파일 기능 조회 오류] {str(e)}")
+            return jsonify({"error": str(e)}), 500
+    
+    @attachment_bp.route('/api/extraction-stats', methods=['GET'])
+    def get_extraction_stats():
+        """문서 추출 프로세스 풀 통계 (사유별 실패: timeout / memory_limit / crashed / cancelled)"""
+        try:
+            return jsonify({"success": True, "stats": attachment_service.get_extraction_stats()})
+        except Exception as e:
+            print(f"[❗추출 통계 오류] {str(e)}")
+            return jsonify({"error": str(e)}), 500
+    
+    @attachment_bp.route('/api/summary-stats', methods=['GET'])
+    def get_summary_stats():
+        """계층 요약 통계 (한 번에/청크 요약 횟수, 청크 요약 캐시 적중 수)"""
+        try:
+            return jsonify({"success": True, "stats": attachment_service.get_summary_stats()})
+        except Exception as e:
+            print(f"[❗요약 통계 오류] {str(e)}")
+            return jsonify({"error": str(e)}), 500
+    
+    @attachment_bp.route('/api/extraction-cancel', methods=['POST'])
+    def cancel_extractions():
+        """로그인한 사용자의 진행 중인 문서 추출 취소 (해당 첨부파일은 실패 처리)"""
+        try:
+            data = request.get_json() or {}
+            user_email = data.get("email", "")
+            if not session_manager.session_exists(user_email):
+                return jsonify({"error": "로그인이 필요합니다."}), 401
+            
+            attachment_service.cancel_extractions(user_email)
+            return jsonify({"success": True})
+        except Exception as e:
+            print(f"[❗추출 취소 오류] {str(e)}")
+            return jsonify({"error": str(e)}), 500
+    
     @attachment_bp.route('/api/clear-cache', methods=['POST'])
     def clear_attachment_cache():
         """첨부파일 캐시 초기화"""
@@ -1,4 +1,5 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from services.llm_streaming import SSE_HEADERS, wants_stream, get_streaming_stats
 
 def create_chatbot_routes(chatbot_service, reply_service, session_manager):
     chatbot_bp = Blueprint('chatbot', __name__)
@@ -28,9 +29,39 @@ def create_chatbot_routes(chatbot_service, reply_service, session_manager):
             print(f"[❗챗봇 라우트 오류] {str(e)}")
             return jsonify({"error": str(e)}), 500
     
+    @chatbot_bp.route('/api/grammar-correction/stream', methods=['POST'])
+    def stream_grammar_correction():
+        """문법 교정 스트리밍 (SSE: start → token ... → done | error)"""
+        try:
+            data = request.get_json()
+            user_input = data.get("user_input", "").strip()
+            user_email = data.get("email", "")
+            
+            if not user_input:
+                return jsonify({"error": "입력이 비어있습니다."}), 400
+            
+            if not session_manager.session_exists(user_email):
+                return jsonify({"error": "로그인이 필요합니다."}), 401
+            
+            events = chatbot_service.stream_grammar_correction(user_input)
+            return Response(stream_with_context(events), mimetype='text/event-stream', headers=SSE_HEADERS)
+            
+        except Exception as e:
+            print(f"[❗문법 교정 스트리밍 오류] {str(e)}")
+            return jsonify({"error": str(e)}), 500
+    
+    @chatbot_bp.route('/api/streaming-stats', methods=['GET'])
+    def get_stream_stats():
+        """스트리밍 통계 (엔드포인트/백엔드별 횟수, 첫 토큰까지 시간 TTFT)"""
+        try:
+            return jsonify({"success": True, "stats": get_streaming_stats()})
+        except Exception as e:
+            print(f"[❗스트리밍 통계 오류] {str(e)}")
+            return jsonify({"error": str(e)}), 500
+    
     @chatbot_bp.route('/api/generate-ai-reply', methods=['POST'])
     def generate_ai_reply():
-        """AI 답장 생성"""
+        """AI 답장 생성 (stream: true 또는 Accept: text/event-stream 이면 SSE 스트리밍)"""
         try:
             data = request.get_json()
             sender = data.get('sender', '')
@@ -46,6 +77,12 @@ def create_chatbot_routes(chatbot_service, reply_service, session_manager):
             if not session_manager.session_exists(current_user_email):
                 return jsonify({'error': '로그인이 필요합니다.'}), 401
             
+            if wants_stream(data, request.headers):
+                events, status_code = reply_service.stream_ai_reply(sender, subject, body, current_user_email, user_intent)
+                if status_code != 200:
+                    return jsonify(events), status_code
+                return Response(stream_with_context(events), mimetype='text/event-stream', headers=SSE_HEADERS)
+            
             # 답장 서비스로 처리 위임
             response, status_code = reply_service.generate_ai_reply(sender, subject, body, current_user_email, user_intent)
             
@@ -1,11 +1,14 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime
 import json
-from models.tables import db, Mail, Todo
+from models.tables import db, Mail, MailAttachment, AttachmentTextChunk, Todo
 #0824 추가
 from services.genie_qwen import genie_summarize_email, genie_extract_search_target
+from services.prompt_budget import fit_text, FALLBACK_INPUT_TOKENS
+from services.batch_writer import BatchWriter
 
-def create_email_routes(email_service, ai_models, session_manager, attachment_service, todo_service):
+def create_email_routes(email_service, ai_models, session_manager, attachment_service, todo_service, summarizer=None,
+                        thread_service=None, mail_analyzer=None):
     email_bp = Blueprint('email', __name__)
 
 
@@ -17,6 +20,7 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
             email = data.get("email")
             page = data.get("page", 1)  # 페이지 번호 (기본값: 1)
             offset = data.get("offset", 0)  # 오프셋 (기본값: 0)
+            group_by_thread = data.get("group_by_thread", False)  # 페이지 안의 메일을 스레드별로 묶어서 반환
 
             if not session_manager.session_exists(email):
                 return jsonify({"error": "로그인이 필요합니다."}), 401
@@ -40,6 +44,11 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
             # 전체 메일 수 조회 (페이지네이션 정보용)
             total_count = Mail.query.filter_by(user_email=email).count()
 
+            # 첨부파일 목록은 요약 컬럼만 한 번에 조회
+            files_by_mail = MailAttachment.list_records_by_mail(
+                email, [mail.mail_id for mail in mails if mail.has_attachments]
+            )
+
             result = [{
                 "id": mail.mail_id,
                 "subject": mail.subject,
@@ -49,12 +58,10 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
                 "tag": mail.tag or "받은",
                 "summary": mail.summary or "요약 없음",
                 "classification": mail.classification or "unknown",
-                "attachments": json.loads(mail.attachments_data).get('files', []) if mail.attachments_data else [],
-                "has_attachments": json.loads(mail.attachments_data).get('has_attachments', False) if mail.attachments_data else False,
-                "attachment_summary": json.loads(mail.attachments_data).get('summary', '') if mail.attachments_data else ""
+                **mail.attachment_list_fields(files_by_mail.get(mail.mail_id))
             } for mail in mails]
 
-            return jsonify({
+            response = {
                 "emails": result,
                 "source": "database",
                 "count": len(result),
@@ -66,7 +73,10 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
                     "has_next": calculated_offset + len(result) < total_count,
                     "has_prev": page > 1
                 }
-            })
+            }
+            if group_by_thread and thread_service is not None:
+                response["threads"] = thread_service.group_by_thread(email, result)
+            return jsonify(response)
 
         except Exception as e:
             print(f"[❗DB 메일 조회 오류] {str(e)}")
@@ -127,7 +137,8 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
                 if sent_emails:
                     # Gmail 보낸메일과 DB 기존 메일 통합 처리
                     processed_emails = []
-                    new_emails_saved = 0
+                    writer = BatchWriter(chunk_size=email_service.config.DB_BATCH_CHUNK_SIZE)
+                    thread_entries = []  # 새 보낸메일의 스레드 인덱싱 입력 (요약 갱신 없음)
                     
                     for email_data in sent_emails:
                         email_id = str(email_data['id'])
@@ -137,32 +148,26 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
                             print(f"[🔄 기존 메일] {email_data['subject'][:30]}...")
                             processed_emails.append(existing_sent_mails_dict[email_id])
                         else:
-                            # ✅ 새 메일만 DB에 저장
-                            try:
-                                new_mail = Mail(
-                                    mail_id=email_id,
-                                    user_email=email,
-                                    subject=email_data["subject"],
-                                    from_=email_data["from"],
-                                    date=email_data["date_obj"],
-                                    body=email_data["body"],
-                                    tag="보낸",
-                                    summary="(보낸 메일)",
-                                    classification="sent",
-                                    raw_message=email_data.get('raw_message', ''),
-                                    attachments_data='{"summary":"","count":0,"has_attachments":false,"files":[]}',
-                                    mail_type='sent'
-                                )
-                                db.session.add(new_mail)
-                                db.session.commit()  # 즉시 커밋으로 중복 방지
-                                print(f"[💾 새 보낸메일 저장] {email_data['subject'][:30]}...")
-                                new_emails_saved += 1
-                            except Exception as save_error:
-                                db.session.rollback()
-                                if "Duplicate entry" in str(save_error):
-                                    print(f"[🔄 중복 감지 건너뛰기] {email_data['subject'][:30]}...")
-                                else:
-                                    print(f"[❗ 저장 오류] {email_data['subject'][:30]}...: {str(save_error)}")
+                            # ✅ 새 메일만 DB 저장 대기열에 추가 (중복은 일괄 저장 시 행 단위로 건너뜀)
+                            writer.add_mail({
+                                "mail_id": email_id,
+                                "user_email": email,
+                                "subject": email_data["subject"],
+                                "from_": email_data["from"],
+                                "date": email_data["date_obj"],
+                                "body": email_data["body"],
+                                "tag": "보낸",
+                                "summary": "(보낸 메일)",
+                                "classification": "sent",
+                                "raw_message": email_data.get('raw_message', ''),
+                                "has_attachments": False,
+                                "attachment_count": 0,
+                                "attachment_summary": "",
+                                "mail_type": 'sent'
+                            })
+                            print(f"[💾 새 보낸메일 저장 대기] {email_data['subject'][:30]}...")
+                            if thread_service is not None:
+                                thread_entries.append(thread_service.thread_entry(email_data))
                             
                             # 응답용 데이터 추가
                             processed_emails.append({
@@ -179,6 +184,9 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
                                 "attachment_summary": ""
                             })
                     
+                    new_emails_saved = writer.flush()['inserted']
+                    _index_threads(thread_service, email, thread_entries, update_summary=False)
+                    
                     print(f"[📤 보낸메일] 총 {len(processed_emails)}개 처리 완료 (신규 저장: {new_emails_saved}개)")
                     
                     return jsonify({
@@ -231,6 +239,9 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
             # 사용자 설정에서 Gmail 가져오기 개수와 DB 저장 개수 가져오기
             from models.tables import UserSettings
             settings = UserSettings.get_or_create(username, 'GENERAL', 'READ')
+            ocr_gate_settings = UserSettings.get_or_create(username, 'MY_EMAIL', 'ATTACHMENT_OCR').settings_data
+            routing_settings = UserSettings.get_or_create(username, 'MY_EMAIL', 'ATTACHMENT_ROUTING').settings_data
+            mail_analysis_mode = settings.settings_data.get('mailAnalysisMode', 'separate') if settings else 'separate'
             
             print(f"[📊 메일수] {username}의 READ 설정 데이터: {settings.settings_data}")
             
@@ -266,6 +277,7 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
                     pass
                     
                 db_mails = Mail.query.filter_by(user_email=username).all()
+                files_by_mail = MailAttachment.list_records_by_mail(username)
                 existing_mails = {mail.mail_id: {
                     "id": mail.mail_id,
                     "subject": mail.subject,
@@ -276,9 +288,7 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
                     "summary": mail.summary or "요약 없음",
                     "classification": mail.classification or "unknown",
                     "raw_message": mail.raw_message,
-                    "attachments": json.loads(mail.attachments_data).get('files', []) if mail.attachments_data else [],
-                    "has_attachments": json.loads(mail.attachments_data).get('has_attachments', False) if mail.attachments_data else False,
-                    "attachment_summary": json.loads(mail.attachments_data).get('summary', '') if mail.attachments_data else ""
+                    **mail.attachment_list_fields(files_by_mail.get(mail.mail_id))
                 } for mail in db_mails}
                 print(f"[💾 DB] {len(existing_mails)}개 기존 메일 확인")
             except Exception as e:
@@ -289,6 +299,17 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
             processed_emails = []
             new_emails_processed = 0
             
+            # 새 메일/할일은 모아서 청크 단위로 일괄 저장
+            writer = BatchWriter(chunk_size=email_service.config.DB_BATCH_CHUNK_SIZE)
+            incomplete_text_hashes = set()  # 전체 텍스트를 백그라운드에서 추출 중인 첨부파일
+            thread_entries = []  # 새 메일의 스레드 인덱싱 입력 (저장 후 스레드별 누적 요약 갱신)
+            
+            # 할일 중복 체크용 키는 요청당 한 번만 조회
+            existing_todo_keys = {
+                f"{title.lower().strip()}_{todo_type}"
+                for title, todo_type in db.session.query(Todo.title, Todo.type).filter_by(user_email=username)
+            }
+            
             for email_data in raw_emails:
                 try:
                     email_id = str(email_data['id'])
@@ -318,19 +339,11 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
                         }
                         summary = ""
                         todos_json = {"todos": []}
+                        analysis = None
                     else:
                         print(f"[🤖 AI 처리 시작] {email_data['subject'][:30]}...")
                         new_emails_processed += 1
                         
-                        # ✅ AI 분류
-                        print(f"[🔍 AI 분류] {email_data['subject'][:30]}...")
-                        try:
-                            classification_result = ai_models.classify_email(email_data['body'])
-                            print(f"[✅ 분류 완료] {classification_result['classification']}")
-                        except Exception as e:
-                            print(f"[❗ AI 분류 오류] {str(e)}")
-                            classification_result = {'classification': 'unknown'}
-                    
                         # ✅ 첨부파일 처리 (받은메일만, AI 요약 생성 전에 먼저 처리)
                         print(f"[🔍 첨부파일] {email_data['subject'][:30]}...")
                         attachments_json = {
@@ -342,11 +355,14 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
                         
                         if email_data.get('raw_message'):
                             try:
-                                attachments = attachment_service.process_email_attachments(
-                                    email_data['raw_message'], 
-                                    email_data['subject'], 
-                                    str(email_data['id'])
-                                )
+                                with attachment_service.extraction_owner(username):  # /api/extraction-cancel 대상
+                                    attachments = attachment_service.process_email_attachments(
+                                        email_data['raw_message'], 
+                                        email_data['subject'], 
+                                        str(email_data['id']),
+                                        ocr_gate_settings=ocr_gate_settings,
+                                        routing_settings=routing_settings
+                                    )
                                 
                                 if attachments:
                                     attachments_json = {
@@ -363,33 +379,41 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
                         else:
                             print(f"[⚠️ raw_message 없음] {email_data['subject'][:30]}...")
                     
+                        # ✅ 통합 분석 (설정 시 요약/분류/할일을 LLM 1회로, 검증을 통과하지 못한 항목만 아래 단계별 처리)
+                        analysis = None
+                        if mail_analyzer is not None and mail_analysis_mode == 'combined':
+                            print(f"[🧠 통합 분석] {email_data['subject'][:30]}...")
+                            analysis = mail_analyzer.analyze(
+                                _content_with_image_text(email_data, attachments_json),
+                                email_data['subject'], email_data['from'], email_data['date']
+                            )
+                        
+                        # ✅ AI 분류 (통합 분석 결과가 없을 때)
+                        if analysis and analysis['classification']:
+                            classification_result = analysis['classification']
+                        else:
+                            print(f"[🔍 AI 분류] {email_data['subject'][:30]}...")
+                            try:
+                                classification_result = ai_models.classify_email(email_data.get('new_content') or email_data['body'])
+                                print(f"[✅ 분류 완료] {classification_result['classification']}")
+                            except Exception as e:
+                                print(f"[❗ AI 분류 오류] {str(e)}")
+                                classification_result = {'classification': 'unknown'}
+                    
                         # ✅ AI 요약 생성 (받은메일만, OCR 텍스트 포함)
                         print(f"[🔍 AI 요약] {email_data['subject'][:30]}...")
                         summary = ""
                         try:
                             if not email_data['body']:
                                 summary = "(본문 없음)"
+                            elif analysis and analysis['summary']:
+                                summary = analysis['summary']
                             else:
-                                # OCR 텍스트와 이메일 본문 결합
-                                full_content_for_summary = email_data['body']
-                                
-                                # 이미지 OCR 텍스트 추가
-                                if attachments_json.get('files'):
-                                    image_texts = []
-                                    for attachment in attachments_json['files']:
-                                        if (attachment.get('type') == 'image' and 
-                                            attachment.get('extracted_text') and 
-                                            attachment.get('ocr_success')):
-                                            image_text = attachment['extracted_text'].strip()
-                                            if image_text:
-                                                image_texts.append(f"[이미지: {attachment['filename']}]\n{image_text}")
-                                    
-                                    if image_texts:
-                                        full_content_for_summary += f"\n\n--- 첨부 이미지 텍스트 ---\n" + "\n\n".join(image_texts)
-                                        print(f"[🖼️ 요약용 OCR 통합] {len(image_texts)}개 이미지 텍스트 포함")
+                                # OCR 텍스트와 이메일 본문(인용/서명/고지문 제외한 새 내용) 결합
+                                full_content_for_summary = _content_with_image_text(email_data, attachments_json)
                                 
                                 # OCR 포함된 내용으로 요약 생성
-                                summary = _summarize_with_qwen(full_content_for_summary, ai_models)
+                                summary = _summarize_with_qwen(full_content_for_summary, ai_models, summarizer)
                                 print(f"[✅ 요약 완료] {summary[:50]}...")
                         except Exception as e:
                             print(f"[❗ AI 요약 오류] {str(e)}")
@@ -398,42 +422,25 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
                         # ✅ 할일 추출 (받은메일만) - OCR 텍스트 포함
                         print(f"[📋 할일 추출] {email_data['subject'][:30]}...")
                         try:
-                            # OCR 텍스트와 이메일 본문 결합
-                            full_content_for_todo = email_data['body']
-                            
-                            # 이미지 OCR 텍스트 추가
-                            if attachments_json.get('files'):
-                                image_texts = []
-                                for attachment in attachments_json['files']:
-                                    if (attachment.get('type') == 'image' and 
-                                        attachment.get('extracted_text') and 
-                                        attachment.get('ocr_success')):
-                                        image_text = attachment['extracted_text'].strip()
-                                        if image_text:
-                                            image_texts.append(f"[이미지: {attachment['filename']}]\n{image_text}")
-                                
-                                if image_texts:
-                                    full_content_for_todo += f"\n\n--- 첨부 이미지 텍스트 ---\n" + "\n\n".join(image_texts)
-                                    print(f"[🖼️ 할일용 OCR 통합] {len(image_texts)}개 이미지 텍스트 포함")
-                            
-                            todo_result = todo_service.extract_todos_from_email(
-                                email_body=full_content_for_todo,  # OCR 텍스트가 포함된 통합 내용
-                                email_subject=email_data['subject'], 
-                                email_from=email_data['from'],
-                                email_date=email_data['date']
-                            )
+                            if analysis and analysis['todo_result']:
+                                todo_result = analysis['todo_result']
+                            else:
+                                # OCR 텍스트와 이메일 본문(인용/서명/고지문 제외한 새 내용) 결합
+                                todo_result = todo_service.extract_todos_from_email(
+                                    email_body=_content_with_image_text(email_data, attachments_json),
+                                    email_subject=email_data['subject'], 
+                                    email_from=email_data['from'],
+                                    email_date=email_data['date']
+                                )
                             
                             if todo_result['success'] and todo_result['todos']:
-                                # 기존 할일과 중복 체크
-                                existing_todos = Todo.query.filter_by(user_email=username).all()
-                                existing_keys = {f"{todo.title.lower().strip()}_{todo.type}" for todo in existing_todos}
-                                
+                                # 기존 할일과 중복 체크 (요청 시작 시 조회한 키 사용)
                                 new_todos_count = 0
                                 for todo in todo_result['todos']:
                                     todo_key = f"{todo['title'].lower().strip()}_{todo['type']}"
                                     
-                                    if todo_key not in existing_keys:
-                                        # 중복이 아니면 DB 저장
+                                    if todo_key not in existing_todo_keys:
+                                        # 중복이 아니면 DB 저장 대기열에 추가
                                         todo_date = None
                                         if todo.get('date'):
                                             try:
@@ -441,25 +448,22 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
                                             except:
                                                 pass
                                         
-                                        new_todo = Todo(
-                                            user_email=username,
-                                            title=todo['title'],
-                                            type=todo['type'], 
-                                            event=todo.get('description', ''),
-                                            date=todo_date,
-                                            time=todo.get('time'),
-                                            priority=todo.get('priority', 'medium'),
-                                            status='pending',
-                                            mail_id=str(email_data['id'])
-                                        )
-                                        
-                                        db.session.add(new_todo)
-                                        existing_keys.add(todo_key)  # 메모리에서도 중복 방지
+                                        writer.add_todo({
+                                            "user_email": username,
+                                            "title": todo['title'],
+                                            "type": todo['type'],
+                                            "event": todo.get('description', ''),
+                                            "date": todo_date,
+                                            "time": todo.get('time'),
+                                            "priority": todo.get('priority', 'medium'),
+                                            "status": 'pending',
+                                            "mail_id": str(email_data['id'])
+                                        })
+                                        existing_todo_keys.add(todo_key)  # 메모리에서도 중복 방지
                                         new_todos_count += 1
                                 
                                 if new_todos_count > 0:
-                                    db.session.commit()
-                                    print(f"[✅ 할일 추출 완료] {new_todos_count}개 새 할일 생성")
+                                    print(f"[✅ 할일 추출 완료] {new_todos_count}개 새 할일 저장 대기")
                                 else:
                                     print(f"[📋 할일 추출] 중복 없음, 새 할일 없음")
                             else:
@@ -477,6 +481,8 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
                             tag = "중요"
                         elif "spam" in classification_result['classification'].lower():
                             tag = "스팸"
+                        elif analysis and analysis['importance'] == 'high':
+                            tag = "중요"
                     else:
                         tag = "보낸"
                     
@@ -492,41 +498,47 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
                         "tag": tag,
                         "summary": summary,
                         "classification": classification_result['classification'],
-                        "attachments": attachments_json.get('files', []),
+                        "attachments": [MailAttachment.light_record(info) for info in attachments_json.get('files', [])],
                         "has_attachments": attachments_json.get('has_attachments', False),
                         "attachment_summary": attachments_json.get('summary', '')
                     }
+                    if analysis:
+                        processed_email["mail_analysis"] = {
+                            "importance": analysis['importance'],
+                            "dates": analysis['dates'] or [],
+                            "fallback_fields": list(analysis['errors'])
+                        }
                     
                     processed_emails.append(processed_email)
                     
-                    # ✅ DB에 새 메일 저장 (모든 새 메일 저장)
-                    print(f"[💾 DB 저장] {email_data['subject'][:30]}...")
-                    try:
-                        new_mail = Mail(
-                            mail_id=email_id,
-                            user_email=username,
-                            subject=email_data["subject"],
-                            from_=email_data["from"],
-                            date=email_data["date_obj"],  # 날짜 객체 직접 사용
-                            body=email_data["body"],
-                            tag=tag,
-                            summary=summary,
-                            classification=classification_result['classification'],
-                            raw_message=email_data.get('raw_message', ''),
-                            attachments_data=json.dumps(attachments_json, ensure_ascii=False),
-                            mail_type=mail_type  # 'inbox' 또는 'sent'
-                        )
-                        db.session.add(new_mail)
-                        db.session.commit()
-                        print(f"[✅ DB 저장 완료] {email_data['subject'][:30]}...")
-                        
-                    except Exception as db_error:
-                        print(f"[⚠️ DB 저장 실패] {str(db_error)}")
-                        try:
-                            db.session.rollback()
-                            print(f"[🔄 DB 세션 롤백] 계속 진행...")
-                        except:
-                            pass
+                    # ✅ 새 메일 DB 저장 대기열에 추가 (청크 단위 일괄 저장)
+                    print(f"[💾 DB 저장 대기] {email_data['subject'][:30]}...")
+                    writer.add_mail({
+                        "mail_id": email_id,
+                        "user_email": username,
+                        "subject": email_data["subject"],
+                        "from_": email_data["from"],
+                        "date": email_data["date_obj"],  # 날짜 객체 직접 사용
+                        "body": email_data["body"],
+                        "tag": tag,
+                        "summary": summary,
+                        "classification": classification_result['classification'],
+                        "raw_message": email_data.get('raw_message', ''),
+                        "has_attachments": attachments_json.get('has_attachments', False),
+                        "attachment_count": attachments_json.get('count', 0),
+                        "attachment_summary": attachments_json.get('summary', ''),
+                        "mail_type": mail_type  # 'inbox' 또는 'sent'
+                    })
+                    
+                    # 파일별 상세 결과는 첨부파일 테이블에 저장
+                    for position, info in enumerate(attachments_json.get('files', [])):
+                        writer.add_attachment(MailAttachment.mapping_from_info(username, email_id, position, info))
+                        writer.add_attachment_text(info.get('content_hash'), info.get('extracted_text'))
+                        if info.get('text_complete') is False:
+                            incomplete_text_hashes.add(info.get('content_hash'))
+                    
+                    if thread_service is not None:
+                        thread_entries.append(thread_service.thread_entry(email_data, summary))
                     
                 except Exception as e:
                     print(f"[⚠️ 이메일 처리 오류] {str(e)}")
@@ -550,6 +562,15 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
                             "attachment_summary": ""
                         })
             
+            # 남은 메일/할일 일괄 저장 (청크당 1 트랜잭션)
+            write_stats = writer.flush()
+            
+            # 저장 전에 끝난 백그라운드 텍스트 추출은 첨부파일 행 길이에 다시 반영
+            attachment_service.sync_completed_texts(incomplete_text_hashes)
+            
+            # 새 메일을 스레드에 연결하고 스레드별 누적 요약 갱신 (스레드당 LLM 1회)
+            _index_threads(thread_service, username, thread_entries)
+            
             # 최신순 정렬
             processed_emails.sort(key=lambda x: x['date'], reverse=True)
             
@@ -557,16 +578,21 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
             
             print(f"[📊 결과] 사용자: {username}, 총 {len(processed_emails)}개 메일 (신규 AI 처리: {new_emails_processed}개, DB 사용: {len(processed_emails)-new_emails_processed}개)")
             
-            return jsonify({
+            response = {
                 "emails": processed_emails,
                 "user_session": session_manager.get_user_key(username)[:8] + "...",
                 "cache_info": f"DB: {len(processed_emails)-new_emails_processed}개, 신규 처리: {new_emails_processed}개",
                 "fetch_info": {
                     "gmail_fetched": len(raw_emails),
                     "processed": len(processed_emails),
-                    "new_ai_processed": new_emails_processed
+                    "new_ai_processed": new_emails_processed,
+                    "db_saved": write_stats['inserted'],
+                    "db_conflicts": write_stats['conflicts']
                 }
-            })
+            }
+            if data.get("group_by_thread") and thread_service is not None:
+                response["threads"] = thread_service.group_by_thread(username, processed_emails)
+            return jsonify(response)
             
         except Exception as e:
             print("[❗에러 발생]", str(e))
@@ -711,7 +737,7 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
                 print(f"[❗ DB 검색 실패] {str(db_error)}")
                 found_emails = []
             
-            return jsonify({
+            response = {
                 "success": True,
                 "search_target": user_input,
                 "results": found_emails,
@@ -719,12 +745,71 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
                 "confidence": 1.0,
                 "detected_intent": "db_search_completed",
                 "source": "database"
-            })
+            }
+            if data.get("group_by_thread") and thread_service is not None:
+                response["threads"] = thread_service.group_by_thread(user_email, found_emails)
+            return jsonify(response)
             
         except Exception as e:
             print(f"[❗이메일 검색 오류] {str(e)}")
             return jsonify({"error": str(e)}), 500
     
+    @email_bp.route('/api/mail-analysis-stats', methods=['GET'])
+    def get_mail_analysis_stats():
+        """통합 분석 호출 수 + 필드별 단계별 처리 대체 횟수"""
+        try:
+            if mail_analyzer is None:
+                return jsonify({"error": "통합 분석이 설정되지 않았습니다."}), 404
+            return jsonify(mail_analyzer.get_stats())
+        except Exception as e:
+            print(f"[❗통합 분석 통계 오류] {str(e)}")
+            return jsonify({"error": str(e)}), 500
+    
+    @email_bp.route('/api/thread', methods=['POST'])
+    def get_thread():
+        """스레드 조회 (누적 요약 + 스레드에 속한 메일, 오래된 순)"""
+        try:
+            data = request.get_json()
+            email = data.get("email")
+            thread_id = data.get("thread_id")
+
+            if not session_manager.session_exists(email):
+                return jsonify({"error": "로그인이 필요합니다."}), 401
+            if not thread_id or thread_service is None:
+                return jsonify({"error": "thread_id가 필요합니다."}), 400
+
+            from models.tables import MailThread
+            thread = MailThread.query.filter_by(user_email=email, thread_id=thread_id).first()
+            mail_ids = thread_service.get_thread_mail_ids(email, thread_id) if thread else [thread_id]
+
+            mails = Mail.query.filter(Mail.user_email == email, Mail.mail_id.in_(mail_ids))\
+                            .order_by(Mail.date.asc()).all()
+            if not mails:
+                return jsonify({"error": "스레드를 찾을 수 없습니다."}), 404
+
+            files_by_mail = MailAttachment.list_records_by_mail(
+                email, [mail.mail_id for mail in mails if mail.has_attachments]
+            )
+            result = [{
+                "id": mail.mail_id,
+                "subject": mail.subject,
+                "from": mail.from_,
+                "date": mail.date.strftime('%Y-%m-%d %H:%M:%S'),
+                "body": mail.body[:1000],
+                "tag": mail.tag or "받은",
+                "summary": mail.summary or "요약 없음",
+                "classification": mail.classification or "unknown",
+                **mail.attachment_list_fields(files_by_mail.get(mail.mail_id))
+            } for mail in mails]
+
+            thread_info = thread.to_dict() if thread else thread_service.group_by_thread(email, result)[0]
+            thread_info.pop("emails", None)
+            return jsonify({"thread": thread_info, "emails": result, "count": len(result)})
+
+        except Exception as e:
+            print(f"[❗스레드 조회 오류] {str(e)}")
+            return jsonify({"error": str(e)}), 500
+    
     @email_bp.route('/api/delete-email', methods=['POST'])
     def delete_email():
         """이메일 삭제"""
@@ -765,7 +850,12 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
             
             # 메일 삭제
             deleted_subject = mail_to_delete.subject
+            content_hashes = [row[0] for row in db.session.query(MailAttachment.content_hash).filter_by(
+                user_email=user_email, mail_id=mail_to_delete.mail_id
+            )]
             db.session.delete(mail_to_delete)
+            db.session.flush()
+            AttachmentTextChunk.delete_orphans(content_hashes)
             db.session.commit()
             
             print(f"[✅ 메일 삭제 완료] 제목: {deleted_subject}")
@@ -888,6 +978,33 @@ def create_email_routes(email_service, ai_models, session_manager, attachment_se
 
 
 #0824 수정
+def _content_with_image_text(email_data, attachments_json):
+    """AI 단계 입력: 본문 새 내용(인용/서명/고지문 제외) + 이미지 첨부파일 OCR 텍스트"""
+    content = email_data.get('new_content') or email_data['body']
+    image_texts = []
+    for attachment in attachments_json.get('files', []):
+        if (attachment.get('type') == 'image' and 
+            attachment.get('extracted_text') and 
+            attachment.get('ocr_success')):
+            image_text = attachment['extracted_text'].strip()
+            if image_text:
+                image_texts.append(f"[이미지: {attachment['filename']}]\n{image_text}")
+    
+    if image_texts:
+        content += f"\n\n--- 첨부 이미지 텍스트 ---\n" + "\n\n".join(image_texts)
+        print(f"[🖼️ OCR 통합] {len(image_texts)}개 이미지 텍스트 포함")
+    return content
+
+def _index_threads(thread_service, user_email, thread_entries, update_summary=True):
+    """새로 저장한 메일 스레드 인덱싱 (실패해도 메일 응답은 그대로)"""
+    if thread_service is None or not thread_entries:
+        return
+    try:
+        thread_service.index_messages(user_email, thread_entries, update_summary=update_summary)
+    except Exception as e:
+        db.session.rollback()
+        print(f"[⚠️ 스레드 인덱싱 실패] {str(e)}")
+
 def extract_search_target_with_qwen(text, ai_models):
     """Qwen으로 검색 대상 추출 (Genie·NPU 우선, 실패 시 기존 HF)"""
     try:
@@ -931,19 +1048,24 @@ def extract_search_target_with_qwen(text, ai_models):
 
 
 
-def _summarize_with_qwen(text, ai_models):
-    """Qwen 기반 이메일 요약 (Genie·NPU 우선, 실패 시 HF → 규칙기반)"""
+def _summarize_with_qwen(text, ai_models, summarizer=None):
+    """Qwen 기반 이메일 요약 (Genie·NPU 우선, 실패 시 HF → 규칙기반, 긴 스레드는 summarizer로 청크 요약 → 합치기)"""
     try:
         # 1) NPU(Genie) 경로
         print("summary NPU 성공")
-        return genie_summarize_email(text, max_words=25, max_chars=800)
+        if summarizer is not None:
+            return summarizer.summarize(
+                text, 'email thread',
+                lambda short_text: genie_summarize_email(short_text, max_words=25)
+            )
+        return genie_summarize_email(text, max_words=25)
     except Exception as ge:
         print(f"[⚠️ Genie 요약 실패] {ge}")
 
     try:
         # 2) 기존(HF) 경로 (네 기존 코드 그대로)
         if ai_models and ai_models.load_qwen_model():
-            safe_text = text[:800]
+            safe_text = fit_text(text, FALLBACK_INPUT_TOKENS)
             prompt = f"""<|im_start|>system
 당신은 이메일 요약 전문가입니다.
 <|im_end|>
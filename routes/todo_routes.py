@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime
 from models.tables import db, Todo, Mail
+from services.batch_writer import BatchWriter
 
 def create_todo_routes(session_manager, todo_service):
     todo_bp = Blueprint('todo', __name__)
@@ -185,10 +186,13 @@ def create_todo_routes(session_manager, todo_service):
                 'date': mail.date.strftime('%Y-%m-%d %H:%M:%S') if mail.date else ''
             } for mail in db_mails]
             
-            # 2. DB에서 기존 할일 조회
+            # 2. DB에서 기존 할일 조회 (요청당 한 번, 응답에도 재사용)
             existing_todos = Todo.query.filter_by(user_email=user_email).all()
             existing_keys = {f"{todo.title.lower().strip()}_{todo.type}" for todo in existing_todos}
+            last_todo_id = max((todo.todo_id for todo in existing_todos), default=0)
             
+            writer = BatchWriter(chunk_size=todo_service.config.DB_BATCH_CHUNK_SIZE)
+            inserted_keys = set()  # 이번 요청이 저장한 (제목, 유형, 메일 ID)
             all_todos = []
             processed_count = 0
             new_count = 0
@@ -216,20 +220,19 @@ def create_todo_routes(session_manager, todo_service):
                                     except:
                                         pass
                                 
-                                new_todo = Todo(
-                                    user_email=user_email,
-                                    title=todo['title'],
-                                    type=todo['type'],
-                                    event=todo.get('description', ''),
-                                    date=todo_date,
-                                    time=todo.get('time'),
-                                    priority=todo.get('priority', 'medium'),
-                                    status='pending',
-                                    mail_id=email_data.get('id')
-                                )
-                                
-                                db.session.add(new_todo)
+                                writer.add_todo({
+                                    "user_email": user_email,
+                                    "title": todo['title'],
+                                    "type": todo['type'],
+                                    "event": todo.get('description', ''),
+                                    "date": todo_date,
+                                    "time": todo.get('time'),
+                                    "priority": todo.get('priority', 'medium'),
+                                    "status": 'pending',
+                                    "mail_id": email_data.get('id')
+                                })
                                 existing_keys.add(todo_key)  # 메모리에서도 중복 방지
+                                inserted_keys.add((todo['title'], todo['type'], email_data.get('id')))
                                 
                                 # 응답용 데이터 추가
                                 all_todos.append({
@@ -250,22 +253,24 @@ def create_todo_routes(session_manager, todo_service):
                     print(f"[❌ 할일추출] {str(e)}")
                     continue
             
-            # DB에 커밋
-            db.session.commit()
+            # 기존 할일은 커밋 전에 직렬화 (커밋 후 만료된 객체를 행마다 다시 읽지 않도록)
+            todos_response = [_serialize_todo(todo) for todo in existing_todos]
             
-            # 최종 할일 목록 조회
-            final_todos = Todo.query.filter_by(user_email=user_email).all()
-            todos_response = [{
-                'id': todo.todo_id,
-                'title': todo.title,
-                'type': todo.type,
-                'description': todo.event or '',
-                'date': todo.date.strftime('%Y-%m-%d') if todo.date else None,
-                'time': todo.time,
-                'priority': todo.priority,
-                'status': todo.status,
-                'mail_id': todo.mail_id
-            } for todo in final_todos]
+            # DB에 일괄 저장 (청크당 1 트랜잭션, 충돌 행만 건너뜀)
+            write_stats = writer.flush()
+            new_count = write_stats['inserted']
+            
+            # 최종 할일 목록: 이번 요청이 저장한 행만 추가 조회 (같은 사용자의 동시 요청이 저장한 행은 제외)
+            if new_count > 0:
+                new_todos = Todo.query.filter(
+                    Todo.user_email == user_email,
+                    Todo.todo_id > last_todo_id,
+                    Todo.mail_id.in_({mail_id for _, _, mail_id in inserted_keys})
+                ).order_by(Todo.todo_id).all()
+                todos_response.extend(
+                    _serialize_todo(todo) for todo in new_todos
+                    if (todo.title, todo.type, todo.mail_id) in inserted_keys
+                )
             
             print(f"[✅ 할일추출] 총 {len(todos_response)}개 (신규 {new_count}개)")
             
@@ -338,4 +343,19 @@ def create_todo_routes(session_manager, todo_service):
             print(f"[❌ 중복정리] {str(e)}")
             return jsonify({"error": str(e)}), 500
     
-    return todo_bp
\ No newline at end of file
+    return todo_bp
+
+
+def _serialize_todo(todo):
+    """Todo 행을 응답용 dict로 변환"""
+    return {
+        'id': todo.todo_id,
+        'title': todo.title,
+        'type': todo.type,
+        'description': todo.event or '',
+        'date': todo.date.strftime('%Y-%m-%d') if todo.date else None,
+        'time': todo.time,
+        'priority': todo.priority,
+        'status': todo.status,
+        'mail_id': todo.mail_id
+    }
\ No newline at end of file
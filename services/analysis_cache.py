@@ -0,0 +1,148 @@
+"""
+첨부파일 분석 결과 디스크 캐시
+
+키: 첨부파일 바이트의 SHA-256 + 분석 파이프라인 버전
+- 같은 파일이 여러 메일에 붙어 와도 OCR/YOLO/요약은 한 번만 수행
+- 총 용량(바이트) 기준 LRU 제거
+- 파일 mtime을 마지막 사용 시각으로 사용하므로 재시작 후에도 LRU 순서 유지
+"""
+import os
+import json
+import threading
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+
+class AttachmentAnalysisCache:
+    """content hash 기반 첨부파일 분석 결과 캐시"""
+
+    SUFFIX = '.json'
+
+    def __init__(self, cache_dir, max_bytes, pipeline_version):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.pipeline_version = str(pipeline_version)
+        self._entries = OrderedDict()  # 캐시 키 -> 파일 크기 (오래 사용 안 한 순)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._load_index()
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}{self.SUFFIX}"
+
+    def _key(self, content_hash):
+        return f"{content_hash}.{self.pipeline_version}"
+
+    def _load_index(self):
+        """디스크의 캐시 파일로 LRU 인덱스 복원 (다른 버전 결과는 삭제)"""
+        entries = []
+        for path in self.cache_dir.glob(f"*{self.SUFFIX}"):
+            key = path.name[:-len(self.SUFFIX)]
+            try:
+                if not key.endswith(f".{self.pipeline_version}"):
+                    path.unlink()
+                    continue
+                stat = path.stat()
+                entries.append((stat.st_mtime, key, stat.st_size))
+            except OSError:
+                continue
+
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._total_bytes += size
+
+        self._evict()
+        print(f"[🗂️ 분석 캐시] {len(self._entries)}개 항목 로드 ({self._total_bytes / 1024 / 1024:.1f}MB / {self.max_bytes / 1024 / 1024:.0f}MB)")
+
+    def contains(self, content_hash):
+        """캐시 항목 존재 여부 (파일을 읽지 않으며 LRU 순서/통계도 바꾸지 않음)"""
+        if not content_hash:
+            return False
+        with self._lock:
+            return self._key(content_hash) in self._entries
+
+    def get(self, content_hash):
+        """캐시된 분석 결과 반환 (없으면 None)"""
+        if not content_hash:
+            return None
+
+        key = self._key(content_hash)
+        with self._lock:
+            if key not in self._entries:
+                self.stats['misses'] += 1
+                return None
+
+            path = self._path(key)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    result = json.load(f)
+                os.utime(path, None)  # 마지막 사용 시각 갱신
+            except (OSError, ValueError):
+                self._remove(key)
+                self.stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return result
+
+    def put(self, content_hash, result):
+        """분석 결과 저장 후 용량 초과분 제거"""
+        if not content_hash:
+            return
+
+        key = self._key(content_hash)
+        payload = json.dumps(result, ensure_ascii=False, default=str).encode('utf-8')
+        if len(payload) > self.max_bytes:
+            return
+
+        with self._lock:
+            try:
+                # 임시 파일에 쓴 뒤 교체 (중간에 죽어도 깨진 캐시 파일이 남지 않음)
+                fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(payload)
+                os.replace(temp_path, self._path(key))
+            except OSError as e:
+                print(f"[⚠️ 분석 캐시] 저장 실패: {e}")
+                return
+
+            self._total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = len(payload)
+            self._total_bytes += len(payload)
+            self._evict()
+
+    def _remove(self, key):
+        self._total_bytes -= self._entries.pop(key, 0)
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def _evict(self):
+        """총 용량이 한도 이하가 될 때까지 가장 오래 사용 안 한 항목 제거"""
+        while self._entries and self._total_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.stats['evictions'] += 1
+
+    def clear(self):
+        """캐시 전체 삭제 후 삭제한 항목 수 반환"""
+        with self._lock:
+            count = len(self._entries)
+            for key in list(self._entries):
+                self._remove(key)
+            return count
+
+    def get_stats(self):
+        """캐시 사용 현황"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'total_bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'pipeline_version': self.pipeline_version,
+                **self.stats
+            }
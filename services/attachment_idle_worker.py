@@ -0,0 +1,86 @@
+"""
+첨부파일 유휴 시간 분석 워커
+
+앱 프로세스 안에서 백그라운드 스레드로 동작하며,
+요청이 한동안 없을 때만 분석 보류된 첨부파일(analysisMode lazy/idle_only)을 미리 분석합니다.
+- 요청이 들어오면(touch) 현재 파일까지만 분석하고 다음 유휴 시간으로 미룸
+- 분석 자체는 AttachmentService.analyze_pending_attachment 사용 (조회 시점 분석과 중복 실행 방지)
+- 일시적 실패로 보류가 유지된 파일은 analysis_retry_at 이후에만 다시 시도
+"""
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import or_
+from models.tables import MailAttachment
+
+class AttachmentIdleWorker:
+    """분석 보류 첨부파일 유휴 시간 처리기"""
+
+    def __init__(self, app, attachment_service, config):
+        self.app = app
+        self.attachment_service = attachment_service
+        self.idle_after = config.ATTACHMENT_IDLE_AFTER_SEC
+        self.check_interval = config.ATTACHMENT_IDLE_CHECK_INTERVAL_SEC
+        self.batch_size = config.ATTACHMENT_IDLE_BATCH_SIZE
+        self._last_activity = time.monotonic()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.stats = {'analyzed': 0, 'runs': 0}
+
+    def start(self):
+        """백그라운드 스레드 시작 (중복 시작 방지)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run_loop, name="attachment-idle-worker", daemon=True)
+        self._thread.start()
+        print(f"[🕒 유휴 분석] 워커 시작 (요청 없이 {self.idle_after}초 경과 시 보류 첨부파일 분석)")
+
+    def stop(self):
+        """워커 정지"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def touch(self):
+        """요청 발생 기록 (before_request 훅에서 호출)"""
+        self._last_activity = time.monotonic()
+
+    def is_idle(self):
+        """마지막 요청 후 유휴 기준 시간이 지났는지 확인"""
+        return time.monotonic() - self._last_activity >= self.idle_after
+
+    def _run_loop(self):
+        while not self._stop_event.wait(self.check_interval):
+            if not self.is_idle():
+                continue
+            try:
+                with self.app.app_context():
+                    self.run_pending()
+            except Exception as e:
+                print(f"[❌ 유휴 분석] 워커 실행 오류: {e}")
+
+    def run_pending(self):
+        """분석 보류 첨부파일을 오래된 순으로 분석 (유휴 상태가 끝나면 중단) → 분석한 파일 수"""
+        # 일시적 실패로 재시도 대기 중인 행은 건너뜀 (계속 실패하는 파일이 앞에서 배치를 막지 않도록)
+        now = datetime.utcnow()
+        rows = MailAttachment.query.filter(
+            MailAttachment.analysis_pending.is_(True),
+            or_(MailAttachment.analysis_retry_at.is_(None), MailAttachment.analysis_retry_at <= now)
+        ).order_by(MailAttachment.id).limit(self.batch_size).all()
+
+        analyzed_keys = set()
+        for row in rows:
+            if self._stop_event.is_set() or not self.is_idle():
+                break
+            # 같은 사용자의 같은 원본 파일 보류 행은 한 번의 분석으로 함께 갱신됨 (다른 사용자는 각자 설정으로 분석)
+            if (row.user_email, row.content_hash) in analyzed_keys:
+                continue
+            self.attachment_service.analyze_pending_attachment(row)
+            analyzed_keys.add((row.user_email, row.content_hash))
+
+        self.stats['runs'] += 1
+        self.stats['analyzed'] += len(analyzed_keys)
+        if analyzed_keys:
+            print(f"[🕒 유휴 분석] 보류 첨부파일 {len(analyzed_keys)}개 분석 완료")
+        return len(analyzed_keys)
@@ -0,0 +1,179 @@
+"""
+첨부파일 종류 판별 + 처리 정책 라우팅
+
+파일명 확장자/MIME 대신 파일 앞부분(매직 바이트)으로 실제 종류를 판별하고,
+종류별 정책과 크기 상한(사용자 설정 MY_EMAIL/ATTACHMENT_ROUTING)으로 처리 수준을 정합니다.
+- full_ai: 현재 파이프라인 전체 (이미지 YOLO + OCR + 요약, 문서 텍스트 + 요약)
+- text_only: 텍스트만 (이미지 OCR, 문서 텍스트 추출, YOLO/LLM 요약 생략)
+- metadata_only: 파일명/크기/종류만 기록
+- skip: 결과에서 제외
+"""
+import io
+import threading
+import zipfile
+from pathlib import Path
+
+ROUTING_POLICIES = ('skip', 'metadata_only', 'text_only', 'full_ai')
+POLICY_RANK = {policy: rank for rank, policy in enumerate(ROUTING_POLICIES)}
+
+# 판별한 종류 → 정책/크기 설정 그룹
+POLICY_GROUPS = {
+    'image': 'image',
+    'pdf': 'pdf',
+    'word': 'office',
+    'presentation': 'office',
+    'spreadsheet': 'office'
+}
+
+# 판별한 종류 → 결과 type 값 (metadata_only 결과도 목록 요약에서 같은 분류로 집계)
+RESULT_TYPES = {
+    'image': 'image',
+    'pdf': 'document_pdf',
+    'word': 'document_word',
+    'presentation': 'document_presentation',
+    'spreadsheet': 'document_spreadsheet'
+}
+
+# 확장자 기준 선언 종류 (판별 결과와 다르면 mislabeled로 기록)
+DECLARED_KINDS = {
+    '.jpg': 'image', '.jpeg': 'image', '.png': 'image', '.gif': 'image', '.bmp': 'image',
+    '.tif': 'image', '.tiff': 'image', '.webp': 'image', '.heic': 'image', '.heif': 'image',
+    '.pdf': 'pdf', '.docx': 'word', '.pptx': 'presentation', '.xlsx': 'spreadsheet', '.xls': 'spreadsheet'
+}
+
+HEIF_BRANDS = {b'heic', b'heix', b'hevc', b'hevx', b'heim', b'heis', b'mif1', b'msf1'}
+OLE2_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+
+def sniff_file_type(data, filename=''):
+    """파일 앞부분으로 종류 판별 → (종류, 세부 형식)"""
+    head = data[:32]
+
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image', 'jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image', 'png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image', 'gif'
+    if head.startswith(b'BM'):
+        return 'image', 'bmp'
+    if head[:4] in (b'II*\x00', b'MM\x00*'):
+        return 'image', 'tiff'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image', 'webp'
+    if head[4:8] == b'ftyp' and head[8:12] in HEIF_BRANDS:
+        return 'image', 'heic'
+
+    # PDF 헤더는 앞쪽 1KB 안 어디에나 올 수 있음
+    if b'%PDF-' in data[:1024]:
+        return 'pdf', 'pdf'
+
+    if head.startswith(b'PK\x03\x04'):
+        return _sniff_ooxml(data)
+
+    # 구형 OLE2 문서는 종류 구분이 어려워 확장자로 판단 (처리 가능한 것은 .xls뿐)
+    if head.startswith(OLE2_MAGIC):
+        if Path(filename or '').suffix.lower() == '.xls':
+            return 'spreadsheet', 'xls'
+        return 'other', 'ole2'
+
+    return 'other', 'unknown'
+
+
+def _sniff_ooxml(data):
+    """ZIP 목차(중앙 디렉터리)만 읽어 Office Open XML 종류 판별"""
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            names = set(archive.namelist())
+    except zipfile.BadZipFile:
+        return 'other', 'zip'
+
+    if 'word/document.xml' in names:
+        return 'word', 'docx'
+    if 'ppt/presentation.xml' in names:
+        return 'presentation', 'pptx'
+    if 'xl/workbook.xml' in names:
+        return 'spreadsheet', 'xlsx'
+    return 'other', 'zip'
+
+
+class AttachmentRouter:
+    """첨부파일별 처리 정책 결정 + 통계"""
+
+    def __init__(self, image_formats):
+        self.image_formats = set(image_formats)  # 디코딩 가능한 이미지 형식
+        self._lock = threading.Lock()
+        # 모든 사용자 공용 → 파일명 등 파일별 정보 없이 집계만 보관
+        self.stats = {'total': 0, 'mislabeled': 0, 'policies': {}, 'reasons': {}}
+
+    def route(self, data, filename, mime_type, settings):
+        """첨부파일 1개 → {'kind', 'format', 'policy', 'reason', 'mislabeled'}"""
+        kind, file_format = sniff_file_type(data, filename)
+        declared_kind = DECLARED_KINDS.get(Path(filename or '').suffix.lower())
+        policy, reason = self._decide(kind, file_format, len(data), settings)
+
+        decision = {
+            'kind': kind,
+            'format': file_format,
+            'policy': policy,
+            'reason': reason,
+            'mislabeled': declared_kind is not None and declared_kind != kind
+        }
+
+        with self._lock:
+            self.stats['total'] += 1
+            self.stats['mislabeled'] += int(decision['mislabeled'])
+            self.stats['policies'][policy] = self.stats['policies'].get(policy, 0) + 1
+            self.stats['reasons'][reason] = self.stats['reasons'].get(reason, 0) + 1
+
+        print(f"[🧭 첨부파일 라우팅] {filename}: {kind}/{file_format} → {policy} ({reason})"
+              + (" [확장자 불일치]" if decision['mislabeled'] else ""))
+        return decision
+
+    def _decide(self, kind, file_format, size, settings):
+        """종류별 정책 → 크기 상한/디코더 유무로 낮춤 → (정책, 사유)"""
+        group = POLICY_GROUPS.get(kind)
+        if group is None:
+            # 처리기가 없는 종류는 최대 metadata_only
+            return self._cap(self._policy(settings, 'otherPolicy'), 'metadata_only'), 'unsupported_type'
+
+        policy, reason = self._policy(settings, f'{group}Policy'), 'type_policy'
+
+        limits = []
+        max_size_mb = settings.get(f'{group}MaxSizeMB')
+        if max_size_mb and size > float(max_size_mb) * 1024 * 1024:
+            limits.append((self._policy(settings, 'oversizePolicy'), 'oversize'))
+        if kind == 'image' and file_format not in self.image_formats:
+            limits.append(('metadata_only', 'decoder_unavailable'))
+
+        # 정책을 실제로 낮춘 제한만 사유로 기록
+        for limit, limit_reason in limits:
+            if POLICY_RANK[limit] < POLICY_RANK[policy]:
+                policy, reason = limit, limit_reason
+
+        return policy, reason
+
+    @staticmethod
+    def _policy(settings, key):
+        policy = settings.get(key)
+        return policy if policy in POLICY_RANK else 'full_ai'
+
+    @staticmethod
+    def _cap(policy, limit):
+        """두 정책 중 처리 수준이 낮은 쪽"""
+        return policy if POLICY_RANK[policy] <= POLICY_RANK[limit] else limit
+
+    def get_info(self):
+        """지원 형식/정책 목록 + 판단 통계 (집계만)"""
+        with self._lock:
+            return {
+                'policies': list(ROUTING_POLICIES),
+                'image_formats': sorted(self.image_formats),
+                'document_kinds': sorted(kind for kind in POLICY_GROUPS if kind != 'image'),
+                'stats': {
+                    'total': self.stats['total'],
+                    'mislabeled': self.stats['mislabeled'],
+                    'policies': dict(self.stats['policies']),
+                    'reasons': dict(self.stats['reasons'])
+                }
+            }
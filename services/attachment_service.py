@@ -1,15 +1,34 @@
 # services/attachment_service.py - 첨부파일 처리 서비스
 
-import os
 import io
-import tempfile
+import email
+import atexit
 import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 import numpy as np
+from flask import current_app, has_app_context
 
 #0824 수정
 from services.genie_qwen import genie_summarize_document
+from services.prompt_budget import fit_text, FALLBACK_INPUT_TOKENS
 #0824 끝
+from services.analysis_cache import AttachmentAnalysisCache
+from services.hierarchical_summarizer import HierarchicalSummarizer
+from models.image_preparation import prepare_image
+from models.ocr_pipeline import prepare_detector_input
+from models.ocr_gate import OcrGate
+from models.db import db
+from models.tables import UserSettings, Mail, MailAttachment, AttachmentTextChunk
+from services.extraction_pool import ExtractionPool, ExtractionFailed
+from services.attachment_router import AttachmentRouter, POLICY_RANK, RESULT_TYPES
+from services.document_extractors import (
+    BudgetedExtraction, CHUNK_MEASURES, iter_pdf_pages_pdfplumber, iter_pdf_pages_pypdf2,
+    iter_docx_blocks, iter_pptx_slides, iter_xlsx_sheets, iter_xls_sheets
+)
 
 # 선택적 임포트 - 없는 라이브러리는 비활성화
 try:
@@ -19,6 +38,14 @@ except ImportError:
     PIL_AVAILABLE = False
     print("[⚠️ PIL/Pillow 없음 - 이미지 처리 비활성화]")
 
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+    HEIF_AVAILABLE = True
+except ImportError:
+    HEIF_AVAILABLE = False
+    print("[⚠️ pillow-heif 없음 - HEIC 이미지는 메타데이터만 기록]")
+
 try:
     import pdfplumber
     PDFPLUMBER_AVAILABLE = True
@@ -47,12 +74,19 @@ except ImportError:
     PPTX_AVAILABLE = False
     print("[⚠️ python-pptx 없음 - PowerPoint 처리 비활성화]")
 
+try:
+    import openpyxl
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+    print("[⚠️ openpyxl 없음 - Excel(.xlsx) 스트리밍 처리 비활성화]")
+
 try:
     import pandas as pd
     PANDAS_AVAILABLE = True
 except ImportError:
     PANDAS_AVAILABLE = False
-    print("[⚠️ pandas 없음 - Excel 처리 비활성화]")
+    print("[⚠️ pandas 없음 - 구형 Excel(.xls) 처리 비활성화]")
 
 try:
     from pdf2image import convert_from_bytes
@@ -62,43 +96,128 @@ except ImportError:
     print("[⚠️ pdf2image 없음 - PDF OCR 처리 비활성화]")
 
 class AttachmentService:
-    def __init__(self, config, ai_models):
+    IMAGE_FORMATS = {'jpeg', 'png', 'gif', 'bmp', 'tiff', 'webp'}  # 매직 바이트로 판별한 디코딩 가능 형식
+    COMPLETED_TEXT_HISTORY = 1000  # 텍스트 길이 재반영용으로 기억할 완료 건수
+    # 같은 파일을 다시 처리해도 결과가 같을 실패 → 실패 결과도 캐시해 매번 워커를 멈추지 않도록
+    # (busy/unavailable/cancelled는 파일이 아니라 풀 상태 때문이므로 캐시하지 않음)
+    CACHED_EXTRACTION_FAILURES = {'timeout', 'memory_limit', 'crashed'}
+    # 보류 분석에서 이 실패는 결과로 기록하지 않고 보류를 유지해 다시 시도
+    RETRYABLE_EXTRACTION_FAILURES = {'busy', 'unavailable', 'cancelled'}
+    # 문서 종류 → 요약 프롬프트에 넣는 이름
+    DOCUMENT_TYPE_LABELS = {
+        'document_pdf': 'PDF 보고서',
+        'document_word': 'Word 문서',
+        'document_presentation': 'PowerPoint 프레젠테이션',
+        'document_spreadsheet': 'Excel 스프레드시트'
+    }
+    
+    def __init__(self, config, ai_models, summarizer=None):
         self.config = config
         self.ai_models = ai_models
-        self.attachment_cache = {}
+        
+        # 긴 텍스트는 청크 요약 → 합치기 (청크 요약은 캐시되어 같은/이어 붙은 텍스트는 재사용)
+        self.summarizer = summarizer or HierarchicalSummarizer(config)
+        self.attachment_cache = OrderedDict()  # 메일 단위 결과 (LRU)
+        
+        # 파일 단위 분석 결과 캐시 (같은 파일은 메일이 달라도 재분석하지 않음)
+        self.analysis_cache = AttachmentAnalysisCache(
+            config.ATTACHMENT_CACHE_DIR,
+            config.ATTACHMENT_CACHE_MAX_BYTES,
+            config.ATTACHMENT_PIPELINE_VERSION
+        )
+        
+        # 매직 바이트 기반 종류 판별 + 종류/크기별 처리 정책
+        self.router = AttachmentRouter(self.IMAGE_FORMATS | ({'heic'} if HEIF_AVAILABLE else set()))
+        
+        # OCR 실행 여부 사전 판단 (텍스트 없는 이미지는 Detector/Recognizer 생략)
+        self.ocr_gate = OcrGate(getattr(ai_models, 'ocr_gate_session', None))
+        
+        # OCR과 동시에 실행할 YOLO 스레드
+        self.image_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='attachment-yolo')
+        
+        # 요약 예산 이후 남은 문서 텍스트 추출 (백그라운드, 한 번에 1개)
+        self.text_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='attachment-text')
+        self._completed_texts = OrderedDict()  # content_hash -> {'text_length', 'summary'} (전체 텍스트 기준)
+        self._text_lock = threading.Lock()
+        
+        # 분석 보류 첨부파일 (조회 요청과 유휴 작업이 같은 파일을 동시에 분석하지 않도록)
+        self._pending_analyses = {}  # (user_email, content_hash) -> 분석 완료 Event
+        self._pending_lock = threading.Lock()
+        
+        # 현재 스레드의 추출 요청 사용자 (사용자별 추출 취소용, extraction_owner()로 지정)
+        self._extraction_owner = threading.local()
+        
+        # 문서 파싱 프로세스 풀 (파일당 시간/메모리 상한, 워커 장애는 해당 파일만 실패 처리)
+        self.extraction_pool = None
+        if config.ATTACHMENT_EXTRACT_PROCESS_POOL:
+            self.extraction_pool = ExtractionPool(
+                num_workers=config.ATTACHMENT_EXTRACT_WORKERS,
+                head_timeout=config.ATTACHMENT_EXTRACT_TIMEOUT_SEC,
+                rest_timeout=config.ATTACHMENT_EXTRACT_REST_TIMEOUT_SEC,
+                max_rss_mb=config.ATTACHMENT_EXTRACT_MAX_RSS_MB
+            )
+            atexit.register(self.extraction_pool.shutdown)
         
         # 사용 가능한 기능 체크
         self.features = {
             'image_processing': PIL_AVAILABLE,
+            'heic_images': HEIF_AVAILABLE,
             'pdf_processing': PDFPLUMBER_AVAILABLE or PYPDF2_AVAILABLE,
             'docx_processing': DOCX_AVAILABLE,
             'pptx_processing': PPTX_AVAILABLE,
-            'xlsx_processing': PANDAS_AVAILABLE,
+            'xlsx_processing': OPENPYXL_AVAILABLE or PANDAS_AVAILABLE,
             'pdf_ocr': PDF2IMAGE_AVAILABLE,
+            'extraction_process_pool': config.ATTACHMENT_EXTRACT_PROCESS_POOL,
             'yolo': hasattr(ai_models, 'load_yolo_model'),
             'ocr': hasattr(ai_models, 'load_ocr_model')
         }
         
         print(f"[📎 첨부파일 서비스 초기화] 사용 가능한 기능: {sum(self.features.values())}/{len(self.features)}")
     
-    def process_email_attachments(self, email_message, email_subject, email_id):
-        """이메일에서 첨부파일을 추출하고 처리 (캐싱 포함)"""
+    def process_email_attachments(self, email_message, email_subject, email_id, ocr_gate_settings=None,
+                                  routing_settings=None):
+        """
+        이메일에서 첨부파일을 추출하고 처리 (캐싱 포함)
+        ocr_gate_settings: 사용자 MY_EMAIL/ATTACHMENT_OCR 설정, routing_settings: 사용자 MY_EMAIL/ATTACHMENT_ROUTING 설정
+        analysisMode가 lazy/idle_only면 종류 판별 + 해시만 기록하고 분석은 보류 (분석 캐시에 있는 파일은 바로 사용)
+        """
         cache_key = f"email_{email_id}"
+        ocr_gate_settings = self._merge_user_settings('ATTACHMENT_OCR', ocr_gate_settings)
+        routing_settings = self._merge_user_settings('ATTACHMENT_ROUTING', routing_settings)
+        defer_analysis = routing_settings.get('analysisMode') in ('lazy', 'idle_only')
         
         # 캐시 확인
         if cache_key in self.attachment_cache:
             print(f"[📎 캐시 사용] {email_subject[:30]}...")
+            self.attachment_cache.move_to_end(cache_key)
             return self.attachment_cache[cache_key]
         
         attachments = []
         print(f"[📎 새로운 첨부파일 처리] {email_subject[:30]}...")
         
         try:
-            for part in email_message.walk():
-                if part.get_content_disposition() == 'attachment':
-                    attachment_info = self._process_single_attachment(part, email_subject)
-                    if attachment_info:
-                        attachments.append(attachment_info)
+            parts = [part for part in email_message.walk() if part.get_content_disposition() == 'attachment']
+            
+            # 파일 내용으로 종류를 판별해 처리 정책 결정 (payload 디코딩도 여기서 한 번만)
+            routed_parts = self._route_parts(parts, routing_settings)
+            
+            # 이미지는 한 번만 디코딩하고, 여러 장이면 YOLO는 한 번의 배치 추론으로 미리 처리
+            prepared_images = {} if defer_analysis else self._prepare_image_parts(routed_parts)
+            batch_detections = self._batch_detect_objects({
+                key: prepared for key, prepared in prepared_images.items()
+                if routed_parts[key]['route']['policy'] == 'full_ai'
+            })
+            
+            for key, routed in enumerate(routed_parts):
+                attachment_info = self._process_single_attachment(
+                    routed, email_subject,
+                    prepared=prepared_images.pop(key, None),
+                    yolo_detections=batch_detections.get(key),
+                    ocr_gate_settings=ocr_gate_settings,
+                    defer_analysis=defer_analysis
+                )
+                if attachment_info:
+                    attachments.append(attachment_info)
         except Exception as e:
             print(f"[❗첨부파일 워킹 오류] {str(e)}")
         
@@ -109,41 +228,167 @@ class AttachmentService:
         print(f"[✅ 첨부파일 처리 완료] {len(attachments)}개 처리됨")
         return attachments
     
-    def _process_single_attachment(self, part, email_subject):
-        """개별 첨부파일 처리"""
-        try:
+    def _merge_user_settings(self, subcategory, user_settings):
+        """MY_EMAIL 하위 설정 기본값 + 사용자 설정 (저장된 값 우선, None 제외)"""
+        merged = UserSettings.get_default_settings('MY_EMAIL', subcategory).copy()
+        for key, value in (user_settings or {}).items():
+            if value is not None:
+                merged[key] = value
+        return merged
+    
+    def _route_parts(self, parts, routing_settings):
+        """첨부파일 파트 → [{'filename', 'data', 'mime_type', 'route'}, ...] (파일명/내용 없는 파트 제외)"""
+        routed_parts = []
+        for part in parts:
             filename = self._decode_filename(part.get_filename())
             if not filename:
-                return None
+                continue
             
             attachment_data = part.get_payload(decode=True)
             if not attachment_data:
-                return None
+                continue
             
-            file_ext = Path(filename).suffix.lower()
             mime_type = part.get_content_type()
+            routed_parts.append({
+                'filename': filename,
+                'data': attachment_data,
+                'mime_type': mime_type,
+                'content_hash': hashlib.sha256(attachment_data).hexdigest(),
+                'route': self.router.route(attachment_data, filename, mime_type, routing_settings)
+            })
+        return routed_parts
+    
+    def _prepare_image_parts(self, routed_parts):
+        """분석 캐시에 없고 분석 대상인 이미지 첨부파일을 미리 디코딩 → {인덱스: PreparedImage}"""
+        if not PIL_AVAILABLE:
+            return {}
+        
+        prepared_images = {}
+        for key, routed in enumerate(routed_parts):
+            route = routed['route']
+            if route['kind'] != 'image' or POLICY_RANK[route['policy']] < POLICY_RANK['text_only']:
+                continue
+            if self.analysis_cache.contains(routed['content_hash']):
+                continue
+            
+            try:
+                prepared_images[key] = prepare_image(routed['data'], self.config.IMAGE_MAX_SIDE)
+            except Exception as e:
+                print(f"[❗이미지 준비 오류] {routed['filename']}: {str(e)}")
+        
+        return prepared_images
+    
+    def _batch_detect_objects(self, prepared_images):
+        """이미지가 2장 이상이면 YOLO 배치 추론 → {인덱스: 탐지 목록}"""
+        if len(prepared_images) < 2 or not self.features['yolo']:
+            return {}
+        yolo_detector = getattr(self.ai_models, 'yolo_detector', None)
+        if not (yolo_detector and yolo_detector.available):
+            return {}
+        
+        keys = list(prepared_images)
+        images = [prepared_images[key].rgb for key in keys]
+        letterboxed = [prepared_images[key].tensor('yolo', yolo_detector.letterbox) for key in keys]
+        
+        results = self.ai_models.detect_objects_batch(images, letterboxed)
+        if results is None:
+            return {}  # 실패 시 이미지별 개별 처리로 폴백
+        
+        return {
+            key: self._simplify_detections(detections)
+            for key, detections in zip(keys, results)
+        }
+    
+    def _process_single_attachment(self, routed, email_subject, prepared=None, yolo_detections=None, ocr_gate_settings=None,
+                                   defer_analysis=False):
+        """
+        개별 첨부파일 처리 (routed: _route_parts 결과 1개)
+        prepared: 미리 디코딩한 이미지, yolo_detections: 배치 추론으로 미리 구한 YOLO 결과
+        defer_analysis: 분석 캐시에 없으면 분석하지 않고 보류 표시만 (analyze_pending_attachment에서 분석)
+        """
+        try:
+            filename = routed['filename']
+            attachment_data = routed['data']
+            route = routed['route']
+            
+            if route['policy'] == 'skip':
+                print(f"[⏭️ 첨부파일 제외] {filename} ({route['reason']})")
+                return None
             
             attachment_info = {
                 'filename': filename,
                 'size': len(attachment_data),
-                'mime_type': mime_type,
-                'extension': file_ext
+                'mime_type': routed['mime_type'],
+                'extension': Path(filename).suffix.lower(),
+                'content_hash': routed['content_hash'],  # 분석 캐시/추출 텍스트 키
+                'detected_type': route['format'],
+                'routing': {
+                    'policy': route['policy'],
+                    'reason': route['reason'],
+                    'mislabeled': route['mislabeled']
+                }
             }
             
-            # 파일 타입별 처리
-            if file_ext in {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp'}:
-                attachment_info.update(self._process_image(attachment_data, filename))
-            elif file_ext == '.pdf' or 'pdf' in mime_type:
-                attachment_info.update(self._process_pdf(attachment_data, filename))
-            elif file_ext == '.docx' or 'wordprocessingml' in mime_type:
-                attachment_info.update(self._process_docx(attachment_data, filename))
-            elif file_ext == '.pptx' or 'presentationml' in mime_type:
-                attachment_info.update(self._process_pptx(attachment_data, filename))
-            elif file_ext in ['.xlsx', '.xls'] or 'spreadsheetml' in mime_type:
-                attachment_info.update(self._process_xlsx(attachment_data, filename))
+            if route['policy'] == 'metadata_only':
+                attachment_info.update({
+                    'type': RESULT_TYPES.get(route['kind'], 'other'),
+                    'processing_method': 'metadata_only'
+                })
+                return attachment_info
+            
+            # 같은 파일의 이전 분석 결과가 있으면 그대로 사용 (파일명 등 메타데이터만 현재 값)
+            cached_analysis = self.analysis_cache.get(attachment_info['content_hash'])
+            
+            # OCR을 건너뛴 결과는 같은 임계값일 때만 재사용 (사용자마다 설정이 다를 수 있음)
+            cached_gate = (cached_analysis or {}).get('ocr_gate') or {}
+            if cached_gate.get('skipped') and ocr_gate_settings and cached_gate.get('thresholds') != ocr_gate_settings:
+                print(f"[🚦 OCR 게이트] 임계값 변경 - 캐시 대신 재분석: {filename}")
+                cached_analysis = None
+            
+            # 텍스트만 처리한 결과는 AI 분석이 필요한 정책에 재사용하지 않음
+            cached_policy = ((cached_analysis or {}).get('routing') or {}).get('policy', 'full_ai')
+            if cached_analysis is not None and POLICY_RANK[cached_policy] < POLICY_RANK[route['policy']]:
+                print(f"[🧭 첨부파일 라우팅] 캐시는 {cached_policy} 결과 - 재분석: {filename}")
+                cached_analysis = None
+            
+            if cached_analysis is not None:
+                print(f"[🗂️ 분석 캐시 사용] {filename}")
+                cached_analysis.update(attachment_info)
+                return cached_analysis
+            
+            if defer_analysis:
+                attachment_info.update({
+                    'type': RESULT_TYPES.get(route['kind'], 'other'),
+                    'processing_method': 'pending',
+                    'analysis_pending': True
+                })
+                return attachment_info
+            
+            # 판별한 종류별 처리 (text_only는 YOLO/LLM 요약 생략)
+            full_ai = route['policy'] == 'full_ai'
+            if route['kind'] == 'image':
+                attachment_info.update(self._process_image(
+                    attachment_data, filename, prepared, yolo_detections, ocr_gate_settings, full_ai=full_ai
+                ))
+            elif route['kind'] == 'pdf':
+                attachment_info.update(self._process_pdf(attachment_data, filename, summarize=full_ai))
+            elif route['kind'] == 'word':
+                attachment_info.update(self._process_docx(attachment_data, filename, summarize=full_ai))
+            elif route['kind'] == 'presentation':
+                attachment_info.update(self._process_pptx(attachment_data, filename, summarize=full_ai))
+            elif route['kind'] == 'spreadsheet':
+                attachment_info.update(self._process_xlsx(attachment_data, filename, summarize=full_ai))
             else:
                 attachment_info.update({'type': 'other', 'processing_method': 'metadata_only'})
             
+            # 앞부분만 추출한 문서는 전체 텍스트를 백그라운드에서 완성한 뒤 캐시
+            complete_text = attachment_info.pop('_complete_text', None)
+            if complete_text is not None:
+                self._schedule_text_completion(attachment_info, complete_text)
+            # 처리 실패(라이브러리 없음/예외)는 다음에 다시 시도하도록 캐시하지 않음 (시간/메모리 초과 등은 캐시)
+            elif not attachment_info.get('error') \
+                    or attachment_info.get('extraction_failure') in self.CACHED_EXTRACTION_FAILURES:
+                self.analysis_cache.put(attachment_info['content_hash'], attachment_info)
             return attachment_info
             
         except Exception as e:
@@ -169,34 +414,44 @@ class AttachmentService:
         
         return filename
     
-    def _process_image(self, attachment_data, filename):
-        """이미지 처리 (YOLO + OCR)"""
+    def _process_image(self, attachment_data, filename, prepared=None, yolo_detections=None, ocr_gate_settings=None,
+                       full_ai=True):
+        """이미지 처리 (디코딩 1회 → YOLO와 OCR을 같은 버퍼로 동시 실행, full_ai=False면 OCR만)"""
         try:
             if not PIL_AVAILABLE:
                 return {'type': 'image', 'error': 'PIL not available', 'processing_method': 'disabled'}
             
-            # YOLO 객체 인식 (ONNX 우선, PyTorch 폴백)
-            yolo_detections = []
-            if self.features['yolo']:
-                # ONNX YOLO 시도
-                if hasattr(self.ai_models, 'yolo_onnx_session') and self.ai_models.yolo_onnx_session:
-                    print("[🚀 YOLO ONNX] 객체 탐지 시작...")
-                    yolo_detections = self._yolo_detect_objects_onnx(attachment_data)
-                # PyTorch YOLO 폴백
-                elif self.ai_models.load_yolo_model():
-                    print("[🚀 YOLO PyTorch] 객체 탐지 시작 (폴백)...")
-                    yolo_detections = self._yolo_detect_objects(attachment_data)
+            if prepared is None:
+                prepared = prepare_image(attachment_data, self.config.IMAGE_MAX_SIDE)
+            print(f"[🖼️ 이미지 준비] {filename}: {prepared.original_size} → {prepared.size}")
+            
+            # YOLO 객체 인식 (배치 결과가 있으면 사용, 없으면 별도 스레드에서 OCR과 동시 실행)
+            yolo_future = None
+            if not full_ai:
+                yolo_detections = []
+            elif yolo_detections is not None:
+                print(f"[🚀 YOLO] 배치 탐지 결과 사용: {len(yolo_detections)}개")
+            else:
+                yolo_future = self.image_executor.submit(self._detect_objects, prepared)
+            
+            # OCR 실행 여부 사전 판단 (작은 이미지/단색/텍스트 없는 사진은 건너뜀)
+            ocr_gate = self.ocr_gate.decide(prepared, ocr_gate_settings or self._merge_user_settings('ATTACHMENT_OCR', None), filename)
             
             # OCR 텍스트 추출
             ocr_result = {'text': '', 'success': False}
             print(f"[🔍 OCR 체크] features['ocr']: {self.features['ocr']}")
-            if self.features['ocr'] and self.ai_models.load_ocr_model():
+            if not ocr_gate['run_ocr']:
+                print(f"[🚦 OCR 건너뜀] {filename}: {ocr_gate['reason']}")
+            elif self.features['ocr'] and self.ai_models.load_ocr_model():
                 print(f"[🔍 OCR 시작] {filename}")
-                ocr_result = self._extract_text_with_ocr(attachment_data, filename)
+                ocr_result = self._extract_text_with_ocr(prepared, filename)
                 print(f"[🔍 OCR 결과] success: {ocr_result.get('success')}, text length: {len(ocr_result.get('text', ''))}")
             else:
                 print(f"[⚠️ OCR 건너뜀] features['ocr']: {self.features['ocr']}")
             
+            if yolo_future is not None:
+                yolo_detections = yolo_future.result()
+            
             result = {
                 'type': 'image',
                 'yolo_detections': yolo_detections,
@@ -204,11 +459,17 @@ class AttachmentService:
                 'object_count': len(yolo_detections),
                 'extracted_text': ocr_result.get('text', ''),
                 'ocr_success': ocr_result.get('success', False),
-                'processing_method': f"YOLO({len(yolo_detections)}) + OCR({ocr_result.get('success', False)})"
+                'ocr_gate': {
+                    'skipped': not ocr_gate['run_ocr'],
+                    'reason': ocr_gate['reason'],
+                    'metrics': ocr_gate['metrics'],
+                    'thresholds': ocr_gate['thresholds']
+                },
+                'processing_method': f"YOLO({len(yolo_detections) if full_ai else 'skipped'}) + OCR({ocr_result.get('success', False) if ocr_gate['run_ocr'] else 'skipped'})"
             }
             
             # 텍스트 요약 생성
-            if ocr_result.get('success') and ocr_result.get('text'):
+            if full_ai and ocr_result.get('success') and ocr_result.get('text'):
                 result['text_summary'] = self._summarize_document(
                     ocr_result['text'], filename, 'image_with_text'
                 )
@@ -219,25 +480,24 @@ class AttachmentService:
             print(f"[❗이미지 처리 오류] {str(e)}")
             return {'type': 'image', 'error': str(e), 'processing_method': 'failed'}
     
-    def _yolo_detect_objects(self, image_data):
+    def _detect_objects(self, prepared):
+        """YOLO 객체 인식 (ONNX 우선, PyTorch 폴백)"""
+        if not self.features['yolo']:
+            return []
+        
+        # ONNX YOLO 시도
+        if hasattr(self.ai_models, 'yolo_onnx_session') and self.ai_models.yolo_onnx_session:
+            print("[🚀 YOLO ONNX] 객체 탐지 시작...")
+            return self._yolo_detect_objects_onnx(prepared)
+        # PyTorch YOLO 폴백
+        if self.ai_models.load_yolo_model():
+            print("[🚀 YOLO PyTorch] 객체 탐지 시작 (폴백)...")
+            return self._yolo_detect_objects(prepared.rgb)
+        return []
+    
+    def _yolo_detect_objects(self, image_np):
         """YOLO 객체 인식"""
         try:
-            if not PIL_AVAILABLE:
-                return []
-            
-            # 이미지 로드 및 전처리
-            image = Image.open(io.BytesIO(image_data))
-            
-            # RGBA → RGB 변환
-            if image.mode in ['RGBA', 'LA']:
-                rgb_image = Image.new('RGB', image.size, (255, 255, 255))
-                rgb_image.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-                image = rgb_image
-            elif image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            image_np = np.array(image)
-            
             # YOLO 추론
             results = self.ai_models.yolo_model(image_np, conf=0.5)
             
@@ -261,68 +521,32 @@ class AttachmentService:
             print(f"[❗YOLO 처리 오류] {str(e)}")
             return []
     
-    def _yolo_detect_objects_onnx(self, image_data):
-        """YOLO ONNX 객체 인식"""
+    def _yolo_detect_objects_onnx(self, prepared):
+        """YOLO ONNX 객체 인식 (준비된 이미지의 레터박스 입력 재사용)"""
         try:
-            if not PIL_AVAILABLE:
-                return []
-            
-            # 이미지 로드 및 전처리
-            image = Image.open(io.BytesIO(image_data))
-            
-            # RGBA → RGB 변환
-            if image.mode in ['RGBA', 'LA']:
-                rgb_image = Image.new('RGB', image.size, (255, 255, 255))
-                rgb_image.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-                image = rgb_image
-            elif image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            image_np = np.array(image)
+            letterboxed = prepared.tensor('yolo', self.ai_models.yolo_detector.letterbox)
             
             # YOLO ONNX 추론
-            detections = self.ai_models.detect_objects_with_yolo_onnx(image_np)
-            
-            # bbox 정보 제거하고 attachment_service에서 사용하는 형식으로 변환
-            simplified_detections = []
-            for det in detections:
-                simplified_detections.append({
-                    'class': det['class'],
-                    'confidence': det['confidence'],
-                    'class_id': det['class_id']
-                })
+            detections = self.ai_models.detect_objects_with_yolo_onnx(prepared.rgb, letterboxed)
             
-            return simplified_detections
+            return self._simplify_detections(detections)
             
         except Exception as e:
             print(f"[❗YOLO ONNX 처리 오류] {str(e)}")
             return []
     
-    def _extract_text_with_ocr(self, attachment_data, filename):
-        """OCR 텍스트 추출"""
+    def _simplify_detections(self, detections):
+        """bbox 정보 제거하고 attachment_service에서 사용하는 형식으로 변환"""
+        return [
+            {'class': det['class'], 'confidence': det['confidence'], 'class_id': det['class_id']}
+            for det in detections
+        ]
+    
+    def _extract_text_with_ocr(self, prepared, filename):
+        """OCR 텍스트 추출 (준비된 이미지 버퍼 사용)"""
         try:
-            if not PIL_AVAILABLE:
-                print(f"[❗OCR] PIL 사용 불가능")
-                return {'text': '', 'success': False, 'error': 'PIL not available'}
-            
-            print(f"[🔍 OCR 시작] 파일명: {filename}, 데이터 크기: {len(attachment_data)} bytes")
-            
-            image = Image.open(io.BytesIO(attachment_data))
-            print(f"[🔍 OCR] 원본 이미지 모드: {image.mode}, 크기: {image.size}")
-            
-            # 이미지 전처리
-            if image.mode in ['RGBA', 'LA']:
-                print(f"[🔍 OCR] 이미지 모드 변환: {image.mode} -> RGB")
-                rgb_image = Image.new('RGB', image.size, (255, 255, 255))
-                rgb_image.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-                image = rgb_image
-            elif image.mode != 'RGB':
-                print(f"[🔍 OCR] 이미지 모드 변환: {image.mode} -> RGB")
-                image = image.convert('RGB')
-            
-            print(f"[🔍 OCR] 최종 이미지 모드: {image.mode}, 크기: {image.size}")
-            image_np = np.array(image)
-            print(f"[🔍 OCR] numpy 배열 형태: {image_np.shape}, dtype: {image_np.dtype}")
+            image_np = prepared.rgb
+            print(f"[🔍 OCR 시작] 파일명: {filename}, numpy 배열 형태: {image_np.shape}, dtype: {image_np.dtype}")
             
             # OCR 수행 (ONNX 우선, EasyOCR API 폴백)
             result = None
@@ -333,7 +557,7 @@ class AttachmentService:
                 (hasattr(self.ai_models, 'easyocr_detector_session') and self.ai_models.easyocr_detector_session and
                  hasattr(self.ai_models, 'easyocr_recognizer_session') and self.ai_models.easyocr_recognizer_session)):
                 print(f"[🚀 OCR] NPU/ONNX 텍스트 추출 시작...")
-                result = self.ai_models.extract_text_from_image_onnx(image_np)
+                result = self.ai_models.extract_text_from_image_onnx(image_np, self._ocr_detector_input(prepared))
                 if result:
                     print(f"[📋 Attachment] OCR 결과 수신 - {len(result)}개 텍스트 영역")
                     if result:
@@ -385,268 +609,485 @@ class AttachmentService:
             print(f"[❗OCR 스택트레이스] {traceback.format_exc()}")
             return {'text': '', 'success': False, 'error': str(e)}
     
-    def _process_pdf(self, attachment_data, filename):
-        """PDF 처리"""
+    def _ocr_detector_input(self, prepared):
+        """OCR Detector 입력 (준비된 이미지당 1회 생성, 실패 시 None → 파이프라인 내부에서 생성)"""
+        try:
+            return prepared.tensor('ocr_detector', prepare_detector_input)
+        except Exception as e:
+            print(f"[⚠️ OCR] Detector 입력 준비 실패: {e}")
+            return None
+    
+    def _process_pdf(self, attachment_data, filename, summarize=True):
+        """PDF 처리 (페이지 단위 스트리밍, 요약 예산을 채우면 나머지 페이지는 백그라운드에서 추출)"""
         if not PDFPLUMBER_AVAILABLE and not PYPDF2_AVAILABLE:
             return {'type': 'document_pdf', 'error': 'PDF libraries not available', 'extraction_success': False}
         
+        extractors = []
+        if PDFPLUMBER_AVAILABLE:
+            extractors.append(('pdfplumber', iter_pdf_pages_pdfplumber))
+        if PYPDF2_AVAILABLE:
+            extractors.append(('pypdf2', iter_pdf_pages_pypdf2))
+        
+        # 텍스트 없이 끝난 앞 라이브러리의 페이지 (다음 라이브러리가 실패하면 이 페이지로 스캔 페이지 OCR)
+        textless_pages = None
         try:
-            # pdfplumber로 텍스트 추출 시도
-            if PDFPLUMBER_AVAILABLE:
-                with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-                    temp_file.write(attachment_data)
-                    temp_file_path = temp_file.name
-                
+            for position, (method, extractor) in enumerate(extractors):
+                is_last = position == len(extractors) - 1
+                stats = {}
                 try:
-                    with pdfplumber.open(temp_file_path) as pdf:
-                        text = ""
-                        for page_num, page in enumerate(pdf.pages):
-                            page_text = page.extract_text()
-                            if page_text:
-                                text += f"\n=== 페이지 {page_num + 1} ===\n{page_text}\n"
-                    
-                    if text.strip():
-                        result = {
-                            'type': 'document_pdf',
-                            'extracted_text': text.strip(),
-                            'extraction_success': True,
-                            'extraction_method': 'pdfplumber',
-                            'pages': len(pdf.pages)
-                        }
-                        
-                        # 문서 요약 생성
-                        result['document_summary'] = self._summarize_document(
-                            text, filename, 'PDF 보고서'
-                        )
-                        
-                        return result
-                        
+                    extraction = self._start_extraction(extractor, attachment_data, stats, measure='strip')
                 except Exception as e:
-                    print(f"[⚠️ pdfplumber 실패] {str(e)}")
-                finally:
+                    print(f"[⚠️ {method} 실패] {str(e)}")
+                    reason = getattr(e, 'reason', 'error')
+                    # 시간/메모리 초과, 워커 종료는 파일당 예산을 다 쓴 것으로 보고 다른 라이브러리로 재시도하지 않음
+                    if is_last or reason != 'error':
+                        if textless_pages:
+                            previous_method, previous_pages = textless_pages
+                            result = self._build_pdf_result(
+                                previous_pages, attachment_data, filename, previous_method, run_ocr=True, summarize=summarize
+                            )
+                            if result:
+                                return result
+                        return {'type': 'document_pdf', 'error': str(e), 'extraction_success': False,
+                                'extraction_failure': reason}
+                    continue
+                
+                page_texts = extraction.head
+                
+                # 예산을 채웠으면 앞쪽 페이지로 요약, 나머지 페이지(스캔 페이지 OCR 포함)는 백그라운드에서 완성
+                if not extraction.exhausted:
                     try:
-                        os.unlink(temp_file_path)
-                    except:
-                        pass
-            
-            # PyPDF2로 재시도
-            if PYPDF2_AVAILABLE:
-                return self._process_pdf_fallback(attachment_data, filename)
-            
-            return {'type': 'document_pdf', 'extraction_success': False, 'error': 'No PDF library available'}
+                        result = self._build_pdf_result(
+                            page_texts, attachment_data, filename, method, run_ocr=False, summarize=summarize
+                        ) or {'type': 'document_pdf', 'extraction_success': False}
+                    except Exception:
+                        extraction.discard()
+                        raise
+                    result.update({
+                        'pages': stats.get('pages', len(page_texts)),
+                        'text_complete': False,
+                        '_complete_text': lambda: self._build_pdf_result(
+                            page_texts + extraction.rest(), attachment_data, filename, method, summarize=False
+                        ) or {}
+                    })
+                    return result
+                
+                # 텍스트가 전혀 없으면 다음 라이브러리로 한 번 더 시도 (스캔 페이지 OCR은 마지막에 한 번만 수행)
+                if any(page_text.strip() for page_text in page_texts) or is_last:
+                    result = self._build_pdf_result(page_texts, attachment_data, filename, method, summarize=summarize)
+                    return result or {'type': 'document_pdf', 'extraction_success': False, 'pages': len(page_texts)}
+                textless_pages = (method, page_texts)
             
         except Exception as e:
             print(f"[❗PDF 처리 오류] {str(e)}")
             return {'type': 'document_pdf', 'error': str(e), 'extraction_success': False}
     
-    def _process_pdf_fallback(self, attachment_data, filename):
-        """PDF 대체 처리 (PyPDF2)"""
-        try:
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-                temp_file.write(attachment_data)
-                temp_file_path = temp_file.name
-            
-            with open(temp_file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page_num, page in enumerate(pdf_reader.pages):
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += f"\n=== 페이지 {page_num + 1} ===\n{page_text}\n"
-            
-            if text.strip():
-                result = {
-                    'type': 'document_pdf',
-                    'extracted_text': text.strip(),
-                    'extraction_success': True,
-                    'extraction_method': 'pypdf2',
-                    'pages': len(pdf_reader.pages)
-                }
+    def _build_pdf_result(self, page_texts, attachment_data, filename, extraction_method, run_ocr=True, summarize=True):
+        """
+        페이지별 텍스트 → PDF 결과, 텍스트가 전혀 없으면 None
+        run_ocr: 텍스트 레이어가 없는 스캔 페이지 OCR 여부, summarize: 문서 요약 생성 여부
+        """
+        min_chars = self.config.PDF_OCR_MIN_PAGE_CHARS
+        image_only_pages = [index for index, page_text in enumerate(page_texts) if len(page_text.strip()) < min_chars]
+        
+        ocr_info = None
+        if not run_ocr:
+            pass
+        elif image_only_pages and self.features['pdf_ocr'] and self.features['ocr'] and self.ai_models.load_ocr_model():
+            page_texts = list(page_texts)
+            ocr_texts, ocr_info = self._ocr_pdf_pages(attachment_data, image_only_pages, filename)
+            for index, ocr_text in ocr_texts.items():
+                page_texts[index] = ocr_text
+        elif image_only_pages:
+            print(f"[⚠️ PDF OCR 불가] {filename}: 텍스트 없는 페이지 {len(image_only_pages)}개 (pdf2image/OCR 없음)")
+        
+        text = ""
+        for page_num, page_text in enumerate(page_texts):
+            if page_text.strip():
+                ocr_mark = " (OCR)" if ocr_info and page_num + 1 in ocr_info['pages'] else ""
+                text += f"\n=== 페이지 {page_num + 1}{ocr_mark} ===\n{page_text}\n"
+        
+        if not text.strip():
+            return None
+        
+        result = {
+            'type': 'document_pdf',
+            'extracted_text': text.strip(),
+            'extraction_success': True,
+            'extraction_method': f"{extraction_method}+ocr" if ocr_info and ocr_info['pages'] else extraction_method,
+            'pages': len(page_texts)
+        }
+        if ocr_info:
+            result['pdf_ocr'] = ocr_info
+        
+        # 문서 요약 생성
+        if summarize:
+            result['document_summary'] = self._summarize_document(
+                text, filename, self.DOCUMENT_TYPE_LABELS['document_pdf']
+            )
+        
+        return result
+    
+    def _rasterize_pdf_page(self, attachment_data, page_number, dpi):
+        """PDF 한 페이지 → RGB numpy 배열 (page_number: 1부터)"""
+        pages = convert_from_bytes(attachment_data, dpi=dpi, first_page=page_number, last_page=page_number)
+        return np.array(pages[0].convert('RGB')) if pages else None
+    
+    def _ocr_pdf_pages(self, attachment_data, page_indexes, filename):
+        """
+        스캔 페이지 OCR → ({페이지 인덱스: 텍스트}, 처리 정보)
+        - 페이지 예산(PDF_OCR_MAX_PAGES)과 시간 예산(PDF_OCR_TIME_BUDGET_SEC) 안에서만 처리
+        - 래스터화는 페이지 단위로 병렬 실행, 다음 묶음을 미리 래스터화하는 동안 현재 묶음을 배치 OCR
+        """
+        import time
+        
+        budget = self.config.PDF_OCR_MAX_PAGES
+        batch_size = max(1, self.config.PDF_OCR_BATCH_PAGES)
+        target_indexes = page_indexes[:budget]
+        batches = [target_indexes[i:i + batch_size] for i in range(0, len(target_indexes), batch_size)]
+        
+        print(f"[📄 PDF OCR] {filename}: 스캔 페이지 {len(page_indexes)}개 중 {len(target_indexes)}개 처리 "
+              f"({self.config.PDF_OCR_DPI} DPI, 묶음 {batch_size}페이지)")
+        
+        ocr_texts = {}
+        timed_out = False
+        started = time.time()
+        
+        with ThreadPoolExecutor(max_workers=self.config.PDF_OCR_PAGE_WORKERS, thread_name_prefix='pdf-raster') as pool:
+            def submit(batch):
+                return [
+                    pool.submit(self._rasterize_pdf_page, attachment_data, index + 1, self.config.PDF_OCR_DPI)
+                    for index in batch
+                ]
+            
+            pending = submit(batches[0]) if batches else []
+            for batch_number, batch in enumerate(batches):
+                futures = pending
+                pending = submit(batches[batch_number + 1]) if batch_number + 1 < len(batches) else []
                 
-                result['document_summary'] = self._summarize_document(
-                    text, filename, 'PDF 보고서'
-                )
+                rendered = []
+                for index, future in zip(batch, futures):
+                    try:
+                        image_np = future.result()
+                        if image_np is not None:
+                            rendered.append((index, image_np))
+                    except Exception as e:
+                        print(f"[❗PDF 래스터화 오류] {filename} 페이지 {index + 1}: {str(e)}")
                 
-                return result
-            
-            return {'type': 'document_pdf', 'extraction_success': False}
-            
-        except Exception as e:
-            return {'type': 'document_pdf', 'error': str(e), 'extraction_success': False}
-        finally:
-            try:
-                os.unlink(temp_file_path)
-            except:
-                pass
+                if rendered:
+                    results = self.ai_models.extract_text_from_images_onnx([image_np for _, image_np in rendered]) or []
+                    for (index, _), regions in zip(rendered, results):
+                        page_text = self._ocr_regions_to_text(regions or [])
+                        if page_text:
+                            ocr_texts[index] = page_text
+                
+                if time.time() - started > self.config.PDF_OCR_TIME_BUDGET_SEC and batch_number + 1 < len(batches):
+                    timed_out = True
+                    for future in pending:
+                        future.cancel()
+                    print(f"[⏱️ PDF OCR] {filename}: 시간 예산 초과, 남은 {sum(len(b) for b in batches[batch_number + 1:])}페이지 생략")
+                    break
+        
+        processed = sum(len(batch) for batch in batches[:batch_number + 1]) if batches else 0
+        ocr_info = {
+            'pages': sorted(index + 1 for index in ocr_texts),
+            'processed_pages': processed,
+            'skipped_pages': len(page_indexes) - processed,
+            'dpi': self.config.PDF_OCR_DPI,
+            'timed_out': timed_out,
+            'elapsed_sec': round(time.time() - started, 2)
+        }
+        print(f"[✅ PDF OCR] {filename}: {len(ocr_texts)}/{processed}페이지 텍스트 인식 ({ocr_info['elapsed_sec']}초)")
+        return ocr_texts, ocr_info
+    
+    def _ocr_regions_to_text(self, regions):
+        """OCR 결과 [[박스, 텍스트, 신뢰도], ...] → 신뢰도 0.3 초과 텍스트 연결"""
+        return " ".join(
+            region[1] for region in regions
+            if len(region) >= 3 and region[2] > 0.3 and region[1]
+        ).strip()
     
-    def _process_docx(self, attachment_data, filename):
+    def _process_docx(self, attachment_data, filename, summarize=True):
         """Word 문서 처리"""
         if not DOCX_AVAILABLE:
             return {'type': 'document_word', 'error': 'python-docx not available', 'extraction_success': False}
         
-        try:
-            with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as temp_file:
-                temp_file.write(attachment_data)
-                temp_file_path = temp_file.name
-            
-            doc = Document(temp_file_path)
-            
-            text = ""
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text += paragraph.text + "\n"
-            
-            # 표 내용도 추출
-            for table in doc.tables:
-                text += "\n=== 표 데이터 ===\n"
-                for row in table.rows:
-                    row_text = []
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            row_text.append(cell.text.strip())
-                    if row_text:
-                        text += " | ".join(row_text) + "\n"
-            
-            if text.strip():
-                result = {
-                    'type': 'document_word',
-                    'extracted_text': text.strip(),
-                    'extraction_success': True,
-                    'paragraphs': len(doc.paragraphs),
-                    'tables': len(doc.tables)
-                }
-                
-                result['document_summary'] = self._summarize_document(
-                    text, filename, 'Word 문서'
-                )
-                
-                return result
-            
-            return {'type': 'document_word', 'extraction_success': False}
-            
-        except Exception as e:
-            return {'type': 'document_word', 'error': str(e), 'extraction_success': False}
-        finally:
-            try:
-                os.unlink(temp_file_path)
-            except:
-                pass
+        return self._process_streamed_document(
+            iter_docx_blocks, attachment_data, filename, 'document_word', summarize
+        )
     
-    def _process_pptx(self, attachment_data, filename):
+    def _process_pptx(self, attachment_data, filename, summarize=True):
         """PowerPoint 처리"""
         if not PPTX_AVAILABLE:
             return {'type': 'document_presentation', 'error': 'python-pptx not available', 'extraction_success': False}
         
+        return self._process_streamed_document(
+            iter_pptx_slides, attachment_data, filename, 'document_presentation', summarize
+        )
+    
+    def _process_xlsx(self, attachment_data, filename, summarize=True):
+        """Excel 처리 (.xlsx는 openpyxl 읽기 전용 스트리밍, ZIP이 아닌 구형 .xls는 pandas)"""
+        if attachment_data[:2] == b'PK':
+            if not OPENPYXL_AVAILABLE:
+                return {'type': 'document_spreadsheet', 'error': 'openpyxl not available', 'extraction_success': False}
+            extractor = iter_xlsx_sheets
+        else:
+            if not PANDAS_AVAILABLE:
+                return {'type': 'document_spreadsheet', 'error': 'pandas not available', 'extraction_success': False}
+            extractor = iter_xls_sheets
+        
+        return self._process_streamed_document(
+            extractor, attachment_data, filename, 'document_spreadsheet', summarize,
+            preview_rows=self.config.SPREADSHEET_PREVIEW_ROWS
+        )
+    
+    def _start_extraction(self, extractor, attachment_data, stats, measure='len', **extractor_kwargs):
+        """
+        요약 예산만큼 추출 → head / exhausted / rest() 객체
+        프로세스 풀을 쓸 수 있으면 워커에서, 아니면 현재 스레드에서 실행 (워커 실패는 ExtractionFailed)
+        """
+        budget = self.config.ATTACHMENT_SUMMARY_BUDGET_CHARS
+        if self.extraction_pool is not None and self.extraction_pool.available:
+            return self.extraction_pool.extract(
+                extractor.__name__, attachment_data, stats, budget, measure,
+                owner=getattr(self._extraction_owner, 'user_email', None), **extractor_kwargs
+            )
+        return BudgetedExtraction(
+            extractor(attachment_data, stats, **extractor_kwargs), budget, measure=CHUNK_MEASURES[measure]
+        )
+    
+    def _process_streamed_document(self, extractor, attachment_data, filename, document_type,
+                                   summarize=True, **extractor_kwargs):
+        """
+        스트리밍 추출 공통 처리 (Word/PowerPoint/Excel)
+        요약 예산만큼 읽은 앞부분으로 요약하고(summarize=False면 생략), 남은 청크는 백그라운드에서 이어서 읽어 전체 텍스트 완성
+        """
+        stats = {}
+        extraction = None
         try:
-            with tempfile.NamedTemporaryFile(suffix='.pptx', delete=False) as temp_file:
-                temp_file.write(attachment_data)
-                temp_file_path = temp_file.name
+            extraction = self._start_extraction(extractor, attachment_data, stats, **extractor_kwargs)
+            head_text = ''.join(extraction.head)
             
-            prs = Presentation(temp_file_path)
+            if not head_text.strip():
+                return {'type': document_type, 'extraction_success': False}
             
-            text = ""
-            for slide_num, slide in enumerate(prs.slides):
-                text += f"\n=== 슬라이드 {slide_num + 1} ===\n"
-                
-                for shape in slide.shapes:
-                    if hasattr(shape, "text") and shape.text.strip():
-                        text += shape.text + "\n"
-                    
-                    if hasattr(shape, 'has_table') and shape.has_table:
-                        text += "\n--- 표 ---\n"
-                        table = shape.table
-                        for row in table.rows:
-                            row_text = []
-                            for cell in row.cells:
-                                if cell.text.strip():
-                                    row_text.append(cell.text.strip())
-                            if row_text:
-                                text += " | ".join(row_text) + "\n"
-            
-            if text.strip():
-                result = {
-                    'type': 'document_presentation',
-                    'extracted_text': text.strip(),
-                    'extraction_success': True,
-                    'slides': len(prs.slides)
-                }
-                
+            result = {
+                'type': document_type,
+                'extracted_text': head_text.strip(),
+                'extraction_success': True
+            }
+            result.update(stats)
+            
+            if summarize:
                 result['document_summary'] = self._summarize_document(
-                    text, filename, 'PowerPoint 프레젠테이션'
+                    head_text, filename, self.DOCUMENT_TYPE_LABELS[document_type]
                 )
+            
+            if not extraction.exhausted:
+                def complete_text():
+                    full_text = head_text + ''.join(extraction.rest())
+                    return dict(stats, extracted_text=full_text.strip())
                 
-                return result
+                result.update({'text_complete': False, '_complete_text': complete_text})
             
-            return {'type': 'document_presentation', 'extraction_success': False}
+            return result
             
+        except ExtractionFailed as e:
+            print(f"[❗문서 추출 실패] {filename}: {e.reason} - {str(e)}")
+            return {'type': document_type, 'error': str(e), 'extraction_success': False, 'extraction_failure': e.reason}
         except Exception as e:
-            return {'type': 'document_presentation', 'error': str(e), 'extraction_success': False}
-        finally:
-            try:
-                os.unlink(temp_file_path)
-            except:
-                pass
+            if extraction is not None and hasattr(extraction, 'discard'):
+                extraction.discard()
+            return {'type': document_type, 'error': str(e), 'extraction_success': False}
     
-    def _process_xlsx(self, attachment_data, filename):
-        """Excel 처리"""
-        if not PANDAS_AVAILABLE:
-            return {'type': 'document_spreadsheet', 'error': 'pandas not available', 'extraction_success': False}
+    def _schedule_text_completion(self, attachment_info, complete_text):
+        """남은 텍스트 추출을 백그라운드로 실행 (요청 중이면 앱 컨텍스트를 넘겨 DB에도 반영)"""
+        app = current_app._get_current_object() if has_app_context() else None
+        self.text_executor.submit(self._complete_text, dict(attachment_info), complete_text, app)
+    
+    def _complete_text(self, attachment_info, complete_text, app):
+        """
+        전체 텍스트 완성 → 추출 텍스트 저장소/첨부파일 행 길이/분석 캐시 갱신
+        앞부분으로 요약한 문서는 전체 텍스트로 다시 요약 (앞부분 청크 요약은 캐시에서 재사용)
+        """
+        content_hash = attachment_info['content_hash']
+        filename = attachment_info.get('filename')
+        try:
+            attachment_info.update(complete_text())
+            attachment_info['text_complete'] = True
+            full_text = attachment_info.get('extracted_text') or ''
+            
+            summary = None
+            if attachment_info.get('document_summary') and full_text:
+                summary = self._summarize_document(
+                    full_text, filename, self.DOCUMENT_TYPE_LABELS.get(attachment_info.get('type'), '문서')
+                )
+                attachment_info['document_summary'] = summary
+            
+            if app is not None and full_text:
+                with app.app_context():
+                    AttachmentTextChunk.replace_text(content_hash, full_text)
+                    MailAttachment.update_text_length(content_hash, len(full_text))
+                    if summary:
+                        MailAttachment.update_summary(content_hash, 'document_summary', summary)
+            
+            with self._text_lock:
+                self._completed_texts[content_hash] = {'text_length': len(full_text), 'summary': summary}
+                while len(self._completed_texts) > self.COMPLETED_TEXT_HISTORY:
+                    self._completed_texts.popitem(last=False)
+            
+            self.analysis_cache.put(content_hash, attachment_info)
+            print(f"[📄 전체 텍스트 완성] {filename}: {len(full_text)}자")
+            
+        except ExtractionFailed as e:
+            # 나머지 추출이 시간/메모리 상한에 걸린 파일은 앞부분 결과를 그대로 캐시 (다음에 다시 멈추지 않도록)
+            print(f"[❗전체 텍스트 추출 실패] {filename}: {e.reason} - {str(e)}")
+            if e.reason in self.CACHED_EXTRACTION_FAILURES:
+                attachment_info['extraction_failure'] = e.reason
+                self.analysis_cache.put(content_hash, attachment_info)
+        except Exception as e:
+            print(f"[❗전체 텍스트 추출 오류] {filename}: {str(e)}")
+    
+    def analyze_on_access(self, user_email, attachment_rows):
+        """
+        조회 시점 분석 (/api/document-summary, /api/attachment-info)
+        분석 보류 행만 분석하며, idle_only 사용자는 유휴 작업에 맡김 → 분석한 행 수
+        """
+        pending_rows = [row for row in attachment_rows if row.analysis_pending]
+        if not pending_rows:
+            return 0
+        
+        routing_settings = UserSettings.get_or_create(user_email, 'MY_EMAIL', 'ATTACHMENT_ROUTING').settings_data
+        if self._merge_user_settings('ATTACHMENT_ROUTING', routing_settings).get('analysisMode') == 'idle_only':
+            return 0
+        
+        for row in pending_rows:
+            self.analyze_pending_attachment(row)
+        return len(pending_rows)
+    
+    def analyze_pending_attachment(self, attachment_row):
+        """
+        분석 보류된 첨부파일 분석 → 같은 사용자의 같은 원본 해시 보류 행 갱신 (앱 컨텍스트 필요)
+        같은 사용자의 같은 파일을 다른 스레드가 분석 중이면 끝날 때까지 기다렸다가 그 결과를 사용
+        """
+        content_hash = attachment_row.content_hash
+        user_email = attachment_row.user_email
+        pending_key = (user_email, content_hash)
+        with self._pending_lock:
+            done_event = self._pending_analyses.get(pending_key)
+            is_owner = done_event is None
+            if is_owner:
+                done_event = self._pending_analyses[pending_key] = threading.Event()
+        
+        if not is_owner:
+            done_event.wait(timeout=self.config.ATTACHMENT_LAZY_WAIT_SEC)
+            db.session.commit()  # 다른 스레드가 저장한 결과를 읽도록 트랜잭션 종료 (행은 다시 로드됨)
+            return
         
         try:
-            with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as temp_file:
-                temp_file.write(attachment_data)
-                temp_file_path = temp_file.name
-            
-            xl_file = pd.ExcelFile(temp_file_path)
-            
-            text = ""
-            total_rows = 0
-            
-            for sheet_name in xl_file.sheet_names:
-                df = pd.read_excel(temp_file_path, sheet_name=sheet_name)
-                
-                if not df.empty:
-                    text += f"\n=== 시트: {sheet_name} ===\n"
-                    text += "컬럼: " + " | ".join(str(col) for col in df.columns) + "\n\n"
-                    
-                    for idx, row in df.head(20).iterrows():
-                        row_text = []
-                        for value in row:
-                            if pd.notna(value):
-                                row_text.append(str(value))
-                            else:
-                                row_text.append("")
-                        text += " | ".join(row_text) + "\n"
-                    
-                    total_rows += len(df)
-                    
-                    if len(df) > 20:
-                        text += f"... (총 {len(df)}행 중 처음 20행만 표시)\n"
-            
-            if text.strip():
-                result = {
-                    'type': 'document_spreadsheet',
-                    'extracted_text': text.strip(),
-                    'extraction_success': True,
-                    'sheets': len(xl_file.sheet_names),
-                    'total_rows': total_rows
-                }
-                
-                result['document_summary'] = self._summarize_document(
-                    text, filename, 'Excel 스프레드시트'
+            with self.extraction_owner(user_email):
+                attachment_info = self._analyze_stored_attachment(attachment_row)
+            if self._is_retryable_analysis(attachment_info):
+                attempts = MailAttachment.defer_analysis(
+                    user_email, content_hash, self.config.ATTACHMENT_ANALYSIS_RETRY_BASE_SEC
                 )
-                
-                return result
-            
-            return {'type': 'document_spreadsheet', 'extraction_success': False}
-            
+                if attempts < self.config.ATTACHMENT_ANALYSIS_MAX_ATTEMPTS:
+                    print(f"[⚠️ 보류 분석 재시도 예정] {attachment_row.filename}: {attempts}회 실패 "
+                          f"({(attachment_info or {}).get('extraction_failure', '처리 오류')})")
+                    return
+                attachment_info = attachment_info or dict(
+                    self._metadata_info(attachment_row), error='첨부파일 처리 실패 (재시도 횟수 초과)'
+                )
+            updated = MailAttachment.apply_analysis(user_email, content_hash, attachment_info)
+            # 전체 텍스트 추출이 행 갱신보다 먼저 끝났으면 길이 재반영
+            if attachment_info.get('text_complete') is False:
+                self.sync_completed_texts([content_hash])
+            print(f"[🕒 보류 분석 완료] {attachment_info.get('filename')}: {updated}개 행 갱신")
         except Exception as e:
-            return {'type': 'document_spreadsheet', 'error': str(e), 'extraction_success': False}
+            db.session.rollback()
+            print(f"[❗보류 분석 오류] {attachment_row.filename}: {str(e)}")
         finally:
+            with self._pending_lock:
+                self._pending_analyses.pop(pending_key, None)
+            done_event.set()
+    
+    def _is_retryable_analysis(self, attachment_info):
+        """보류 분석 결과가 일시적 실패인지 (추출 워커 대기 초과/워커 없음/취소, 처리 중 예외)"""
+        if attachment_info is None:
+            return True
+        return attachment_info.get('extraction_failure') in self.RETRYABLE_EXTRACTION_FAILURES
+    
+    @staticmethod
+    def _metadata_info(attachment_row):
+        """분석 없이 저장된 파일 정보만으로 만든 결과"""
+        stored_info = attachment_row.to_dict()
+        stored_info.pop('analysis_pending', None)
+        return dict(stored_info, processing_method='metadata_only')
+    
+    def _analyze_stored_attachment(self, attachment_row):
+        """
+        저장된 원본 메일에서 첨부파일을 다시 꺼내 분석 (원본이 없거나 제외된 파일은 파일 정보만)
+        처리 중 예외로 결과가 없으면 None (다시 시도)
+        """
+        metadata_info = self._metadata_info(attachment_row)
+        
+        mail = Mail.query.filter_by(user_email=attachment_row.user_email, mail_id=attachment_row.mail_id).first()
+        if not mail or not mail.raw_message:
+            return dict(metadata_info, error='원본 메일 없음')
+        
+        routed = self._find_stored_part(email.message_from_string(mail.raw_message), attachment_row.content_hash)
+        if routed is None:
+            return dict(metadata_info, error='원본 첨부파일 없음')
+        
+        routing_settings = UserSettings.get_or_create(attachment_row.user_email, 'MY_EMAIL', 'ATTACHMENT_ROUTING').settings_data
+        ocr_gate_settings = UserSettings.get_or_create(attachment_row.user_email, 'MY_EMAIL', 'ATTACHMENT_OCR').settings_data
+        routed['route'] = self.router.route(
+            routed['data'], routed['filename'], routed['mime_type'],
+            self._merge_user_settings('ATTACHMENT_ROUTING', routing_settings)
+        )
+        
+        if routed['route']['policy'] == 'skip':
+            return metadata_info
+        
+        return self._process_single_attachment(
+            routed, mail.subject or '',
+            ocr_gate_settings=self._merge_user_settings('ATTACHMENT_OCR', ocr_gate_settings)
+        )
+    
+    def _find_stored_part(self, email_message, content_hash):
+        """원본 메일에서 해시가 같은 첨부파일 파트 찾기 → {'filename', 'data', 'mime_type', 'content_hash'}"""
+        for part in email_message.walk():
+            if part.get_content_disposition() != 'attachment':
+                continue
+            attachment_data = part.get_payload(decode=True)
+            if not attachment_data or hashlib.sha256(attachment_data).hexdigest() != content_hash:
+                continue
+            return {
+                'filename': self._decode_filename(part.get_filename()) or 'attachment',
+                'data': attachment_data,
+                'mime_type': part.get_content_type(),
+                'content_hash': content_hash
+            }
+        return None
+    
+    def sync_completed_texts(self, content_hashes):
+        """
+        백그라운드 추출이 첨부파일 행 저장보다 먼저 끝난 경우 텍스트 길이/전체 요약 재반영
+        (일괄 저장 flush 이후 호출, 앱 컨텍스트 필요)
+        """
+        with self._text_lock:
+            completed = {
+                content_hash: self._completed_texts[content_hash]
+                for content_hash in content_hashes if content_hash in self._completed_texts
+            }
+        
+        for content_hash, completed_text in completed.items():
             try:
-                os.unlink(temp_file_path)
-            except:
-                pass
+                MailAttachment.update_text_length(content_hash, completed_text['text_length'])
+                if completed_text['summary']:
+                    MailAttachment.update_summary(content_hash, 'document_summary', completed_text['summary'])
+            except Exception as e:
+                print(f"[⚠️ 텍스트 길이 갱신 실패] {content_hash[:12]}: {str(e)}")
     
 #     def _summarize_document(self, text, filename, file_type):
 #         """문서 요약 생성 (Qwen 1.5-1.8B 모델 사용)"""
@@ -719,17 +1160,20 @@ class AttachmentService:
     def _summarize_document(self, text, filename, file_type):
         """문서 요약 생성 (Qwen 1.5-1.8B 모델 사용)"""
         try:
-        # 1) NPU(Genie) 경로
+        # 1) NPU(Genie) 경로 - 짧으면 한 번에, 길면 청크 요약 → 합치기
             print("문서 요약 NPU 성공 ")
-            return genie_summarize_document(text, filename, file_type, max_words=25, max_chars=800)
+            return self.summarizer.summarize(
+                text, file_type,
+                lambda short_text: genie_summarize_document(short_text, filename, file_type, max_words=25),
+                title=filename
+            )
         except Exception as ge:
             print(f"[⚠️ Genie 요약 실패] {ge}")
 
 
         
         try:
-            if len(text) > 600:
-                text = text[:600]
+            text = fit_text(text, FALLBACK_INPUT_TOKENS)
             
             # Qwen 모델로 요약 시도
             if self.ai_models.load_qwen_model():
@@ -793,10 +1237,9 @@ class AttachmentService:
       
     
     def _manage_cache_size(self):
-        """캐시 크기 관리"""
-        if len(self.attachment_cache) > self.config.MAX_CACHE_SIZE:
-            oldest_key = next(iter(self.attachment_cache))
-            del self.attachment_cache[oldest_key]
+        """캐시 크기 관리 (가장 오래 사용하지 않은 항목부터 삭제)"""
+        while len(self.attachment_cache) > self.config.MAX_CACHE_SIZE:
+            oldest_key, _ = self.attachment_cache.popitem(last=False)
             print(f"[🗑️ 캐시 정리] 오래된 항목 삭제: {oldest_key}")
     
     def generate_attachment_summary(self, attachments):
@@ -861,8 +1304,38 @@ class AttachmentService:
         """캐시 초기화"""
         cache_count = len(self.attachment_cache)
         self.attachment_cache.clear()
+        cache_count += self.analysis_cache.clear()
         return cache_count
     
     def get_available_features(self):
-        """사용 가능한 기능 목록 반환"""
-        return self.features
\ No newline at end of file
+        """사용 가능한 기능 목록 + 첨부파일 라우팅 정보(지원 형식/정책/판단 통계) 반환"""
+        return dict(self.features, routing=self.router.get_info())
+    
+    @contextmanager
+    def extraction_owner(self, user_email):
+        """이 블록에서 시작한 문서 추출을 user_email 사용자 요청으로 표시 (cancel_extractions 대상)"""
+        previous = getattr(self._extraction_owner, 'user_email', None)
+        self._extraction_owner.user_email = user_email
+        try:
+            yield
+        finally:
+            self._extraction_owner.user_email = previous
+    
+    def cancel_extractions(self, user_email):
+        """해당 사용자의 진행 중인 문서 추출 취소 (해당 파일은 실패 처리, 워커는 재시작)"""
+        if self.extraction_pool is not None:
+            self.extraction_pool.cancel(user_email)
+    
+    def get_extraction_stats(self):
+        """문서 추출 프로세스 풀 통계 (워커 수, 요청 수, 사유별 실패 수, 재시작 수)"""
+        if self.extraction_pool is None:
+            return {'enabled': False}
+        return dict(self.extraction_pool.get_stats(), enabled=True)
+    
+    def get_summary_stats(self):
+        """계층 요약 통계 (한 번에/청크 요약 횟수, 청크 캐시 적중 수)"""
+        return self.summarizer.get_stats()
+    
+    def get_ocr_gate_stats(self):
+        """OCR 게이트 판단 통계 (건너뛴 비율, 사유별 횟수)"""
+        return self.ocr_gate.get_stats()
\ No newline at end of file
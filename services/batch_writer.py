@@ -0,0 +1,131 @@
+"""
+DB 일괄 저장 서비스 (write-behind)
+
+메일/할일 행을 메모리에 모았다가 청크 단위로 bulk insert 합니다.
+- 청크당 하나의 트랜잭션으로 커밋
+- 청크 저장 실패 시 행 단위 SAVEPOINT로 재시도 → 문제 행만 건너뜀
+"""
+from sqlalchemy.exc import IntegrityError
+from models.tables import Mail, MailAttachment, AttachmentTextChunk, Todo
+from models.db import db
+
+class BatchWriter:
+    """Mail / MailAttachment / Todo 일괄 저장기"""
+
+    DEFAULT_CHUNK_SIZE = 100
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size or self.DEFAULT_CHUNK_SIZE
+        # 저장 순서 유지 (메일 → 첨부파일 → 추출 텍스트 → 할일)
+        self._pending = {Mail: [], MailAttachment: [], AttachmentTextChunk: [], Todo: []}
+        self._text_hashes = set()  # 이번 배치에서 이미 대기열에 넣은 텍스트 해시
+        self.stats = {
+            'inserted': 0,
+            'conflicts': 0,
+            'failed': 0
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 예외가 나도 이미 모은 행은 저장 시도
+        self.flush()
+        return False
+
+    def add_mail(self, mapping):
+        """저장할 메일 행 추가 (Mail 컬럼 속성명 기준 dict)"""
+        self._add(Mail, mapping)
+
+    def add_attachment(self, mapping):
+        """저장할 첨부파일 행 추가 (MailAttachment 컬럼 속성명 기준 dict)"""
+        self._add(MailAttachment, mapping)
+
+    def add_attachment_text(self, content_hash, text):
+        """첨부파일 추출 텍스트 저장 (같은 해시는 한 번만 압축/저장)"""
+        if not content_hash or not text or content_hash in self._text_hashes:
+            return
+        self._text_hashes.add(content_hash)
+        if AttachmentTextChunk.exists(content_hash):
+            return
+        # 저장이 중간에 끊겨 일부 청크만 남은 텍스트는 지우고 다시 저장 (다음 청크 저장과 같은 트랜잭션)
+        AttachmentTextChunk.delete_text(content_hash)
+        for mapping in AttachmentTextChunk.build_mappings(content_hash, text):
+            self._add(AttachmentTextChunk, mapping)
+
+    def add_todo(self, mapping):
+        """저장할 할일 행 추가 (Todo 컬럼 속성명 기준 dict)"""
+        self._add(Todo, mapping)
+
+    def pending_count(self):
+        """아직 저장되지 않은 행 수"""
+        return sum(len(rows) for rows in self._pending.values())
+
+    def _add(self, model, mapping):
+        rows = self._pending[model]
+        rows.append(mapping)
+        if len(rows) >= self.chunk_size:
+            # 첨부파일은 부모 메일이 먼저 저장되어야 하므로 앞 순서 모델까지 함께 저장
+            for pending_model in self._pending:
+                self._flush_model(pending_model)
+                if pending_model is model:
+                    break
+
+    def flush(self):
+        """모든 대기 행 저장 후 누적 통계 반환"""
+        for model in self._pending:
+            self._flush_model(model)
+
+        print(f"[💾 일괄저장] 저장 {self.stats['inserted']}개, 중복 {self.stats['conflicts']}개, 실패 {self.stats['failed']}개")
+        return dict(self.stats)
+
+    def _flush_model(self, model):
+        """특정 모델의 대기 행을 청크 단위로 저장"""
+        rows = self._pending[model]
+        self._pending[model] = []
+
+        for start in range(0, len(rows), self.chunk_size):
+            chunk = rows[start:start + self.chunk_size]
+            try:
+                db.session.bulk_insert_mappings(model, chunk)
+                db.session.commit()
+                self.stats['inserted'] += len(chunk)
+                print(f"[💾 일괄저장] {model.__tablename__} {len(chunk)}개 저장 완료")
+            except Exception as e:
+                db.session.rollback()
+                print(f"[⚠️ 일괄저장] {model.__tablename__} 청크 저장 실패, 행 단위 재시도: {str(e)[:100]}")
+                self._insert_rows_individually(model, chunk)
+
+    def _insert_rows_individually(self, model, chunk):
+        """행마다 SAVEPOINT를 걸어 저장 - 충돌 행만 건너뛰고 나머지는 한 번에 커밋"""
+        for row in chunk:
+            try:
+                with db.session.begin_nested():
+                    db.session.bulk_insert_mappings(model, [row])
+                self.stats['inserted'] += 1
+            except IntegrityError as e:
+                self.stats['conflicts'] += 1
+                if "Duplicate entry" in str(e) or "UNIQUE constraint" in str(e):
+                    print(f"[🔄 중복 감지 건너뛰기] {model.__tablename__}: {self._describe_row(model, row)}")
+                else:
+                    print(f"[❗ 제약조건 위반] {model.__tablename__}: {self._describe_row(model, row)} - {str(e)[:100]}")
+            except Exception as e:
+                self.stats['failed'] += 1
+                print(f"[❗ 저장 오류] {model.__tablename__}: {self._describe_row(model, row)} - {str(e)[:100]}")
+
+        try:
+            db.session.commit()
+        except Exception as e:
+            print(f"[❗ 일괄저장 커밋 실패] {str(e)}")
+            db.session.rollback()
+
+    @staticmethod
+    def _describe_row(model, row):
+        """로그용 행 요약"""
+        if model is Mail:
+            return f"{row.get('mail_id')} ({(row.get('subject') or '')[:30]})"
+        if model is AttachmentTextChunk:
+            return f"{row.get('content_hash', '')[:12]}#{row.get('chunk_index')}"
+        if model is MailAttachment:
+            return f"{row.get('mail_id')}/{(row.get('filename') or '')[:30]}"
+        return f"{(row.get('title') or '')[:30]} ({row.get('type')})"
@@ -0,0 +1,310 @@
+"""
+메일 본문 정규화 (AI 단계 입력용 "새 내용" 추출)
+
+답장/전달 메일에 딸려 오는 이전 대화, 서명, 법적 고지문을 걷어내 분류/요약/할일 추출에 넣을 텍스트를 줄입니다.
+- 본문 추출: text/plain 파트를 구분해 이어 붙이고, text/plain이 없으면 text/html을 텍스트로 변환
+- 인용 블록: '>' 인용 줄, 답장 머리글(On ... wrote: / ...님이 작성: / -----Original Message----- / Outlook 머리글 블록)
+- 전달 메일: 전달 머리글 앞에 새 내용이 없으면 전달된 본문을 새 내용으로 사용
+- 서명: '-- ' 구분선, 모바일 서명(Sent from my iPhone / iPhone에서 보냄), 맺음말 뒤 짧은 연락처 블록
+- 고지문: 기밀/수신 대상/수신거부 등 법적 고지·광고 문단 (한국어/영어)
+저장되는 원문 본문은 그대로 두고 new_content만 AI 단계에서 사용합니다.
+"""
+import re
+from html.parser import HTMLParser
+
+# 답장 머리글 (이 줄부터 아래는 이전 대화)
+REPLY_HEADER_PATTERNS = [
+    re.compile(r'^On\s.{1,300}\swrote:$', re.IGNORECASE),
+    re.compile(r'^.{1,300}님이\s*작성:$'),
+    re.compile(r'^-{2,}\s*(Original Message|원본 메시지|원래 메시지)\s*-{2,}$', re.IGNORECASE),
+]
+# 전달 머리글
+FORWARD_HEADER_PATTERNS = [
+    re.compile(r'^-{2,}\s*(Forwarded message|전달된 메일|전달된 메시지)\s*-{2,}$', re.IGNORECASE),
+    re.compile(r'^Begin forwarded message:$', re.IGNORECASE),
+]
+# Outlook 스타일 머리글 블록 (From: 다음 몇 줄 안에 Sent:/Date:가 오면 이전 대화 시작)
+HEADER_FROM = re.compile(r'^(From|보낸 사람)\s*:', re.IGNORECASE)
+HEADER_FIELDS = re.compile(r'^(From|Sent|Date|To|Cc|Subject|보낸 사람|보낸 날짜|날짜|받는 사람|참조|제목)\s*:', re.IGNORECASE)
+HEADER_SENT = re.compile(r'^(Sent|Date|보낸 날짜|날짜)\s*:', re.IGNORECASE)
+
+SIGNATURE_DELIMITER = re.compile(r'^--\s?$')
+MOBILE_SIGNATURE = re.compile(
+    r'^(Sent from my .+|Sent from (Mail|Outlook) for .+|Get Outlook for .+|.{1,30}에서 보냄)$', re.IGNORECASE
+)
+CLOSING_LINE = re.compile(
+    r'^((감사합니다|고맙습니다|수고하세요|Best regards|Kind regards|Warm regards|Regards|Best|Thanks|Thank you|Cheers|Sincerely)[.,!]*'
+    r'|.{1,20}\s(드림|올림)\.?)$',
+    re.IGNORECASE
+)
+SIGNATURE_BLOCK_MAX_LINES = 6   # 맺음말 뒤 이 줄 수 이하의 짧은 블록만 서명으로 판단
+SIGNATURE_LINE_MAX_CHARS = 80
+SIGNATURE_NAME_MAX_LINES = 3    # 연락처 패턴 없이 이름처럼 보이는 줄은 이 수까지만 허용
+
+# 서명 블록의 연락처 줄 (이메일/전화/URL/직함·회사)
+CONTACT_PATTERNS = [
+    re.compile(r'[\w.+-]+@[\w-]+(\.[\w-]+)+'),
+    re.compile(r'(\+?\d[\d\s().-]{6,}\d)'),
+    re.compile(r'(https?://|www\.)\S+', re.IGNORECASE),
+    re.compile(r'^(tel|phone|mobile|mob|cell|fax|e-?mail|web|address|전화|휴대폰|핸드폰|팩스|주소|이메일|메일)\s*[.:)]', re.IGNORECASE),
+    re.compile(
+        r'\b(CEO|CTO|CFO|COO|VP|Director|Manager|Engineer|Developer|Researcher|Professor|Lead|Head|Officer|'
+        r'Specialist|Analyst|Consultant|Intern|Team|Dept|Department|Inc|Ltd|LLC|Corp|Co|Company|University|Lab)\b\.?',
+        re.IGNORECASE
+    ),
+    re.compile(r'(주식회사|\(주\)|㈜|대표|이사|부장|차장|과장|대리|주임|사원|팀장|실장|본부장|연구원|교수|팀|본부|연구소|대학교|센터)'),
+]
+# 문장처럼 끝나는 줄 (요청/안내 내용일 수 있으므로 서명으로 지우지 않음)
+SENTENCE_ENDING = re.compile(r'([다요죠까네]|니다|세요)\s*[.!?~]*$|[.!?]$')
+TRAILING_ABBREVIATION = re.compile(r'\b(Inc|Ltd|Co|Corp|Jr|Sr|Dept)\.$', re.IGNORECASE)
+WORD = re.compile(r'[^\W_]+')
+NAME_LINE_MAX_WORDS = 4
+
+# 법적 고지/광고 문단 키워드
+FOOTER_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE) for pattern in (
+        r'confidential', r'intended (solely |only )?for', r'not the intended recipient', r'privileged',
+        r'disclaimer', r'unsubscribe', r'수신\s*거부', r'발신\s*전용', r'회신되지\s*않', r'기밀',
+        r'무단\s*(배포|복제|전재|사용)', r'의도(된|하지 않은)\s*수신', r'법적\s*(책임|제재)', r'광고성\s*정보'
+    )
+]
+# 키워드가 1개뿐인 뒤쪽 문단은 고지문 모양(길고 요청/날짜 표현 없음)일 때만 제거
+FOOTER_MIN_CHARS = 80
+REQUEST_OR_DATE = re.compile(
+    r'\b(please|kindly|could you|can you|let me know|review|send|by (mon|tues|wednes|thurs|fri|satur|sun)day|'
+    r'(mon|tues|wednes|thurs|fri|satur|sun)day|today|tomorrow|tonight|deadline|due|asap|'
+    r'jan(uary)?|feb(ruary)?|mar(ch)?|apr(il)?|jun(e)?|jul(y)?|aug(ust)?|sep(tember)?|oct(ober)?|nov(ember)?|dec(ember)?)\b'
+    r'|\d{1,2}/\d{1,2}|\d{4}-\d{1,2}-\d{1,2}|\d{1,2}\s*월\s*\d{1,2}\s*일|[월화수목금토일]요일|오늘|내일|모레|이번\s*주|다음\s*주|까지'
+    r'|부탁|요청|검토|확인\s*(해|하여|부탁)|주세요|주십시오',
+    re.IGNORECASE
+)
+
+
+def extract_body_text(msg):
+    """메일 → 본문 텍스트 (text/plain 파트 우선, 없으면 text/html 변환)"""
+    plain_parts = []
+    html_parts = []
+    for part in (msg.walk() if msg.is_multipart() else [msg]):
+        if part.is_multipart() or part.get_content_disposition() == 'attachment':
+            continue
+        content_type = part.get_content_type()
+        if content_type not in ('text/plain', 'text/html'):
+            continue
+
+        payload = part.get_payload(decode=True)
+        if not payload:
+            continue
+        text = payload.decode(part.get_content_charset() or 'utf-8', errors='ignore')
+        (plain_parts if content_type == 'text/plain' else html_parts).append(text)
+
+    if plain_parts:
+        return "\n\n".join(text.strip() for text in plain_parts).strip()
+    return html_to_text("\n".join(html_parts))
+
+
+class _HtmlTextParser(HTMLParser):
+    """HTML → 텍스트 (블록 태그는 줄바꿈, blockquote 안은 '>' 인용 줄)"""
+
+    BLOCK_TAGS = {'p', 'div', 'br', 'li', 'tr', 'table', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'blockquote', 'pre'}
+    SKIP_TAGS = {'script', 'style', 'head', 'title'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip_depth = 0
+        self._quote_depth = 0
+
+    def _newline(self):
+        self.parts.append("\n" + "> " * self._quote_depth)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == 'blockquote':
+            self._quote_depth += 1
+            self._newline()
+        elif tag in self.BLOCK_TAGS:
+            self._newline()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in self.BLOCK_TAGS:
+            self._newline()
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == 'blockquote':
+            self._quote_depth = max(0, self._quote_depth - 1)
+            self._newline()
+        elif tag in self.BLOCK_TAGS:
+            self._newline()
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        data = re.sub(r'\s+', ' ', data)
+        if data.strip():
+            self.parts.append(data)
+
+
+def html_to_text(html):
+    """HTML 본문 → 줄 단위 텍스트"""
+    if not html or not html.strip():
+        return ""
+    parser = _HtmlTextParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        return re.sub(r'<[^>]+>', ' ', html).strip()
+
+    lines = [line.strip() for line in ''.join(parser.parts).splitlines()]
+    text = "\n".join(line for line in lines if line not in ('', '>'))
+    return text.strip()
+
+
+def _find_thread_break(lines):
+    """이전 대화/전달 시작 줄 → (인덱스, 'reply' | 'forward'), 없으면 (None, None)"""
+    for index, line in enumerate(lines):
+        stripped = line.strip()
+        # 두 줄로 접힌 답장 머리글 (On ... <\naddr> wrote:)
+        joined = f"{stripped} {lines[index + 1].strip()}" if index + 1 < len(lines) else stripped
+
+        if any(pattern.match(stripped) for pattern in FORWARD_HEADER_PATTERNS):
+            return index, 'forward'
+        if any(pattern.match(stripped) or pattern.match(joined) for pattern in REPLY_HEADER_PATTERNS):
+            return index, 'reply'
+        if HEADER_FROM.match(stripped) and any(HEADER_SENT.match(following.strip()) for following in lines[index + 1:index + 5]):
+            return index, 'reply'
+    return None, None
+
+
+def _skip_header_block(lines):
+    """전달 머리글 다음의 From:/Date:/Subject: 줄들 건너뛰기"""
+    index = 0
+    while index < len(lines) and (not lines[index].strip() or HEADER_FIELDS.match(lines[index].strip())):
+        index += 1
+    return lines[index:]
+
+
+def _strip_signature(lines, stats):
+    """서명 구분선/모바일 서명/맺음말 뒤 연락처 블록 제거"""
+    for index, line in enumerate(lines):
+        if SIGNATURE_DELIMITER.match(line):
+            stats['signature'] = True
+            lines = lines[:index]
+            break
+
+    kept = [line for line in lines if not MOBILE_SIGNATURE.match(line.strip())]
+    if len(kept) != len(lines):
+        stats['signature'] = True
+    lines = kept
+
+    non_empty = [index for index, line in enumerate(lines) if line.strip()]
+    for position in range(len(non_empty) - 1, max(-1, len(non_empty) - SIGNATURE_BLOCK_MAX_LINES - 2), -1):
+        index = non_empty[position]
+        if not CLOSING_LINE.match(lines[index].strip()):
+            continue
+        trailing = [line.strip() for line in lines[index + 1:] if line.strip()]
+        if 0 < len(trailing) <= SIGNATURE_BLOCK_MAX_LINES and _is_contact_block(trailing):
+            stats['signature'] = True
+            return lines[:index + 1]
+        break
+    return lines
+
+
+def _is_contact_line(line):
+    return any(pattern.search(line) for pattern in CONTACT_PATTERNS)
+
+
+def _is_sentence(line):
+    """문장으로 읽히는 줄 (마침표/물음표/느낌표나 한국어 종결어미로 끝나고, 영어는 3단어 이상)"""
+    line = TRAILING_ABBREVIATION.sub('', line).rstrip()
+    if not SENTENCE_ENDING.search(line):
+        return False
+    return len(WORD.findall(line)) >= 3 or bool(re.search(r'[가-힣]', line))
+
+
+def _is_name_line(line):
+    return len(WORD.findall(line)) <= NAME_LINE_MAX_WORDS and not re.search(r'\d', line) and not _is_sentence(line)
+
+
+def _is_contact_block(lines):
+    """
+    맺음말 뒤 블록이 서명(연락처)인지: 모든 줄이 짧고 문장이 아니며,
+    연락처 패턴(이메일/전화/URL/직함·회사) 줄이거나 이름처럼 보이는 줄(최대 SIGNATURE_NAME_MAX_LINES개)
+    """
+    name_lines = 0
+    for line in lines:
+        if len(line) > SIGNATURE_LINE_MAX_CHARS:
+            return False
+        if _is_sentence(line):
+            return False
+        if _is_contact_line(line):
+            continue
+        if _is_name_line(line):
+            name_lines += 1
+            continue
+        return False
+    return name_lines <= SIGNATURE_NAME_MAX_LINES
+
+
+def _strip_footers(text, stats):
+    """
+    법적 고지/광고 문단 제거
+    키워드가 2개 이상인 문단, 또는 뒤쪽 1/3에 있으면서 고지문 모양인 키워드 1개 문단만
+    ("기밀이니 금요일까지 검토 부탁드립니다" 같은 요청 문단은 유지)
+    """
+    paragraphs = re.split(r'\n\s*\n', text)
+    kept = []
+    for index, paragraph in enumerate(paragraphs):
+        hits = sum(1 for pattern in FOOTER_PATTERNS if pattern.search(paragraph))
+        in_tail = index >= len(paragraphs) * 2 / 3
+        if hits >= 2 or (hits and in_tail and len(paragraphs) > 1 and _is_boilerplate(paragraph)):
+            stats['footer_paragraphs'] += 1
+            continue
+        kept.append(paragraph)
+    return "\n\n".join(kept)
+
+
+def _is_boilerplate(paragraph):
+    """고지문 모양: 충분히 길고 요청/날짜 표현이 없는 문단"""
+    return len(paragraph.strip()) >= FOOTER_MIN_CHARS and not REQUEST_OR_DATE.search(paragraph)
+
+
+def normalize_body(text):
+    """
+    본문 → {'new_content': AI 단계용 새 내용, 'stats': 제거 내역}
+    새 내용이 비면(전체가 인용 등) 원문을 그대로 사용
+    """
+    text = (text or '').replace('\r\n', '\n').replace('\r', '\n').strip()
+    stats = {
+        'original_chars': len(text),
+        'new_chars': 0,
+        'thread_break': None,      # 'reply' | 'forward'
+        'quoted_lines': 0,
+        'signature': False,
+        'footer_paragraphs': 0
+    }
+    if not text:
+        return {'new_content': '', 'stats': stats}
+
+    lines = text.split('\n')
+    break_index, break_kind = _find_thread_break(lines)
+    if break_index is not None:
+        stats['thread_break'] = break_kind
+        head = lines[:break_index]
+        # 전달 메일에 덧붙인 말이 없으면 전달된 본문이 새 내용
+        if break_kind == 'forward' and not any(line.strip() for line in head):
+            head = _skip_header_block(lines[break_index + 1:])
+        lines = head
+
+    kept = [line for line in lines if not line.lstrip().startswith('>')]
+    stats['quoted_lines'] = len(lines) - len(kept)
+
+    lines = _strip_signature(kept, stats)
+    new_content = _strip_footers("\n".join(lines), stats)
+    new_content = re.sub(r'\n{3,}', '\n\n', new_content).strip() or text
+
+    stats['new_chars'] = len(new_content)
+    return {'new_content': new_content, 'stats': stats}
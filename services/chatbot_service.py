@@ -5,10 +5,13 @@ from transformers import AutoTokenizer
 import numpy as np
 import os
 import torch
+import time
 from datetime import datetime
 
 #0825 수정
 from services.genie_qwen import genie_analyze_intent, qwen_prompt_command, _ensure_utf8
+from services.prompt_budget import build_prompt, section, fit_text, count_tokens
+from services.llm_streaming import stream_events, stream_hf_generate, message_events
 
 # Nomic API를 사용할지 ONNX를 사용할지 설정
 USE_ONNX = True  # True: ONNX 모델 사용, False: Nomic API 사용
@@ -22,6 +25,9 @@ except ImportError:
     NOMIC_API_AVAILABLE = False
 
 class ChatbotService:
+    GRAMMAR_INPUT_TOKENS = 512  # 교정할 텍스트 토큰 상한 (교정 결과도 비슷한 길이로 생성)
+    GRAMMAR_EMPTY_MESSAGE = "📝 **문법 및 맞춤법 교정**\n\n교정하고 싶은 텍스트를 입력해주세요.\n\n예시: '안녕하세요. 제가 오늘 회의에 참석못할것 같습니다' 교정해주세요"
+
     def __init__(self, config, ai_models, email_service):
         self.config = config
         self.ai_models = ai_models
@@ -696,31 +702,14 @@ class ChatbotService:
             correction_text = self._extract_grammar_text_with_qwen(user_input)
             
             if not correction_text:
-                return "📝 **문법 및 맞춤법 교정**\n\n교정하고 싶은 텍스트를 입력해주세요.\n\n예시: '안녕하세요. 제가 오늘 회의에 참석못할것 같습니다' 교정해주세요"
+                return self.GRAMMAR_EMPTY_MESSAGE
+            
+            correction_text, max_new_tokens = self._fit_grammar_input(correction_text)
             
             # Qwen 로컬 모델 사용
             if self.ai_models.load_qwen_model():
                 try:
-                    prompt = f"""<|im_start|>system
-당신은 전문 교정 편집자입니다.
-<|im_end|>
-<|im_start|>user
-다음 텍스트의 맞춤법, 문법, 띄어쓰기를 교정해주세요.
-
-원본 텍스트:
-"{correction_text}"
-
-교정 지침:
-1. 맞춤법 오류 수정
-2. 문법 오류 수정  
-3. 띄어쓰기 수정
-4. 자연스러운 표현으로 개선
-5. 원래 의미는 유지
-
-교정된 텍스트:
-<|im_end|>
-<|im_start|>assistant
-"""
+                    prompt = self._grammar_prompt(correction_text, max_new_tokens)
                     
                     inputs = self.ai_models.qwen_tokenizer(prompt, return_tensors="pt").to(self.ai_models.qwen_model.device)
                     
@@ -728,7 +717,7 @@ class ChatbotService:
                     with torch.no_grad():
                         outputs = self.ai_models.qwen_model.generate(
                             **inputs,
-                            max_new_tokens=200,
+                            max_new_tokens=max_new_tokens,
                             temperature=0.3,
                             do_sample=True,
                             top_p=0.9,
@@ -743,15 +732,7 @@ class ChatbotService:
                     else:
                         corrected_text = generated_text[len(prompt):].strip()
                     
-                    return f"""📝 **문법 및 맞춤법 교정 완료**
-
-**원본:**
-{correction_text}
-
-**교정된 텍스트:**
-{corrected_text}
-
-✅ **AI 교정이 완료되었습니다!**"""
+                    return self._format_grammar_result(correction_text, corrected_text)
                     
                 except Exception as e:
                     print(f"[⚠️ Qwen 문법 교정 실패] {str(e)}")
@@ -763,6 +744,81 @@ class ChatbotService:
         except Exception as e:
             return "❌ 문법 교정 처리 중 오류가 발생했습니다."
     
+    def stream_grammar_correction(self, user_input):
+        """
+        문법 교정 스트리밍 → SSE 이벤트 제너레이터
+        HF TextIteratorStreamer로 교정 결과를 생성되는 대로 전달 (done 이벤트: response 서식 결과 + corrected_text + TTFT)
+        """
+        started_at = time.perf_counter()
+        correction_text = self._extract_grammar_text_with_qwen(user_input)
+        if not correction_text:
+            return message_events({'success': True, 'response': self.GRAMMAR_EMPTY_MESSAGE})
+        
+        correction_text, max_new_tokens = self._fit_grammar_input(correction_text)
+        if not self.ai_models.load_qwen_model():
+            return message_events({'success': True, 'response': self._simple_grammar_correction(correction_text)})
+        
+        prompt = self._grammar_prompt(correction_text, max_new_tokens)
+        return stream_events(
+            'grammar_correction',
+            [('hf', lambda: stream_hf_generate(
+                self.ai_models, prompt, max_new_tokens, temperature=0.3, do_sample=True, top_p=0.9
+            ))],
+            finalize=lambda text: {
+                'response': self._format_grammar_result(correction_text, text.strip()),
+                'corrected_text': text.strip()
+            },
+            fallback=lambda error: {'response': self._simple_grammar_correction(correction_text)},
+            started_at=started_at
+        )
+    
+    def _fit_grammar_input(self, correction_text):
+        """교정 결과가 입력과 비슷한 길이로 생성되므로 입력/생성 토큰을 함께 제한 → (텍스트, 생성 토큰 수)"""
+        correction_text = fit_text(correction_text, self.GRAMMAR_INPUT_TOKENS)
+        return correction_text, count_tokens(correction_text) + 64
+    
+    def _grammar_prompt(self, correction_text, max_new_tokens):
+        return build_prompt(
+            self._build_grammar_prompt,
+            [section("correction_text", correction_text)],
+            max_new_tokens=max_new_tokens
+        )
+    
+    @staticmethod
+    def _format_grammar_result(correction_text, corrected_text):
+        return f"""📝 **문법 및 맞춤법 교정 완료**
+
+**원본:**
+{correction_text}
+
+**교정된 텍스트:**
+{corrected_text}
+
+✅ **AI 교정이 완료되었습니다!**"""
+    
+    def _build_grammar_prompt(self, correction_text):
+        """문법 교정 프롬프트"""
+        return f"""<|im_start|>system
+당신은 전문 교정 편집자입니다.
+<|im_end|>
+<|im_start|>user
+다음 텍스트의 맞춤법, 문법, 띄어쓰기를 교정해주세요.
+
+원본 텍스트:
+"{correction_text}"
+
+교정 지침:
+1. 맞춤법 오류 수정
+2. 문법 오류 수정  
+3. 띄어쓰기 수정
+4. 자연스러운 표현으로 개선
+5. 원래 의미는 유지
+
+교정된 텍스트:
+<|im_end|>
+<|im_start|>assistant
+"""
+
     def _simple_grammar_correction(self, text):
         """간단한 규칙 기반 교정"""
         simple_corrections = {
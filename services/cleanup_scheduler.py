@@ -0,0 +1,111 @@
+"""
+메일 자동 삭제 스케줄러
+
+앱 프로세스 안에서 백그라운드 스레드로 동작하며,
+비혼잡 시간대에만 사용자별 자동 삭제 정책(MY_EMAIL/MAIL_DELETE)을 실행합니다.
+- 사용자당 하루 1회 실행
+- 삭제는 MailCleanupService의 청크 단위 DELETE 사용
+- 여러 프로세스(WSGI 워커 등)에서 시작되어도 MySQL 이름 잠금(GET_LOCK)을 얻은 프로세스 하나만 실행
+"""
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import text
+from models.db import db
+from models.tables import UserSettings
+from services.mail_cleanup_service import MailCleanupService
+
+class MailCleanupScheduler:
+    """사용자별 메일 자동 삭제 주기 실행기"""
+
+    AUTO_DELETE_KEYS = ('autoDeleteSentMail', 'autoDeleteSpamMail', 'autoDeleteTrashMail')
+    LOCK_NAME = 'mailpilot_mail_cleanup'
+
+    def __init__(self, app, config):
+        self.app = app
+        self.start_hour, self.end_hour = config.CLEANUP_OFFPEAK_HOURS
+        self.check_interval = config.CLEANUP_CHECK_INTERVAL_SEC
+        self.chunk_size = config.CLEANUP_DELETE_CHUNK_SIZE
+        self._last_run = {}  # user_email -> 마지막 실행 날짜
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """백그라운드 스레드 시작 (중복 시작 방지)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run_loop, name="mail-cleanup-scheduler", daemon=True)
+        self._thread.start()
+        print(f"[⏰ 자동삭제] 스케줄러 시작 (비혼잡 시간대 {self.start_hour:02d}:00~{self.end_hour:02d}:00)")
+
+    def stop(self):
+        """스케줄러 정지"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def is_offpeak(self, now=None):
+        """현재 시각이 비혼잡 시간대인지 확인 (자정을 넘는 구간 지원)"""
+        hour = (now or datetime.now()).hour
+        if self.start_hour <= self.end_hour:
+            return self.start_hour <= hour < self.end_hour
+        return hour >= self.start_hour or hour < self.end_hour
+
+    def _run_loop(self):
+        while not self._stop_event.wait(self.check_interval):
+            if not self.is_offpeak():
+                continue
+            try:
+                with self.app.app_context(), self._process_lock() as acquired:
+                    if acquired:
+                        self.run_pending()
+            except Exception as e:
+                print(f"[❌ 자동삭제] 스케줄러 실행 오류: {e}")
+
+    @contextmanager
+    def _process_lock(self):
+        """
+        프로세스 간 실행 잠금 (MySQL GET_LOCK, 대기 없음) → 얻었으면 True
+        잠금은 연결에 묶이므로 실행하는 동안 별도 연결을 유지, MySQL이 아니면 항상 True
+        """
+        if db.engine.dialect.name != 'mysql':
+            yield True
+            return
+        with db.engine.connect() as connection:
+            acquired = connection.execute(text("SELECT GET_LOCK(:name, 0)"), {'name': self.LOCK_NAME}).scalar() == 1
+            if not acquired:
+                print(f"[⏰ 자동삭제] 다른 프로세스가 실행 중 - 이번 주기 건너뜀")
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    connection.execute(text("SELECT RELEASE_LOCK(:name)"), {'name': self.LOCK_NAME})
+
+    def _get_target_users(self):
+        """자동 삭제 항목이 하나라도 켜진 사용자 목록"""
+        rows = UserSettings.query.filter_by(category='MY_EMAIL', subcategory='MAIL_DELETE').all()
+        return [
+            row.user_email for row in rows
+            if any((row.settings_data or {}).get(key, False) for key in self.AUTO_DELETE_KEYS)
+        ]
+
+    def run_pending(self):
+        """오늘 아직 실행하지 않은 사용자에 대해 자동 삭제 실행"""
+        today = datetime.now().date()
+        results = {}
+
+        for user_email in self._get_target_users():
+            if self._stop_event.is_set() or not self.is_offpeak():
+                break
+            if self._last_run.get(user_email) == today:
+                continue
+
+            result = MailCleanupService.cleanup_old_mails(user_email, chunk_size=self.chunk_size)
+            results[user_email] = result
+            if result.get('success'):
+                self._last_run[user_email] = today
+
+        if results:
+            print(f"[⏰ 자동삭제] {len(results)}명 사용자 정리 완료")
+        return results
@@ -0,0 +1,196 @@
+"""
+문서 첨부파일 스트리밍 텍스트 추출
+
+임시 파일 없이 메모리(BytesIO)에서 바로 열어 페이지/슬라이드/시트 단위로 텍스트 청크를 생성합니다.
+- 각 추출기는 청크를 하나씩 yield 하며, 문서 메타데이터(페이지 수 등)는 stats dict에 채움
+- BudgetedExtraction은 요약 예산만큼만 먼저 읽고, 나머지는 필요할 때(백그라운드) 이어서 읽음
+라이브러리 임포트는 호출 측(AttachmentService)의 *_AVAILABLE 확인 후에만 실행됩니다.
+"""
+import io
+import itertools
+
+_END = object()
+
+# BudgetedExtraction 예산 계산 방식 (프로세스 간에는 이름으로 전달)
+CHUNK_MEASURES = {
+    'len': len,
+    'strip': lambda chunk: len(chunk.strip())  # PDF 페이지: 공백뿐인 스캔 페이지는 예산에 넣지 않음
+}
+
+
+def iter_pdf_pages_pdfplumber(data, stats):
+    """PDF 페이지별 텍스트 (pdfplumber, 텍스트 없는 페이지는 빈 문자열)"""
+    import pdfplumber
+
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        stats['pages'] = len(pdf.pages)
+        for page in pdf.pages:
+            yield page.extract_text() or ''
+            page.flush_cache()  # 페이지 객체/문자 캐시 해제 (페이지 수만큼 메모리가 쌓이지 않도록)
+
+
+def iter_pdf_pages_pypdf2(data, stats):
+    """PDF 페이지별 텍스트 (PyPDF2)"""
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    stats['pages'] = len(reader.pages)
+    for page in reader.pages:
+        yield page.extract_text() or ''
+
+
+def iter_docx_blocks(data, stats):
+    """Word 문단 → 표 순서로 텍스트 청크"""
+    from docx import Document
+
+    doc = Document(io.BytesIO(data))
+    stats['paragraphs'] = len(doc.paragraphs)
+    stats['tables'] = len(doc.tables)
+
+    for paragraph in doc.paragraphs:
+        if paragraph.text.strip():
+            yield paragraph.text + "\n"
+
+    # 표 내용도 추출
+    for table in doc.tables:
+        yield "\n=== 표 데이터 ===\n" + _table_rows_text(table)
+
+
+def iter_pptx_slides(data, stats):
+    """PowerPoint 슬라이드별 텍스트 청크"""
+    from pptx import Presentation
+
+    prs = Presentation(io.BytesIO(data))
+    stats['slides'] = len(prs.slides)
+
+    for slide_num, slide in enumerate(prs.slides):
+        parts = [f"\n=== 슬라이드 {slide_num + 1} ===\n"]
+        for shape in slide.shapes:
+            if hasattr(shape, "text") and shape.text.strip():
+                parts.append(shape.text + "\n")
+
+            if hasattr(shape, 'has_table') and shape.has_table:
+                parts.append("\n--- 표 ---\n" + _table_rows_text(shape.table))
+        yield ''.join(parts)
+
+
+def iter_xlsx_sheets(data, stats, preview_rows=20):
+    """
+    Excel(.xlsx) 시트별 텍스트 청크 (openpyxl 읽기 전용 모드, 통합 문서는 한 번만 열기)
+    시트마다 헤더 + 앞쪽 preview_rows행만 읽고, 전체 행 수는 시트 메타데이터(<dimension>)에서 가져옴
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        stats['sheets'] = len(workbook.sheetnames)
+        stats['total_rows'] = 0
+
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            preview = list(itertools.islice(rows, preview_rows))
+            if header is None or not preview:
+                continue
+
+            # 메타데이터가 없거나 실제보다 작게 기록된 파일은 남은 행을 값 없이 세기만 함
+            declared_rows = sheet.max_row
+            if declared_rows is None or declared_rows - 1 < len(preview):
+                row_count = len(preview) + sum(1 for _ in rows)
+            else:
+                row_count = declared_rows - 1
+
+            yield _sheet_text(
+                sheet.title,
+                [f"Unnamed: {index}" if value is None else value for index, value in enumerate(header)],
+                [["" if value is None else value for value in row] for row in preview],
+                row_count, preview_rows
+            )
+            stats['total_rows'] += row_count
+    finally:
+        workbook.close()
+
+
+def iter_xls_sheets(data, stats, preview_rows=20):
+    """구형 Excel(.xls) 시트별 텍스트 청크 (pandas, 시트당 앞쪽 preview_rows행만 파싱)"""
+    import pandas as pd
+
+    xl_file = pd.ExcelFile(io.BytesIO(data))  # 통합 문서는 한 번만 열고 시트만 차례로 파싱
+    stats['sheets'] = len(xl_file.sheet_names)
+    stats['total_rows'] = 0
+
+    for sheet_name in xl_file.sheet_names:
+        df = xl_file.parse(sheet_name, nrows=preview_rows)
+        if df.empty:
+            continue
+
+        # xlrd는 시트 행 수를 바로 제공 (헤더 행 제외)
+        row_count = max(0, xl_file.book.sheet_by_name(sheet_name).nrows - 1) \
+            if hasattr(xl_file.book, 'sheet_by_name') else len(df)
+
+        yield _sheet_text(
+            sheet_name,
+            list(df.columns),
+            [["" if pd.isna(value) else value for value in row] for row in df.itertuples(index=False)],
+            row_count, preview_rows
+        )
+        stats['total_rows'] += row_count
+
+
+def _sheet_text(sheet_name, columns, preview, row_count, preview_rows):
+    """시트 미리보기 → 텍스트 청크"""
+    parts = [
+        f"\n=== 시트: {sheet_name} ===\n",
+        "컬럼: " + " | ".join(str(col) for col in columns) + "\n\n"
+    ]
+    for row in preview:
+        parts.append(" | ".join(str(value) for value in row) + "\n")
+
+    if row_count > preview_rows:
+        parts.append(f"... (총 {row_count}행 중 처음 {preview_rows}행만 표시)\n")
+    return ''.join(parts)
+
+
+def _table_rows_text(table):
+    """표 → 행마다 '셀 | 셀' 텍스트"""
+    lines = []
+    for row in table.rows:
+        row_text = [cell.text.strip() for cell in row.cells if cell.text.strip()]
+        if row_text:
+            lines.append(" | ".join(row_text) + "\n")
+    return ''.join(lines)
+
+
+class BudgetedExtraction:
+    """청크 생성기를 예산(문자 수)만큼만 읽어 두고, 나머지는 rest()로 이어서 읽음"""
+
+    def __init__(self, chunks, budget_chars, measure=len):
+        self._chunks = iter(chunks)
+        self.head = []
+        size = 0
+
+        for chunk in self._chunks:
+            self.head.append(chunk)
+            size += measure(chunk)
+            if size >= budget_chars:
+                break
+
+        # 예산을 채운 시점에 남은 청크가 있는지 한 개만 미리 확인
+        self._lookahead = next(self._chunks, _END)
+        self.exhausted = self._lookahead is _END
+
+    def rest(self):
+        """예산 이후 남은 청크 목록 (한 번만 호출)"""
+        if self.exhausted:
+            return []
+        remaining = [self._lookahead]
+        remaining.extend(self._chunks)
+        self.exhausted = True
+        return remaining
+
+    def discard(self):
+        """남은 청크를 읽지 않을 때 호출 (생성기를 닫아 열린 파일 정리)"""
+        self.exhausted = True
+        close = getattr(self._chunks, 'close', None)
+        if close is not None:
+            close()
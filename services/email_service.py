@@ -7,6 +7,8 @@ from email.mime.text import MIMEText
 from datetime import datetime, timezone, timedelta
 from models.db import db
 from models.tables import Mail
+from services.body_normalizer import extract_body_text, normalize_body
+from services.thread_service import mail_id_from_message_id, parse_thread_headers
 
 class EmailService:
     def __init__(self, config, summarizer=None, ai_models=None):
@@ -166,16 +168,19 @@ class EmailService:
                 if date_obj <= after_date:
                     return None
             
-            # 본문 추출
+            # 본문 추출 + AI 단계용 새 내용 (인용/전달 머리글/서명/고지문 제거)
             body = self._extract_body(msg)
+            normalized = normalize_body(body)
+            if normalized['stats']['new_chars'] < normalized['stats']['original_chars']:
+                print(f"[✂️ 본문 정규화] {normalized['stats']['original_chars']}자 → {normalized['stats']['new_chars']}자 "
+                      f"(인용 {normalized['stats']['quoted_lines']}줄, 이전 대화: {normalized['stats']['thread_break'] or '없음'})")
 
             # ✅ Message-ID 헤더를 고유 식별자로 사용 (IMAP UID 대신)
             message_id_header = msg.get("Message-ID", "")
             if message_id_header:
                 # Message-ID에서 < > 제거하고 해시로 단축
-                import hashlib
                 clean_id = message_id_header.strip('<>')
-                mail_id_str = hashlib.sha256(clean_id.encode()).hexdigest()[:16]  # 16자리 해시
+                mail_id_str = mail_id_from_message_id(clean_id)  # 16자리 해시
                 print(f"[🔍 Message-ID → Hash] {clean_id} → {mail_id_str}")
             else:
                 # Message-ID가 없는 경우 fallback (드문 경우)
@@ -190,7 +195,10 @@ class EmailService:
                 "date": date_str,
                 "date_obj": date_obj,  # 정확한 날짜 객체 추가
                 "body": body,
+                "new_content": normalized['new_content'],
+                "body_normalization": normalized['stats'],
                 "raw_message": msg,
+                "thread_headers": parse_thread_headers(msg),  # 스레드 구성용 Message-ID/In-Reply-To/References
                 "mail_type": mail_type  # 'inbox' 또는 'sent'
             }
             
@@ -231,20 +239,9 @@ class EmailService:
             return None, raw_date[:19] if len(raw_date) >= 19 else raw_date
     
     def _extract_body(self, msg):
-        """본문 추출"""
-        body = ""
+        """본문 추출 (text/plain 파트를 구분해 연결, HTML만 있으면 텍스트로 변환)"""
         try:
-            if msg.is_multipart():
-                for part in msg.walk():
-                    if (part.get_content_type() == "text/plain" and 
-                        not part.get("Content-Disposition")):
-                        charset = part.get_content_charset() or "utf-8"
-                        body += part.get_payload(decode=True).decode(charset, errors="ignore")
-            else:
-                charset = msg.get_content_charset() or "utf-8"
-                body = msg.get_payload(decode=True).decode(charset, errors="ignore")
-            
-            return body.strip()
+            return extract_body_text(msg)
         except Exception:
             return ""
     
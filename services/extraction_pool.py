@@ -0,0 +1,376 @@
+"""
+문서 추출 프로세스 풀
+
+문서 파싱(pdfplumber/PyPDF2/python-docx/python-pptx/openpyxl)을 extraction_worker.py 프로세스 N개에서 실행합니다.
+- Flask 요청 스레드/GIL과 분리되어 파일 하나가 멈춰도 수집 전체가 멈추지 않음
+- 파일당 제한: 대기 시간(예산까지 / 나머지 단계별), 메모리(RSS) 상한, 취소(사용자별 cancel / 전체 cancel_all)
+- 시간 초과/메모리 초과/프로세스 종료/취소 → 해당 파일만 ExtractionFailed, 워커는 백그라운드에서 재시작
+- 파일 전달: 버퍼 파일 (파이프로는 경로만 전송)
+- 예산 이후 남은 청크는 풀 스레드가 바로 받아 두고 워커를 반납 (rest() 호출 시점과 무관하게 워커가 묶이지 않음)
+RSS 감시는 psutil이 있으면 호출 측에서, 없으면 워커가 POSIX 주소 공간 상한으로 대신합니다.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import shutil
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+WORKER_SCRIPT = Path(__file__).parent / "extraction_worker.py"
+POLL_INTERVAL_SEC = 0.2  # 응답 대기 중 시간/메모리/취소 확인 주기
+
+
+class ExtractionFailed(Exception):
+    """
+    워커 추출 실패 (reason: timeout / memory_limit / crashed / cancelled / unavailable / busy / error)
+    busy: 유휴 워커가 없어 시작하지 못함 (파일 문제가 아니므로 실패 결과를 캐시하면 안 됨)
+    """
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+
+class _ExtractionWorker:
+    """워커 프로세스 1개 (요청은 한 번에 하나씩)"""
+
+    def __init__(self, index, command):
+        self.index = index
+        self.command = command
+        self.process = None
+        self._lines = None
+        self._next_id = 0
+
+    def start(self):
+        self._lines = queue.Queue()
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=None,  # 워커 로그는 서버 콘솔로 그대로 출력
+            text=True,
+            encoding='utf-8',
+            bufsize=1,
+            cwd=str(WORKER_SCRIPT.parent)
+        )
+        threading.Thread(target=self._read_stdout, args=(self.process, self._lines), daemon=True).start()
+
+    @staticmethod
+    def _read_stdout(process, lines):
+        for line in process.stdout:
+            lines.put(line)
+        lines.put(None)  # 프로세스 종료
+
+    def wait_ready(self, timeout):
+        message = self.read_message(None, time.monotonic() + timeout)
+        if not message.get('ready'):
+            raise RuntimeError(f"추출 워커 {self.index} 준비 실패: {message}")
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def rss(self):
+        """워커 프로세스 RSS (바이트, psutil 없으면 0)"""
+        if not PSUTIL_AVAILABLE or not self.is_alive():
+            return 0
+        try:
+            return psutil.Process(self.process.pid).memory_info().rss
+        except Exception:
+            return 0
+
+    def send(self, payload):
+        self._next_id += 1
+        payload = dict(payload, id=self._next_id)
+        self.process.stdin.write(json.dumps(payload, ensure_ascii=False) + "\n")
+        self.process.stdin.flush()
+        return self._next_id
+
+    def read_message(self, request_id, deadline, is_cancelled=None, max_rss_bytes=0):
+        """request_id 응답 대기 (시간 초과/메모리 초과/취소/프로세스 종료 시 ExtractionFailed)"""
+        while True:
+            if is_cancelled and is_cancelled():
+                raise ExtractionFailed('cancelled', "추출 취소됨")
+            if max_rss_bytes and self.rss() > max_rss_bytes:
+                raise ExtractionFailed('memory_limit', f"워커 메모리 상한 초과 ({max_rss_bytes // (1024 * 1024)}MB)")
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise ExtractionFailed('timeout', "추출 시간 초과")
+            try:
+                line = self._lines.get(timeout=min(POLL_INTERVAL_SEC, remaining))
+            except queue.Empty:
+                continue
+
+            if line is None:
+                raise ExtractionFailed('crashed', f"추출 워커 {self.index} 프로세스 종료 (returncode={self.process.poll()})")
+            line = line.strip()
+            if not line.startswith('{'):
+                continue
+
+            message = json.loads(line)
+            if request_id is not None and message.get('id') != request_id:
+                continue
+            if message.get('success') is False:
+                raise ExtractionFailed(message.get('reason', 'error'), message.get('error', 'unknown error'))
+            return message
+
+    def stop(self, force=False):
+        if not self.process:
+            return
+        try:
+            if self.is_alive() and not force:
+                self.process.stdin.write(json.dumps({'cmd': 'exit'}) + "\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=5)
+        except Exception:
+            pass
+        if self.is_alive():
+            self.process.kill()
+        self.process = None
+
+
+class ExtractionHandle:
+    """워커에서 진행 중인 추출 1건 (BudgetedExtraction과 같은 head / exhausted / rest() 인터페이스)"""
+
+    def __init__(self, pool, worker, request_id, generation, stats, message):
+        self.stats = stats
+        self.head = message['chunks']
+        self.exhausted = message['exhausted']
+        self._rest_chunks = []
+        self._rest_stats = {}
+        self._rest_error = None
+        self._rest_done = threading.Event()
+
+        if self.exhausted:
+            self._rest_done.set()
+        else:
+            # 남은 청크는 풀 스레드가 바로 받아 두고 워커 반납 (rest()를 늦게 호출해도 다른 파일이 워커를 기다리지 않음)
+            threading.Thread(
+                target=self._drain, args=(pool, worker, request_id, generation),
+                name=f"extract-drain-{worker.index}", daemon=True
+            ).start()
+
+    def _drain(self, pool, worker, request_id, generation):
+        try:
+            message = pool._wait(worker, request_id, pool.rest_timeout, generation)
+            pool._release(worker)
+            self._rest_chunks = message['chunks']
+            self._rest_stats = message['stats']
+        except ExtractionFailed as e:
+            self._rest_error = e  # 워커 재시작/반납은 _wait에서 처리
+        finally:
+            self._rest_done.set()
+
+    def rest(self):
+        """예산 이후 남은 청크 목록 (한 번만 호출, 워커가 나머지를 아직 마치지 않았으면 대기)"""
+        if self.exhausted:
+            return []
+        self.exhausted = True
+
+        self._rest_done.wait()
+        if self._rest_error is not None:
+            raise self._rest_error
+        self.stats.update(self._rest_stats)
+        chunks, self._rest_chunks = self._rest_chunks, []
+        return chunks
+
+    def discard(self):
+        """남은 청크를 쓰지 않을 때 호출 (받아 둔 청크만 버림, 워커는 나머지를 마치면 반납됨)"""
+        self.exhausted = True
+        self._rest_chunks = []
+
+
+class ExtractionPool:
+    """extraction_worker.py 프로세스 풀"""
+
+    # 워커 프로세스를 다시 띄워야 하는 실패 (처리 중 오류는 워커를 그대로 재사용)
+    RESTART_REASONS = {'timeout', 'memory_limit', 'crashed', 'cancelled'}
+
+    def __init__(self, num_workers=2, head_timeout=30, rest_timeout=120, max_rss_mb=1024,
+                 ready_timeout=30, max_start_failures=3):
+        self.num_workers = max(1, num_workers)
+        self.head_timeout = head_timeout
+        self.rest_timeout = rest_timeout
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024 if PSUTIL_AVAILABLE else 0
+        self.ready_timeout = ready_timeout
+        self.max_start_failures = max_start_failures
+
+        self.command = [sys.executable, str(WORKER_SCRIPT)]
+        if not PSUTIL_AVAILABLE:
+            self.command += ['--max-memory-mb', str(max_rss_mb)]
+
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._start_failures = 0
+        self._live_workers = 0
+        self._generation = 0  # cancel_all() 호출마다 증가 → 그 전에 시작한 요청은 취소
+        self._owner_generations = {}  # 요청 사용자 -> cancel(사용자) 호출 횟수 (그 사용자 요청만 취소)
+        self._buffer_dir = Path(tempfile.mkdtemp(prefix='mailpilot_extract_'))
+        self.stats = {'requests': 0, 'failures': {}, 'restarts': 0}
+
+    @property
+    def available(self):
+        """사용 가능한 워커가 남아 있는지"""
+        return not self._started or self._live_workers > 0
+
+    def _ensure_started(self):
+        """첫 요청 시 워커 N개를 띄우고 준비될 때까지 대기"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+
+            workers = []
+            for index in range(self.num_workers):
+                worker = _ExtractionWorker(index, self.command)
+                try:
+                    worker.start()
+                    workers.append(worker)
+                except Exception as e:
+                    print(f"[❌ 추출 Pool] 워커 {index} 시작 실패: {e}")
+
+            for worker in workers:
+                try:
+                    worker.wait_ready(self.ready_timeout)
+                    self._live_workers += 1
+                    self._idle.put(worker)
+                except Exception as e:
+                    print(f"[❌ 추출 Pool] 워커 {worker.index} 준비 실패: {e}")
+                    worker.stop(force=True)
+
+            print(f"[🚀 추출 Pool] 워커 {self._live_workers}/{self.num_workers}개 준비 완료")
+
+    def _restart_in_background(self, worker):
+        def restart():
+            worker.stop(force=True)
+            try:
+                worker.start()
+                worker.wait_ready(self.ready_timeout)
+                self._start_failures = 0
+                self.stats['restarts'] += 1
+                print(f"[🔄 추출 Pool] 워커 {worker.index} 재시작 완료")
+                self._idle.put(worker)
+            except Exception as e:
+                worker.stop(force=True)
+                self._start_failures += 1
+                print(f"[❌ 추출 Pool] 워커 {worker.index} 재시작 실패 ({self._start_failures}회): {e}")
+                if self._start_failures < self.max_start_failures:
+                    threading.Timer(5, restart).start()
+                else:
+                    self._live_workers -= 1
+                    print(f"[❌ 추출 Pool] 워커 {worker.index} 중지 (남은 워커 {self._live_workers}개)")
+
+        threading.Thread(target=restart, daemon=True).start()
+
+    def _release(self, worker):
+        self._idle.put(worker)
+
+    def _wait(self, worker, request_id, timeout, generation):
+        """응답 1개 대기 → 실패 시 실패 사유 기록, 필요하면 워커 재시작 후 예외 전달"""
+        try:
+            return worker.read_message(
+                request_id,
+                time.monotonic() + timeout,
+                is_cancelled=lambda: self._cancel_token(generation[1]) != generation,
+                max_rss_bytes=self.max_rss_bytes
+            )
+        except ExtractionFailed as e:
+            with self._lock:
+                self.stats['failures'][e.reason] = self.stats['failures'].get(e.reason, 0) + 1
+            if e.reason in self.RESTART_REASONS:
+                print(f"[❌ 추출 Pool] 워커 {worker.index} {e.reason}, 재시작: {e}")
+                self._restart_in_background(worker)
+            else:
+                self._release(worker)
+            raise
+
+    def _cancel_token(self, owner):
+        """취소 확인용 값 (전체 취소 횟수, 사용자, 사용자별 취소 횟수) → 시작 시점 값과 다르면 취소된 요청"""
+        return self._generation, owner, self._owner_generations.get(owner, 0)
+
+    def extract(self, extractor_name, data, stats, budget, measure='len', owner=None, **kwargs):
+        """
+        워커에서 추출 시작 → 예산만큼 읽은 ExtractionHandle (실패 시 ExtractionFailed)
+        owner: 요청 사용자 (cancel(owner)로 그 사용자 요청만 취소)
+        남은 청크가 있으면 워커는 나머지 추출을 마칠 때까지만 이 요청에 묶임 (rest() 호출을 기다리지 않음)
+        유휴 워커를 head_timeout 안에 얻지 못하면 ExtractionFailed('busy')
+        """
+        self._ensure_started()
+        if self._live_workers <= 0:
+            raise ExtractionFailed('unavailable', "사용 가능한 추출 워커 없음")
+
+        generation = self._cancel_token(owner)
+        try:
+            worker = self._idle.get(timeout=self.head_timeout)
+        except queue.Empty:
+            with self._lock:
+                self.stats['failures']['busy'] = self.stats['failures'].get('busy', 0) + 1
+            raise ExtractionFailed('busy', "유휴 추출 워커 대기 시간 초과")
+
+        self.stats['requests'] += 1
+        path = self._buffer_dir / f"{uuid.uuid4().hex}.bin"
+        try:
+            path.write_bytes(data)
+            try:
+                request_id = worker.send({
+                    'extractor': extractor_name, 'path': str(path),
+                    'budget': budget, 'measure': measure, 'kwargs': kwargs
+                })
+            except Exception as e:
+                self._restart_in_background(worker)
+                raise ExtractionFailed('crashed', f"추출 워커 {worker.index} 요청 전송 실패: {e}")
+
+            message = self._wait(worker, request_id, self.head_timeout, generation)
+        finally:
+            try:
+                os.remove(path)  # 워커는 head 응답 전에 파일을 모두 읽음
+            except OSError:
+                pass
+
+        stats.update(message['stats'])
+        if message['exhausted']:
+            self._release(worker)
+        return ExtractionHandle(self, worker, request_id, generation, stats, message)
+
+    def cancel(self, owner):
+        """해당 사용자의 진행 중인 추출만 취소 (해당 워커는 재시작)"""
+        with self._lock:
+            self._owner_generations[owner] = self._owner_generations.get(owner, 0) + 1
+        print(f"[🛑 추출 Pool] {owner} 사용자의 진행 중인 추출 취소 요청")
+
+    def cancel_all(self):
+        """진행 중인 모든 추출 취소 (해당 워커는 재시작)"""
+        with self._lock:
+            self._generation += 1
+        print("[🛑 추출 Pool] 진행 중인 추출 취소 요청")
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'workers': self._live_workers,
+                'requests': self.stats['requests'],
+                'failures': dict(self.stats['failures']),
+                'restarts': self.stats['restarts']
+            }
+
+    def shutdown(self):
+        """진행 중인 추출 취소 후 모든 워커 종료 및 버퍼 정리"""
+        self.cancel_all()
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+        shutil.rmtree(self._buffer_dir, ignore_errors=True)
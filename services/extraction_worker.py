@@ -0,0 +1,93 @@
+"""
+문서 텍스트 추출 워커 (단독 프로세스로 실행)
+
+pdfplumber/PyPDF2/python-docx/python-pptx/openpyxl 파싱을 Flask 프로세스 밖에서 수행합니다.
+- 요청 (JSON 한 줄): {"id": 1, "extractor": "iter_docx_blocks", "path": "...bin", "budget": 4000,
+                      "measure": "len" | "strip", "kwargs": {...}}
+- 응답 1 (예산까지): {"id": 1, "success": true, "phase": "head", "chunks": [...], "stats": {...}, "exhausted": false}
+- 응답 2 (나머지, exhausted가 false일 때만): {"id": 1, "success": true, "phase": "rest", "chunks": [...], "stats": {...}}
+- 실패: {"id": 1, "success": false, "error": "..."}
+- 종료: {"cmd": "exit"}
+stdout은 응답 전용이며 로그는 stderr로 출력합니다.
+
+실행: python extraction_worker.py [--max-memory-mb 1024]
+"""
+import sys
+import json
+import argparse
+
+# 응답 채널 분리 (print 로그는 stderr로)
+_protocol_out = sys.stdout
+sys.stdout = sys.stderr
+
+import document_extractors
+from document_extractors import BudgetedExtraction, CHUNK_MEASURES
+
+
+def _limit_memory(max_memory_mb):
+    """주소 공간 상한 (POSIX만, Windows는 호출 측에서 RSS 감시)"""
+    try:
+        import resource
+    except ImportError:
+        return
+    limit = max_memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _respond(payload):
+    _protocol_out.write(json.dumps(payload, ensure_ascii=False) + "\n")
+    _protocol_out.flush()
+
+
+def _handle(request):
+    request_id = request.get("id")
+    extractor = getattr(document_extractors, request["extractor"])
+    with open(request["path"], "rb") as file:
+        data = file.read()
+
+    stats = {}
+    extraction = BudgetedExtraction(
+        extractor(data, stats, **request.get("kwargs", {})),
+        request["budget"],
+        measure=CHUNK_MEASURES[request.get("measure", "len")]
+    )
+    _respond({"id": request_id, "success": True, "phase": "head", "chunks": extraction.head,
+              "stats": stats, "exhausted": extraction.exhausted})
+
+    if not extraction.exhausted:
+        chunks = extraction.rest()
+        _respond({"id": request_id, "success": True, "phase": "rest", "chunks": chunks, "stats": stats})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-memory-mb", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.max_memory_mb > 0:
+        _limit_memory(args.max_memory_mb)
+
+    print("[Extraction Worker] 준비 완료")
+    _respond({"ready": True})
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        try:
+            request = json.loads(line)
+            if request.get("cmd") == "exit":
+                break
+
+            request_id = request.get("id")
+            _handle(request)
+        except MemoryError:
+            _respond({"id": request_id, "success": False, "error": "memory limit exceeded", "reason": "memory_limit"})
+        except Exception as e:
+            _respond({"id": request_id, "success": False, "error": str(e)})
+
+
+if __name__ == "__main__":
+    main()
@@ -10,14 +10,21 @@ Qwen2.5-7B (Genie · QAIRT SDK) 실행 유틸 (Snapdragon X Elite · NPU)
 - genie-t2t-run.exe 및 필요한 런타임 DLL을 번들 폴더에 배치
 
 환경변수(선택):
-- GENIE_BUNDLE_DIR, GENIE_CONFIG_NAME, GENIE_EXE_NAME, GENIE_TIMEOUT_SEC
+- GENIE_BUNDLE_DIR, GENIE_CONFIG_NAME, GENIE_EXE_NAME, GENIE_TIMEOUT_SEC, GENIE_MAX_PARALLEL
 """
 from __future__ import annotations
+import codecs
+import glob
 import os
+import queue
 import re
 import subprocess
 import textwrap
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from typing import Optional
+from services.prompt_budget import build_prompt, section
 
 # ==========================
 # 설정: 경로 및 기본 파라미터
@@ -26,6 +33,17 @@ GENIE_BUNDLE_DIR  = os.getenv("GENIE_BUNDLE_DIR",  r"C:\Genie\Qwen2_5_7B\genie_b
 GENIE_CONFIG_NAME = os.getenv("GENIE_CONFIG_NAME", "genie_config.json")
 GENIE_EXE_NAME    = os.getenv("GENIE_EXE_NAME",    "genie-t2t-run.exe")
 GENIE_TIMEOUT_SEC = int(os.getenv("GENIE_TIMEOUT_SEC", "180"))
+GENIE_MAX_PARALLEL = max(1, int(os.getenv("GENIE_MAX_PARALLEL", "1")))  # Genie 프로세스 동시 실행 수 (NPU 1개 → 기본 1)
+
+# Genie 실행 슬롯: 직접 호출/LLM 큐/스트리밍 모두 슬롯을 받아야 프로세스 실행
+# 슬롯 번호별 프롬프트 파일(__prompt_utf8_<슬롯>.txt)을 재사용 → 번들 폴더에 파일이 쌓이지 않음
+_genie_slots = queue.Queue()
+for _slot in range(GENIE_MAX_PARALLEL):
+    _genie_slots.put(_slot)
+_legacy_prompts_removed = set()
+
+# 청크 요약 등 여러 프롬프트를 동시에 보낼 때 사용하는 LLM 큐 (실제 실행은 Genie 슬롯 수로 제한)
+_llm_queue = ThreadPoolExecutor(max_workers=GENIE_MAX_PARALLEL, thread_name_prefix="genie-llm")
 
 # ======================
 # Genie (Qwen) 관련 함수
@@ -38,33 +56,22 @@ def run_qwen_with_genie(
     exe_name: str = GENIE_EXE_NAME,
     timeout_sec: int = GENIE_TIMEOUT_SEC
 ) -> str:
-    """Genie 실행기를 이용해 Qwen 프롬프트 실행 → 결과 텍스트만 추출"""
-    exe_path = os.path.join(bundle_dir, exe_name)
-    cfg_path = os.path.join(bundle_dir, config_name)
-
-    if not os.path.exists(exe_path):
-        raise FileNotFoundError(f"Genie 실행 파일 없음: {exe_path}")
-    if not os.path.exists(cfg_path):
-        raise FileNotFoundError(f"Genie 설정 없음: {cfg_path}")
-
-    prompt_path = os.path.join(bundle_dir, "__prompt_utf8.txt")
-    with open(prompt_path, "w", encoding="utf-8", newline="\n") as f:
-        f.write(prompt)
-
-    args = [exe_path, "-c", cfg_path, "--prompt_file", prompt_path]
-    proc = subprocess.run(
-        args,
-        cwd=bundle_dir,
-        capture_output=True,
-        text=False,
-        timeout=timeout_sec,
-        shell=False,
-    )
+    """Genie 실행기를 이용해 Qwen 프롬프트 실행 → 결과 텍스트만 추출 (Genie 슬롯이 빌 때까지 대기)"""
+    with _genie_slot(bundle_dir) as slot:
+        args = _genie_command(prompt, bundle_dir, config_name, exe_name, slot)
+        proc = subprocess.run(
+            args,
+            cwd=bundle_dir,
+            capture_output=True,
+            text=False,
+            timeout=timeout_sec,
+            shell=False,
+        )
 
     stdout = (proc.stdout or b"").decode("utf-8", errors="ignore")
     stderr = (proc.stderr or b"").decode("utf-8", errors="ignore")
 
-    # 임시 프롬프트 파일은 Windows에서 바로 삭제가 막힐 수 있어 생략(덮어쓰기 방식)
+    # 프롬프트 파일은 Windows에서 바로 삭제가 막힐 수 있어 슬롯별 파일을 덮어쓰며 재사용
     if proc.returncode != 0:
         raise RuntimeError(
             f"Genie 실패 (code {proc.returncode})\nSTDERR:\n{stderr}\nSTDOUT:\n{stdout}"
@@ -74,9 +81,192 @@ def run_qwen_with_genie(
     if m:
         return m.group(1).strip()
 
+    return _output_without_markers(stdout)
+
+@contextmanager
+def _genie_slot(bundle_dir: str):
+    """Genie 실행 슬롯 1개 사용 (모든 Genie 호출 공통, 동시 실행 GENIE_MAX_PARALLEL개) → 슬롯 번호"""
+    slot = _genie_slots.get()
+    try:
+        _remove_legacy_prompt_files(bundle_dir)
+        yield slot
+    finally:
+        _genie_slots.put(slot)
+
+def _remove_legacy_prompt_files(bundle_dir: str):
+    """예전 스레드별 프롬프트 파일(__prompt_utf8_<스레드 ID>.txt) 정리 (번들 폴더당 1회)"""
+    if bundle_dir in _legacy_prompts_removed:
+        return
+    _legacy_prompts_removed.add(bundle_dir)
+    slot_files = {_prompt_path(bundle_dir, slot) for slot in range(GENIE_MAX_PARALLEL)}
+    for path in glob.glob(os.path.join(bundle_dir, "__prompt_utf8_*.txt")):
+        if path in slot_files:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _prompt_path(bundle_dir: str, slot: int) -> str:
+    return os.path.join(bundle_dir, f"__prompt_utf8_{slot}.txt")
+
+def _genie_command(prompt: str, bundle_dir: str, config_name: str, exe_name: str, slot: int) -> list:
+    """프롬프트 파일 작성 → Genie 실행 인자"""
+    exe_path = os.path.join(bundle_dir, exe_name)
+    cfg_path = os.path.join(bundle_dir, config_name)
+
+    if not os.path.exists(exe_path):
+        raise FileNotFoundError(f"Genie 실행 파일 없음: {exe_path}")
+    if not os.path.exists(cfg_path):
+        raise FileNotFoundError(f"Genie 설정 없음: {cfg_path}")
+
+    # 슬롯을 가진 호출만 해당 슬롯 파일을 쓰므로 동시 실행 시에도 서로 덮어쓰지 않음
+    prompt_path = _prompt_path(bundle_dir, slot)
+    with open(prompt_path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(prompt)
+
+    return [exe_path, "-c", cfg_path, "--prompt_file", prompt_path]
+
+def _output_without_markers(stdout: str) -> str:
+    """[BEGIN]/[END] 표시가 없는 출력 → 로그 줄([...])을 뺀 텍스트"""
     tail = "\n".join([ln for ln in stdout.splitlines() if ln and not ln.startswith("[")])
     return tail.strip() or stdout.strip()
 
+class _GenieStreamParser:
+    """Genie stdout 조각 → [BEGIN]: 와 [END] 사이 텍스트 조각 (run_qwen_with_genie의 정규식과 같은 범위)"""
+    BEGIN, END = "[BEGIN]", "[END]"
+
+    def __init__(self):
+        self.state = "before"  # before → header([BEGIN] 뒤 ':' 대기) → body → done
+        self.buffer = ""
+        self.raw = []
+        self.emitted = False
+
+    def feed(self, text: str) -> str:
+        """새 stdout 텍스트 → 지금 내보낼 수 있는 답변 텍스트 ('' 가능)"""
+        self.raw.append(text)
+        if self.state == "done":
+            return ""
+        self.buffer += text
+
+        if self.state == "before":
+            index = self.buffer.find(self.BEGIN)
+            if index < 0:
+                self.buffer = self.buffer[-(len(self.BEGIN) - 1):]
+                return ""
+            self.buffer = self.buffer[index + len(self.BEGIN):]
+            self.state = "header"
+        if self.state == "header":
+            index = self.buffer.find(":")
+            if index < 0:
+                return ""
+            self.buffer = self.buffer[index + 1:]
+            self.state = "body"
+
+        if not self.emitted:
+            self.buffer = self.buffer.lstrip()  # ':' 뒤 공백
+        index = self.buffer.find(self.END)
+        if index >= 0:
+            piece, self.buffer = self.buffer[:index].rstrip(), ""
+            self.state = "done"
+            return self._emit(piece)
+
+        # 조각 경계에 걸친 [END] 앞부분이나 [END] 앞 공백일 수 있는 끝부분만 남겨 둠
+        safe = len(self.buffer)
+        for size in range(min(len(self.END) - 1, len(self.buffer)), 0, -1):
+            if self.END.startswith(self.buffer[-size:]):
+                safe -= size
+                break
+        while safe > 0 and self.buffer[safe - 1].isspace():
+            safe -= 1
+        piece, self.buffer = self.buffer[:safe], self.buffer[safe:]
+        return self._emit(piece)
+
+    def finish(self) -> str:
+        """출력 종료 → 남은 텍스트 ([BEGIN]이 없었으면 로그 줄을 뺀 전체 출력)"""
+        if self.state == "body":
+            piece, self.buffer = self.buffer.rstrip(), ""
+            self.state = "done"
+            return self._emit(piece)
+        if self.state != "done":
+            self.state = "done"
+            return self._emit(_output_without_markers("".join(self.raw)))
+        return ""
+
+    def _emit(self, piece: str) -> str:
+        self.emitted = self.emitted or bool(piece)
+        return piece
+
+def stream_qwen_with_genie(
+    prompt: str,
+    bundle_dir: str = GENIE_BUNDLE_DIR,
+    config_name: str = GENIE_CONFIG_NAME,
+    exe_name: str = GENIE_EXE_NAME,
+    timeout_sec: int = GENIE_TIMEOUT_SEC
+):
+    """
+    Genie 실행기 stdout을 읽는 대로 답변 텍스트 조각을 내보내는 제너레이터
+    (중간에 닫히면 Genie 프로세스 종료 후 슬롯 반환, 시간 초과/비정상 종료는 run_qwen_with_genie와 같은 예외)
+    """
+    with _genie_slot(bundle_dir) as slot:
+        yield from _stream_genie_process(
+            _genie_command(prompt, bundle_dir, config_name, exe_name, slot), bundle_dir, timeout_sec
+        )
+
+def _stream_genie_process(args: list, bundle_dir: str, timeout_sec: int):
+    """Genie 프로세스 실행 → stdout 답변 조각 (슬롯을 가진 상태에서 호출)"""
+    proc = subprocess.Popen(args, cwd=bundle_dir, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=False)
+
+    timed_out = threading.Event()
+    def _kill_on_timeout():
+        timed_out.set()
+        proc.kill()
+    timer = threading.Timer(timeout_sec, _kill_on_timeout)
+    timer.daemon = True
+    timer.start()
+
+    # stderr 파이프가 가득 차서 멈추지 않도록 따로 읽음
+    stderr_chunks = []
+    stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+    stderr_reader.start()
+
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    parser = _GenieStreamParser()
+    try:
+        while True:
+            chunk = proc.stdout.read1(256)
+            if not chunk:
+                break
+            piece = parser.feed(decoder.decode(chunk))
+            if piece:
+                yield piece
+        piece = parser.feed(decoder.decode(b"", final=True))
+        if piece:
+            yield piece
+
+        returncode = proc.wait()
+        stderr_reader.join(timeout=5)
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(args, timeout_sec)
+        if returncode != 0:
+            stderr = (b"".join(stderr_chunks)).decode("utf-8", errors="ignore")
+            raise RuntimeError(
+                f"Genie 실패 (code {returncode})\nSTDERR:\n{stderr}\nSTDOUT:\n{''.join(parser.raw)}"
+            )
+
+        piece = parser.finish()
+        if piece:
+            yield piece
+    finally:
+        timer.cancel()
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+def submit_qwen_prompt(prompt: str) -> Future:
+    """LLM 큐에 프롬프트 추가 → 결과 텍스트 Future (실행은 다른 Genie 호출과 같은 슬롯을 나눠 씀)"""
+    return _llm_queue.submit(run_qwen_with_genie, _ensure_utf8(prompt))
+
 # =========================
 # 프롬프트 빌더 (원본 스타일)
 # =========================
@@ -101,6 +291,95 @@ def qwen_prompt_summary(email_text: str) -> str:
     return prompt
 
 
+def qwen_prompt_summary_chunk(chunk_text: str, kind: str, max_words: int = 60) -> str:
+    """긴 문서/스레드의 한 부분 요약 (부분 번호는 넣지 않음 → 내용이 같으면 캐시 재사용)"""
+    system_msg = (
+        "You are a helpful assistant. "
+        "Summarize one section of a longer text. Keep names, numbers, dates and decisions."
+    )
+    user_msg = textwrap.dedent(f"""
+    The following is one section of a longer {kind.strip()}.
+    Summarize this section in <= {max_words} words.
+
+    {chunk_text.strip()}
+    """).strip()
+
+    prompt = f"""<|im_start|>system
+{system_msg}<|im_end|>
+<|im_start|>user
+{user_msg}<|im_end|>
+<|im_start|>assistant
+"""
+    return prompt
+
+
+def qwen_prompt_reduce(section_summaries: str, kind: str, title: str = "", max_words: int = 25) -> str:
+    """부분 요약 목록 → 전체 요약"""
+    system_msg = (
+        "You are a helpful assistant. "
+        "Write a concise, neutral summary in one or two short sentences."
+    )
+    title_line = f"Title: {title.strip()}\n" if title and title.strip() else ""
+    user_msg = textwrap.dedent(f"""
+    Below are summaries of consecutive sections of one {kind.strip()}, in order.
+    Combine them into a single summary of the whole {kind.strip()} in <= {max_words} words.
+    """).strip() + f"\n\n{title_line}{section_summaries.strip()}"
+
+    prompt = f"""<|im_start|>system
+{system_msg}<|im_end|>
+<|im_start|>user
+{user_msg}<|im_end|>
+<|im_start|>assistant
+"""
+    return prompt
+
+
+def qwen_prompt_thread_update(previous_summary: str, new_messages: str, subject: str = "", max_words: int = 40) -> str:
+    """기존 스레드 요약 + 새 메일 내용 → 갱신된 스레드 요약"""
+    system_msg = (
+        "You are a helpful assistant. "
+        "Write a concise, neutral summary of an email conversation in one to three short sentences."
+    )
+    subject_line = f"Subject: {subject.strip()}\n" if subject and subject.strip() else ""
+    user_msg = textwrap.dedent(f"""
+    Below is the summary of an email thread so far, followed by the new messages in that thread, in order.
+    Update the summary so it covers the whole conversation, including the latest status, in <= {max_words} words.
+    """).strip() + f"\n\n{subject_line}Summary so far: {previous_summary.strip()}\n\nNew messages:\n{new_messages.strip()}"
+
+    prompt = f"""<|im_start|>system
+{system_msg}<|im_end|>
+<|im_start|>user
+{user_msg}<|im_end|>
+<|im_start|>assistant
+"""
+    return prompt
+
+
+def qwen_prompt_mail_analysis(email_text: str, subject: str, sender: str, date: str, categories: list) -> str:
+    """메일 1개 통합 분석 (요약/분류/중요도/할일/날짜를 JSON 하나로)"""
+    system_msg = (
+        "You are an email analysis assistant. "
+        "Respond with a single JSON object only, no explanation and no code fences."
+    )
+    user_msg = textwrap.dedent(f"""
+    Analyze the email below and return JSON with exactly these keys:
+    "summary": concise neutral summary in <= 25 words,
+    "category": one of {", ".join(f'"{category}"' for category in categories)},
+    "importance": "high", "medium" or "low",
+    "action_items": list of {{"title": short task, "type": "meeting" | "deadline" | "task" | "event", "date": "YYYY-MM-DD" or null, "time": "HH:MM" or null}},
+    "dates": list of {{"date": "YYYY-MM-DD", "description": what happens}}.
+    Use [] when there are no action items or dates. The email was sent on {date.strip() or "unknown"}; resolve relative dates from it.
+    """).strip() + f"\n\nFrom: {sender.strip()}\nSubject: {subject.strip()}\n\n{email_text.strip()}"
+
+    prompt = f"""<|im_start|>system
+{system_msg}<|im_end|>
+<|im_start|>user
+{user_msg}<|im_end|>
+<|im_start|>assistant
+"""
+    return prompt
+
+
 def qwen_prompt_extract_target(user_command: str) -> str:
     system_msg = (
         "You are an email assistant. "
@@ -168,10 +447,18 @@ def _sanitize_for_prompt(s: str) -> str:
 # 공개 API (Flask용 래퍼)
 # ======================
 
-def genie_summarize_email(email_text: str, max_words: int = 25, max_chars: int = 1500) -> str:
-    """이메일 본문을 Qwen(Genie)로 요약하여 한 줄로 반환"""
-    snippet = _sanitize_for_prompt(email_text[:max_chars])
-    prompt = qwen_prompt_summary(snippet)
+def summary_output_tokens(max_words: int) -> int:
+    """요약 생성에 남겨 둘 토큰 수 (한국어는 단어당 토큰이 많아 여유 있게)"""
+    return max_words * 4 + 16
+
+def genie_summarize_email(email_text: str, max_words: int = 25, budget_tokens: Optional[int] = None) -> str:
+    """이메일 본문을 Qwen(Genie)로 요약하여 한 줄로 반환 (본문은 토큰 예산만큼만 입력)"""
+    prompt = build_prompt(
+        qwen_prompt_summary,
+        [section("email_text", _sanitize_for_prompt(email_text))],
+        max_new_tokens=summary_output_tokens(max_words),
+        budget_tokens=budget_tokens
+    )
     prompt = _ensure_utf8(prompt)
     out = run_qwen_with_genie(prompt).strip()
     # 단어 수 컷(모델이 길게 답할 때 대비)
@@ -180,17 +467,63 @@ def genie_summarize_email(email_text: str, max_words: int = 25, max_chars: int =
         out = " ".join(words[:max_words]).rstrip(",.;") + "..."
     return out
 
+def cut_words(text: str, max_words: int) -> str:
+    """단어 수 컷(모델이 길게 답할 때 대비)"""
+    words = text.split()
+    if len(words) > max_words:
+        return " ".join(words[:max_words]).rstrip(",.;") + "..."
+    return text
+
+def genie_update_thread_summary(previous_summary: str, new_messages: str, subject: str = "", max_words: int = 40) -> str:
+    """스레드 누적 요약 갱신 (이전 요약 + 새 메일 내용만 입력, 예산을 넘으면 오래된 새 메일부터 잘림)"""
+    prompt = build_prompt(
+        lambda subject, previous_summary, new_messages: qwen_prompt_thread_update(
+            previous_summary, new_messages, subject, max_words
+        ),
+        [
+            section("subject", subject, priority=0),
+            section("previous_summary", previous_summary, priority=1),
+            section("new_messages", _sanitize_for_prompt(new_messages), priority=2, keep="tail"),
+        ],
+        max_new_tokens=summary_output_tokens(max_words)
+    )
+    prompt = _ensure_utf8(prompt)
+    return cut_words(run_qwen_with_genie(prompt).strip(), max_words)
+
+def genie_analyze_mail(email_text: str, subject: str, sender: str, date: str, categories: list,
+                       max_new_tokens: int = 384) -> str:
+    """메일 통합 분석 (LLM 1회) → 모델 원본 출력 (JSON 파싱/검증은 호출 측에서)"""
+    prompt = build_prompt(
+        lambda sender, subject, email_text: qwen_prompt_mail_analysis(email_text, subject, sender, date, categories),
+        [
+            section("sender", sender, priority=0),
+            section("subject", subject, priority=0),
+            section("email_text", _sanitize_for_prompt(email_text), priority=1),
+        ],
+        max_new_tokens=max_new_tokens
+    )
+    prompt = _ensure_utf8(prompt)
+    return run_qwen_with_genie(prompt).strip()
+
 def genie_extract_search_target(user_command: str) -> str:
     """자연어 명령에서 '단 하나의' 대상(이름/이메일) 추출"""
-    prompt = qwen_prompt_extract_target(user_command)
+    prompt = build_prompt(qwen_prompt_extract_target, [section("user_command", user_command)], max_new_tokens=64)
     prompt = _ensure_utf8(prompt)
     out = run_qwen_with_genie(prompt)
     return parse_extracted_target(out)
 
-def genie_summarize_document(file_text: str, file_name: str, file_type: str, max_words: int = 25, max_chars: int = 1500) -> str:
-    """이메일 본문을 Qwen(Genie)로 요약하여 한 줄로 반환"""
-    snippet = _sanitize_for_prompt(file_text[:max_chars])
-    prompt = qwen_prompt_summary_file(snippet, file_name, file_type)
+def genie_summarize_document(file_text: str, file_name: str, file_type: str, max_words: int = 25,
+                             budget_tokens: Optional[int] = None) -> str:
+    """문서 내용을 Qwen(Genie)로 요약하여 한 줄로 반환 (내용은 토큰 예산만큼만 입력)"""
+    prompt = build_prompt(
+        lambda file_name, file_text: qwen_prompt_summary_file(file_text, file_name, file_type),
+        [
+            section("file_name", file_name, priority=0),
+            section("file_text", _sanitize_for_prompt(file_text), priority=1),
+        ],
+        max_new_tokens=summary_output_tokens(max_words),
+        budget_tokens=budget_tokens
+    )
     prompt = _ensure_utf8(prompt)
     out = run_qwen_with_genie(prompt).strip()
     # 단어 수 컷(모델이 길게 답할 때 대비)
@@ -224,7 +557,7 @@ def qwen_prompt_summary_file(file_text: str, file_name: str, file_type: str) ->
 def genie_analyze_intent(user_input: str) -> str:
     """자연어 명령에서 '단 하나의' 대상(이름/이메일) 추출"""
     print("hi11111")
-    prompt = qwen_prompt_command(user_input)
+    prompt = build_prompt(qwen_prompt_command, [section("user_input", user_input)], max_new_tokens=64)
     print("hi22222")
     prompt = _ensure_utf8(prompt)
     print(f"[프롬프트] {prompt}")
@@ -276,4 +609,8 @@ def genie_reply(prompt) -> str:
     """자연어 명령에서 '단 하나의' 대상(이름/이메일) 추출"""
     prompt_renew = _ensure_utf8(prompt)
     out = run_qwen_with_genie(prompt_renew)
-    return out
\ No newline at end of file
+    return out
+
+def genie_reply_stream(prompt):
+    """genie_reply의 스트리밍 버전 → 답변 텍스트 조각 제너레이터"""
+    return stream_qwen_with_genie(_ensure_utf8(prompt))
\ No newline at end of file
@@ -0,0 +1,187 @@
+"""
+긴 문서/메일 스레드 계층 요약 (map-reduce)
+
+앞부분만 잘라 요약하는 대신 전체 텍스트를 청크로 나눠 부분 요약(map)한 뒤 합쳐 최종 요약(reduce)합니다.
+- 청크 크기: Qwen 토큰 수 기준 (프롬프트 예산에서 템플릿을 뺀 값 이하 → build_prompt가 청크 뒷부분을 자르지 않음)
+- 청크 경계: 페이지/슬라이드/시트 구분선 → 빈 줄(문단) → 줄 → 토큰 수 순으로 찾음
+- 앞에서부터 채워 나누므로 뒤에 내용이 붙어도 앞쪽 청크는 그대로 → 청크 요약 캐시 재사용
+- 청크 요약은 LLM 큐(submit_qwen_prompt)에 묶음 단위로 넣어 병렬 실행
+- 부분 요약을 합친 길이가 청크 길이를 넘으면 다시 묶어 요약 (reduce 단계 반복)
+"""
+import re
+import hashlib
+import threading
+from services.analysis_cache import AttachmentAnalysisCache
+from services.genie_qwen import (
+    submit_qwen_prompt, qwen_prompt_summary_chunk, qwen_prompt_reduce, cut_words, summary_output_tokens,
+    _sanitize_for_prompt
+)
+from services.prompt_budget import build_prompt, section, section_budget_tokens, get_token_counter
+
+# 추출 텍스트의 페이지/슬라이드/시트 구분선 ("=== 페이지 3 ===", "=== 슬라이드 2 ===", "=== 시트: Sheet1 ===")
+SECTION_BREAK = re.compile(r'\n(?==== )')
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+
+def split_into_chunks(text, max_tokens):
+    """텍스트 → max_tokens 이하 청크 목록 (큰 경계 단위부터 앞에서부터 채움)"""
+    counter = get_token_counter()
+    chunks = []
+    current, current_tokens = '', 0
+    for unit in _split_units(text, max_tokens, counter):
+        unit_tokens = counter.count(unit)
+        if current and current_tokens + 1 + unit_tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = unit, unit_tokens
+        else:
+            current = f"{current}\n{unit}" if current else unit
+            current_tokens += unit_tokens + (1 if current_tokens else 0)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _split_units(text, max_tokens, counter):
+    """max_tokens 이하가 될 때까지 구분선 → 문단 → 줄 → 토큰 수 순으로 쪼갠 단위"""
+    for section in SECTION_BREAK.split(text):
+        if counter.count(section) <= max_tokens:
+            if section.strip():
+                yield section.strip()
+            continue
+        for paragraph in PARAGRAPH_BREAK.split(section):
+            if counter.count(paragraph) <= max_tokens:
+                if paragraph.strip():
+                    yield paragraph.strip()
+                continue
+            for line in paragraph.splitlines():
+                while line:
+                    piece = counter.truncate(line, max_tokens) or line[:1]
+                    line = line[len(piece):]
+                    if piece.strip():
+                        yield piece.strip()
+
+
+def _spread(chunks, limit):
+    """청크가 너무 많으면 처음/끝을 포함해 고르게 limit개 선택"""
+    if len(chunks) <= limit:
+        return chunks
+    step = (len(chunks) - 1) / (limit - 1)
+    return [chunks[round(index * step)] for index in range(limit)]
+
+
+class HierarchicalSummarizer:
+    """청크 요약 캐시를 가진 map-reduce 요약기"""
+
+    CHUNK_MAX_WORDS = 60   # 부분 요약 길이
+    MAX_REDUCE_ROUNDS = 3  # 부분 요약을 다시 묶는 최대 횟수
+    PROMPT_MARGIN_TOKENS = 48  # 종류 이름/제목 길이 차이 + 정제(_sanitize_for_prompt) 여유
+
+    def __init__(self, config):
+        self.max_chunk_tokens = config.SUMMARY_CHUNK_TOKENS
+        self._chunk_tokens = None
+        self.max_chunks = config.SUMMARY_MAX_CHUNKS
+        self.batch_size = max(1, config.SUMMARY_BATCH_SIZE)
+
+        # 청크 텍스트 해시 + 프롬프트 버전 키 (같은 청크는 문서/메일이 달라도 한 번만 요약)
+        self.cache = AttachmentAnalysisCache(
+            config.SUMMARY_CACHE_DIR,
+            config.SUMMARY_CACHE_MAX_BYTES,
+            config.SUMMARY_PROMPT_VERSION
+        )
+        self._lock = threading.Lock()
+        self.stats = {'single_pass': 0, 'map_reduce': 0, 'chunks': 0, 'cached_chunks': 0, 'reduce_rounds': 0}
+
+    def summarize(self, text, kind, summarize_short, title='', max_words=25):
+        """
+        텍스트 요약 (chunk_tokens 이하면 summarize_short(text) 한 번, 길면 map-reduce)
+        kind: 프롬프트에 넣을 텍스트 종류 ('email thread', 'PDF 보고서' 등), title: 최종 요약 프롬프트에 넣을 제목/파일명
+        """
+        text = (text or '').strip()
+        chunk_tokens = self.chunk_tokens
+        if get_token_counter().count(text) <= chunk_tokens:
+            self._count('single_pass')
+            return summarize_short(text)
+
+        chunks = split_into_chunks(text, chunk_tokens)
+        selected = _spread(chunks, self.max_chunks)
+        print(f"[🧩 계층 요약] {title or kind}: {len(text)}자 → 청크 {len(chunks)}개 ({chunk_tokens}토큰 단위)"
+              + (f" 중 {len(selected)}개" if len(selected) < len(chunks) else ""))
+
+        summaries = self._map(selected, kind)
+        self._count('map_reduce')
+        return self._reduce(summaries, kind, title, max_words)
+
+    def _map(self, chunks, kind):
+        """청크별 부분 요약 (캐시에 없는 청크만 LLM 큐에 batch_size개씩)"""
+        keys = [self._chunk_key(kind, chunk) for chunk in chunks]
+        summaries = [None] * len(chunks)
+        missing = []
+        for index, key in enumerate(keys):
+            cached = self.cache.get(key)
+            if cached and cached.get('summary'):
+                summaries[index] = cached['summary']
+            else:
+                missing.append(index)
+
+        self._count('chunks', len(chunks))
+        self._count('cached_chunks', len(chunks) - len(missing))
+
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            futures = {
+                index: submit_qwen_prompt(build_prompt(
+                    lambda chunk_text: qwen_prompt_summary_chunk(chunk_text, kind, self.CHUNK_MAX_WORDS),
+                    [section("chunk_text", _sanitize_for_prompt(chunks[index]))],
+                    max_new_tokens=summary_output_tokens(self.CHUNK_MAX_WORDS)
+                ))
+                for index in batch
+            }
+            for index, future in futures.items():
+                summaries[index] = cut_words(future.result().strip(), self.CHUNK_MAX_WORDS)
+                self.cache.put(keys[index], {'summary': summaries[index]})
+
+        return summaries
+
+    def _reduce(self, summaries, kind, title, max_words):
+        """부분 요약 → 최종 요약 (합친 길이가 청크 길이를 넘으면 다시 묶어 요약)"""
+        joined = "\n".join(f"- {summary}" for summary in summaries if summary)
+        rounds = 0
+        chunk_tokens = self.chunk_tokens
+        while get_token_counter().count(joined) > chunk_tokens and rounds < self.MAX_REDUCE_ROUNDS:
+            groups = split_into_chunks(joined, chunk_tokens)
+            summaries = self._map(groups, f"{kind} (section summaries)")
+            joined = "\n".join(f"- {summary}" for summary in summaries if summary)
+            rounds += 1
+        self._count('reduce_rounds', rounds)
+
+        prompt = build_prompt(
+            lambda title, section_summaries: qwen_prompt_reduce(section_summaries, kind, title, max_words),
+            [section("title", title, priority=0), section("section_summaries", joined, priority=1)],
+            max_new_tokens=summary_output_tokens(max_words)
+        )
+        return cut_words(submit_qwen_prompt(prompt).result().strip(), max_words)
+
+    @property
+    def chunk_tokens(self):
+        """청크 1개 토큰 수: 설정 상한과 청크 프롬프트 예산(템플릿 제외) 중 작은 값 (처음 사용할 때 1회 계산)"""
+        if self._chunk_tokens is None:
+            available = section_budget_tokens(
+                lambda chunk_text: qwen_prompt_summary_chunk(chunk_text, 'document (section summaries)', self.CHUNK_MAX_WORDS),
+                ["chunk_text"],
+                max_new_tokens=summary_output_tokens(self.CHUNK_MAX_WORDS)
+            )
+            self._chunk_tokens = max(1, min(self.max_chunk_tokens, available - self.PROMPT_MARGIN_TOKENS))
+        return self._chunk_tokens
+
+    @staticmethod
+    def _chunk_key(kind, chunk):
+        return hashlib.sha256(f"{kind}\n{chunk}".encode('utf-8')).hexdigest()
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def get_stats(self):
+        """요약 방식별 횟수 + 청크 캐시 적중 수"""
+        with self._lock:
+            return dict(self.stats, cache=self.cache.get_stats())
@@ -0,0 +1,180 @@
+"""
+LLM 토큰 스트리밍 (Server-Sent Events)
+
+AI 답장/문법 교정처럼 사용자가 결과를 기다리는 생성은 전체 출력을 모았다가 보내지 않고
+생성되는 대로 SSE 이벤트로 전달합니다.
+- Genie(NPU): genie_qwen.stream_qwen_with_genie가 stdout을 읽는 대로 [BEGIN]~[END] 사이 텍스트 전달
+- HF(CPU/GPU): TextIteratorStreamer로 generate()를 별도 스레드에서 실행하며 전달
+- 백엔드는 순서대로 시도하고, 첫 토큰 전에 실패한 경우에만 다음 백엔드로 넘어감
+- 첫 토큰까지 걸린 시간(TTFT)과 전체 시간을 done 이벤트/로그/통계로 보고
+
+이벤트: start {backends} → token {text} ... → done {success, backend, ttft_ms, total_ms, chunks, ...} | error {error}
+"""
+import json
+import threading
+import time
+
+try:
+    from transformers import TextIteratorStreamer, StoppingCriteria, StoppingCriteriaList
+    TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    TRANSFORMERS_AVAILABLE = False
+
+# 프록시/브라우저 버퍼링 없이 바로 전달
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'
+}
+RECENT_TTFT_SIZE = 50
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def sse_event(event, data):
+    """SSE 이벤트 1개 문자열"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def wants_stream(data, headers):
+    """요청 본문 stream 값 또는 Accept: text/event-stream 이면 스트리밍 응답"""
+    return bool((data or {}).get('stream')) or 'text/event-stream' in headers.get('Accept', '')
+
+
+if TRANSFORMERS_AVAILABLE:
+    class _StopOnEvent(StoppingCriteria):
+        """클라이언트 연결이 끊기면 HF generate() 중단"""
+
+        def __init__(self, stop_event):
+            self.stop_event = stop_event
+
+        def __call__(self, input_ids, scores, **kwargs):
+            import torch
+            return torch.full((input_ids.shape[0],), self.stop_event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+
+def stream_hf_generate(ai_models, prompt, max_new_tokens, **generate_kwargs):
+    """HF Qwen generate()를 스레드에서 실행하며 새로 생성된 텍스트 조각을 내보내는 제너레이터 (프롬프트 제외)"""
+    if not TRANSFORMERS_AVAILABLE:
+        raise RuntimeError("transformers 없음 - HF 스트리밍 불가")
+
+    tokenizer = ai_models.qwen_tokenizer
+    inputs = tokenizer(prompt, return_tensors="pt").to(ai_models.qwen_model.device)
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    stop_event = threading.Event()
+    errors = []
+
+    def _generate():
+        try:
+            ai_models.qwen_model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                streamer=streamer,
+                stopping_criteria=StoppingCriteriaList([_StopOnEvent(stop_event)]),
+                eos_token_id=tokenizer.eos_token_id,
+                pad_token_id=tokenizer.pad_token_id,
+                **generate_kwargs
+            )
+        except Exception as e:
+            errors.append(e)
+            streamer.end()  # 대기 중인 반복 종료
+
+    worker = threading.Thread(target=_generate, name="hf-stream", daemon=True)
+    worker.start()
+    try:
+        for piece in streamer:
+            if piece:
+                yield piece
+        worker.join()
+        if errors:
+            raise errors[0]
+    finally:
+        stop_event.set()
+
+
+def stream_events(name, sources, finalize, fallback=None, started_at=None):
+    """
+    LLM 스트림 → SSE 이벤트 제너레이터
+    sources: [(백엔드 이름, 텍스트 조각 제너레이터를 만드는 함수), ...] 순서대로 시도
+    finalize(전체 텍스트) → done 이벤트에 넣을 dict (답장 정리/교정 결과 서식 등)
+    fallback(오류) → 모든 백엔드가 첫 토큰 전에 실패했을 때 done 이벤트에 넣을 dict (없으면 error 이벤트)
+    started_at: TTFT 기준 시각 (time.perf_counter, 기본은 첫 이벤트 시각 → 프롬프트 준비 시간 포함하려면 요청 시작 시각 전달)
+    """
+    started_at = started_at or time.perf_counter()
+    yield sse_event('start', {'backends': [backend for backend, _ in sources]})
+
+    last_error = None
+    for backend, open_stream in sources:
+        chunks = []
+        ttft = None
+        stream = None
+        try:
+            stream = open_stream()
+            for piece in stream:
+                if ttft is None:
+                    ttft = time.perf_counter() - started_at
+                    print(f"[⏱️ 첫 토큰] {name} ({backend}) {ttft:.2f}초")
+                chunks.append(piece)
+                yield sse_event('token', {'text': piece})
+        except Exception as e:
+            if not chunks:
+                print(f"[⚠️ 스트리밍 실패 → 다음 백엔드] {name} ({backend}) {e}")
+                last_error = e
+                continue
+            # 이미 일부를 보낸 뒤 실패 → 다른 백엔드로 처음부터 다시 보내지 않고 오류로 끝냄
+            print(f"[❗스트리밍 중단] {name} ({backend}) {e}")
+            yield sse_event('error', {'error': str(e), 'partial_text': "".join(chunks)})
+            return
+        finally:
+            # 클라이언트 연결이 끊겨 이 제너레이터가 닫혀도 Genie 프로세스/HF 생성 정리
+            if stream is not None and hasattr(stream, 'close'):
+                stream.close()
+
+        total = time.perf_counter() - started_at
+        _record(name, backend, ttft, total)
+        print(f"[✅ 스트리밍 완료] {name} ({backend}) TTFT {ttft if ttft is not None else 0:.2f}초 / 전체 {total:.2f}초, 조각 {len(chunks)}개")
+        yield sse_event('done', dict(
+            finalize("".join(chunks)),
+            success=True,
+            backend=backend,
+            ttft_ms=round(ttft * 1000) if ttft is not None else None,
+            total_ms=round(total * 1000),
+            chunks=len(chunks)
+        ))
+        return
+
+    if fallback is not None:
+        yield sse_event('done', dict(fallback(last_error), success=True, backend='fallback',
+                                     ttft_ms=None, total_ms=round((time.perf_counter() - started_at) * 1000), chunks=0))
+        return
+    yield sse_event('error', {'error': str(last_error) if last_error else '사용 가능한 LLM 백엔드 없음'})
+
+
+def message_events(payload):
+    """LLM 없이 바로 끝나는 응답 (입력 없음 등)도 같은 SSE 형식으로"""
+    yield sse_event('done', dict(payload, backend='none', ttft_ms=None, total_ms=0, chunks=0))
+
+
+def _record(name, backend, ttft, total):
+    key = f"{name}:{backend}"
+    with _stats_lock:
+        stats = _stats.setdefault(key, {'count': 0, 'total_seconds': 0.0, 'recent_ttft': []})
+        stats['count'] += 1
+        stats['total_seconds'] += total
+        if ttft is not None:
+            stats['recent_ttft'] = (stats['recent_ttft'] + [ttft])[-RECENT_TTFT_SIZE:]
+
+
+def get_streaming_stats():
+    """엔드포인트/백엔드별 스트리밍 횟수, 최근 TTFT 평균/중앙값, 평균 전체 시간 (ms)"""
+    with _stats_lock:
+        result = {}
+        for key, stats in _stats.items():
+            recent = sorted(stats['recent_ttft'])
+            result[key] = {
+                'count': stats['count'],
+                'avg_total_ms': round(stats['total_seconds'] / stats['count'] * 1000),
+                'avg_ttft_ms': round(sum(recent) / len(recent) * 1000) if recent else None,
+                'p50_ttft_ms': round(recent[len(recent) // 2] * 1000) if recent else None
+            }
+        return result
@@ -0,0 +1,182 @@
+"""
+메일 통합 분석 (요약/분류/중요도/할일/날짜를 LLM 1회로)
+
+새 메일마다 임베딩 분류 → Genie 요약 → 규칙 기반 할일 추출을 따로 돌리는 대신,
+프롬프트 하나로 JSON을 받아 스키마로 검증합니다.
+- 필드별 검증: 통과한 필드만 사용하고, 빠지거나 잘못된 필드는 호출 측에서 기존 단계별 처리로 대체
+- 할일/날짜 목록은 잘못된 항목만 버리고 나머지는 사용
+- JSON 자체를 읽지 못하면 모든 필드를 기존 처리로 대체
+"""
+import json
+import re
+import threading
+from datetime import datetime
+from services.genie_qwen import genie_analyze_mail, cut_words
+
+SUMMARY_MAX_WORDS = 25
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+TIME_PATTERN = re.compile(r'^\d{1,2}:\d{2}$')
+
+# 통합 분석 응답 스키마 (category 후보는 분류 라벨에서 채움)
+MAIL_ANALYSIS_SCHEMA = {
+    'summary': {'type': str, 'max_words': SUMMARY_MAX_WORDS},
+    'category': {'type': str, 'enum': None},
+    'importance': {'type': str, 'enum': ['high', 'medium', 'low']},
+    'action_items': {'type': list, 'max_items': 10, 'items': {
+        'title': {'type': str, 'max_chars': 100},
+        'type': {'type': str, 'enum': ['meeting', 'deadline', 'task', 'event']},
+        'date': {'type': str, 'pattern': DATE_PATTERN, 'optional': True},
+        'time': {'type': str, 'pattern': TIME_PATTERN, 'optional': True},
+    }},
+    'dates': {'type': list, 'max_items': 10, 'items': {
+        'date': {'type': str, 'pattern': DATE_PATTERN},
+        'description': {'type': str, 'max_chars': 200, 'optional': True},
+    }},
+}
+
+
+def parse_analysis_json(text):
+    """모델 출력 → dict (코드 블록/앞뒤 설명/끝 쉼표 허용), 읽지 못하면 None"""
+    if not text:
+        return None
+    start, end = text.find('{'), text.rfind('}')
+    if start < 0 or end <= start:
+        return None
+    candidate = text[start:end + 1]
+    for attempt in (candidate, re.sub(r',\s*([}\]])', r'\1', candidate)):
+        try:
+            data = json.loads(attempt)
+            return data if isinstance(data, dict) else None
+        except ValueError:
+            continue
+    return None
+
+
+def _validate_value(value, rule):
+    """값 1개 검증 → (정규화한 값, 오류 메시지 또는 None)"""
+    if value is None or value == '':
+        return None, None if rule.get('optional') else 'missing'
+    if not isinstance(value, rule['type']):
+        return None, f"expected {rule['type'].__name__}"
+
+    if rule['type'] is str:
+        value = value.strip()
+        if rule.get('enum') is not None:
+            matched = next((option for option in rule['enum'] if option.lower() == value.lower().rstrip('.')), None)
+            if matched is None:
+                return None, f"not in {rule['enum']}"
+            value = matched
+        if rule.get('pattern') is not None:
+            if not rule['pattern'].match(value):
+                return None, 'bad format'
+            if rule['pattern'] is DATE_PATTERN:
+                try:
+                    datetime.strptime(value, '%Y-%m-%d')
+                except ValueError:
+                    return None, 'invalid date'
+        if rule.get('max_words'):
+            value = cut_words(value, rule['max_words'])
+        if rule.get('max_chars'):
+            value = value[:rule['max_chars']]
+        if not value:
+            return None, None if rule.get('optional') else 'empty'
+        return value, None
+
+    # 목록: 항목별 검증, 잘못된 항목만 제외
+    items = []
+    for item in value[:rule['max_items']]:
+        if not isinstance(item, dict):
+            continue
+        normalized = {}
+        for key, item_rule in rule['items'].items():
+            normalized[key], error = _validate_value(item.get(key), item_rule)
+            if error and item_rule.get('optional'):
+                continue  # 선택 필드는 잘못된 값만 비움 (예: 날짜를 특정하지 못한 할일)
+            if error:
+                break
+        else:
+            items.append(normalized)
+    return items, None
+
+
+def validate_analysis(data, categories):
+    """스키마 검증 → (통과한 필드 dict, 필드별 오류 dict)"""
+    fields, errors = {}, {}
+    for key, rule in MAIL_ANALYSIS_SCHEMA.items():
+        if key == 'category':
+            rule = dict(rule, enum=categories)
+        value, error = _validate_value(data.get(key), rule)
+        if error:
+            errors[key] = error
+        else:
+            fields[key] = value
+    return fields, errors
+
+
+class MailAnalysisService:
+    """메일 통합 분석 (검증을 통과하지 못한 필드는 None → 호출 측 단계별 처리로 대체)"""
+
+    def __init__(self, config, todo_service):
+        self.labels = config.CANDIDATE_LABELS
+        self.categories = [label.rstrip('.') for label in self.labels]
+        self.todo_service = todo_service
+        self._lock = threading.Lock()
+        self.stats = {
+            'calls': 0, 'llm_failures': 0, 'parse_failures': 0,
+            'fallbacks': {key: 0 for key in MAIL_ANALYSIS_SCHEMA}
+        }
+
+    def analyze(self, content, subject, sender, date):
+        """
+        메일 통합 분석 → {'summary', 'classification', 'importance', 'todo_result', 'dates', 'errors'}
+        값이 None인 항목은 기존 단계별 처리로 대체해야 함
+        """
+        result = {'summary': None, 'classification': None, 'importance': None, 'todo_result': None, 'dates': None}
+        self._count('calls')
+        try:
+            raw = genie_analyze_mail(content, subject, sender, date or '', self.categories)
+        except Exception as e:
+            print(f"[⚠️ 통합 분석 실패] {e}")
+            self._count('llm_failures')
+            return self._with_fallbacks(result, {key: 'llm_failed' for key in MAIL_ANALYSIS_SCHEMA})
+
+        data = parse_analysis_json(raw)
+        if data is None:
+            print(f"[⚠️ 통합 분석 JSON 파싱 실패] {raw[:100]}")
+            self._count('parse_failures')
+            return self._with_fallbacks(result, {key: 'invalid_json' for key in MAIL_ANALYSIS_SCHEMA})
+
+        fields, errors = validate_analysis(data, self.categories)
+        if 'summary' in fields:
+            result['summary'] = fields['summary']
+        if 'category' in fields:
+            label = self.labels[self.categories.index(fields['category'])]
+            result['classification'] = {'classification': label, 'confidence': None, 'method': 'mail_analysis'}
+        if 'importance' in fields:
+            result['importance'] = fields['importance']
+        if 'action_items' in fields:
+            result['todo_result'] = self.todo_service.build_todos_from_items(
+                fields['action_items'], subject, sender, date
+            )
+        if 'dates' in fields:
+            result['dates'] = fields['dates']
+
+        if errors:
+            print(f"[⚠️ 통합 분석 일부 필드 대체] {errors}")
+        return self._with_fallbacks(result, errors)
+
+    def _with_fallbacks(self, result, errors):
+        with self._lock:
+            for key in errors:
+                self.stats['fallbacks'][key] += 1
+        result['errors'] = errors
+        return result
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def get_stats(self):
+        """통합 분석 호출 수 + 필드별 대체 횟수"""
+        with self._lock:
+            return dict(self.stats, fallbacks=dict(self.stats['fallbacks']))
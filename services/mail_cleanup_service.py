@@ -2,9 +2,10 @@
 메일 자동 삭제 서비스
 """
 from datetime import datetime, timedelta
-from models.tables import UserSettings, Mail
+from models.tables import UserSettings, Mail, MailAttachment, AttachmentTextChunk
 from models.db import db
-from sqlalchemy import and_
+from config import Config
+from sqlalchemy import and_, case, func
 
 class MailCleanupService:
     """메일 자동 삭제 서비스"""
@@ -30,7 +31,8 @@ class MailCleanupService:
         try:
             print(f"[🗑️ 삭제] {user_email} 사용자의 메일 삭제 설정 업데이트")
             settings = UserSettings.get_or_create(user_email, 'MY_EMAIL', 'MAIL_DELETE')
-            settings.settings_data.update(settings_data)
+            # JSON 컬럼 변경 감지를 위해 새 dict로 교체
+            settings.settings_data = {**(settings.settings_data or {}), **settings_data}
             settings.updated_at = datetime.utcnow()
             
             db.session.commit()
@@ -59,7 +61,63 @@ class MailCleanupService:
         return period_map.get(period_setting, 7)
     
     @staticmethod
-    def cleanup_old_mails(user_email):
+    def _build_cleanup_conditions(settings, cutoff_date):
+        """설정에서 활성화된 삭제 대상별 WHERE 조건 생성"""
+        conditions = {}
+        
+        # 보낸 메일함
+        if settings.get('autoDeleteSentMail', False):
+            conditions['sent'] = and_(Mail.mail_type == 'sent', Mail.date < cutoff_date)
+        
+        # 스팸 메일함
+        if settings.get('autoDeleteSpamMail', False):
+            conditions['spam'] = and_(Mail.classification == 'spam mail.', Mail.date < cutoff_date)
+        
+        # 휴지통
+        if settings.get('autoDeleteTrashMail', False):
+            conditions['trash'] = and_(Mail.tag == '휴지통', Mail.date < cutoff_date)
+        
+        return conditions
+    
+    @staticmethod
+    def _delete_in_chunks(user_email, condition, chunk_size):
+        """
+        조건에 맞는 메일을 청크 단위 DELETE ... WHERE로 삭제 (청크마다 커밋)
+        첨부파일 행은 CASCADE로 함께 삭제되고, 더 이상 참조되지 않는 추출 텍스트도 같은 트랜잭션에서 삭제
+        """
+        total_deleted = 0
+        
+        while True:
+            # 키만 조회 (본문/원문 컬럼은 읽지 않음)
+            mail_ids = [row[0] for row in db.session.query(Mail.mail_id).filter(
+                Mail.user_email == user_email,
+                condition
+            ).limit(chunk_size)]
+            
+            if not mail_ids:
+                break
+            
+            content_hashes = [row[0] for row in db.session.query(MailAttachment.content_hash).filter(
+                MailAttachment.user_email == user_email,
+                MailAttachment.mail_id.in_(mail_ids),
+                MailAttachment.content_hash.isnot(None)
+            ).distinct()]
+            
+            deleted = Mail.query.filter(
+                Mail.user_email == user_email,
+                Mail.mail_id.in_(mail_ids)
+            ).delete(synchronize_session=False)
+            AttachmentTextChunk.delete_orphans(content_hashes)
+            db.session.commit()
+            total_deleted += deleted
+            
+            if len(mail_ids) < chunk_size:
+                break
+        
+        return total_deleted
+    
+    @staticmethod
+    def cleanup_old_mails(user_email, chunk_size=None):
         """오래된 메일 자동 삭제 실행"""
         try:
             print(f"[🗑️ 삭제] {user_email} 사용자의 오래된 메일 자동 삭제 시작")
@@ -70,61 +128,22 @@ class MailCleanupService:
             settings = settings_result['settings']
             period_days = MailCleanupService.get_period_days(settings.get('periodSetting', '1주일'))
             cutoff_date = datetime.utcnow() - timedelta(days=period_days)
+            chunk_size = chunk_size or Config.CLEANUP_DELETE_CHUNK_SIZE
             
-            print(f"[🗑️ 삭제] 삭제 기준일: {cutoff_date} ({period_days}일 전)")
+            print(f"[🗑️ 삭제] 삭제 기준일: {cutoff_date} ({period_days}일 전), 청크 크기: {chunk_size}")
             
             deleted_counts = {
                 'sent': 0,
                 'spam': 0,
                 'trash': 0
             }
+            labels = {'sent': '보낸 메일', 'spam': '스팸 메일', 'trash': '휴지통 메일'}
             
-            # 보낸 메일함 자동 삭제
-            if settings.get('autoDeleteSentMail', False):
-                sent_mails = Mail.query.filter(
-                    and_(
-                        Mail.user_email == user_email,
-                        Mail.mail_type == 'sent',
-                        Mail.date < cutoff_date
-                    )
-                ).all()
-                
-                for mail in sent_mails:
-                    db.session.delete(mail)
-                deleted_counts['sent'] = len(sent_mails)
-                print(f"[🗑️ 삭제] 보낸 메일 {len(sent_mails)}개 삭제 예정")
-            
-            # 스팸 메일함 자동 삭제
-            if settings.get('autoDeleteSpamMail', False):
-                spam_mails = Mail.query.filter(
-                    and_(
-                        Mail.user_email == user_email,
-                        Mail.classification == 'spam mail.',
-                        Mail.date < cutoff_date
-                    )
-                ).all()
-                
-                for mail in spam_mails:
-                    db.session.delete(mail)
-                deleted_counts['spam'] = len(spam_mails)
-                print(f"[🗑️ 삭제] 스팸 메일 {len(spam_mails)}개 삭제 예정")
-            
-            # 휴지통 메일 자동 삭제
-            if settings.get('autoDeleteTrashMail', False):
-                trash_mails = Mail.query.filter(
-                    and_(
-                        Mail.user_email == user_email,
-                        Mail.tag == '휴지통',
-                        Mail.date < cutoff_date
-                    )
-                ).all()
-                
-                for mail in trash_mails:
-                    db.session.delete(mail)
-                deleted_counts['trash'] = len(trash_mails)
-                print(f"[🗑️ 삭제] 휴지통 메일 {len(trash_mails)}개 삭제 예정")
+            conditions = MailCleanupService._build_cleanup_conditions(settings, cutoff_date)
+            for key, condition in conditions.items():
+                deleted_counts[key] = MailCleanupService._delete_in_chunks(user_email, condition, chunk_size)
+                print(f"[🗑️ 삭제] {labels[key]} {deleted_counts[key]}개 삭제")
             
-            db.session.commit()
             print(f"[✅ 삭제] 자동 삭제 완료")
             
             return {
@@ -140,7 +159,7 @@ class MailCleanupService:
     
     @staticmethod
     def preview_cleanup(user_email):
-        """삭제 예상 메일 수 미리보기"""
+        """삭제 예상 메일 수 미리보기 (단일 집계 쿼리)"""
         try:
             print(f"[👀 삭제] {user_email} 사용자의 삭제 예상 메일 수 미리보기")
             settings_result = MailCleanupService.get_deletion_settings(user_email)
@@ -157,35 +176,17 @@ class MailCleanupService:
                 'trash': 0
             }
             
-            # 보낸 메일함 예상 삭제 수
-            if settings.get('autoDeleteSentMail', False):
-                preview_counts['sent'] = Mail.query.filter(
-                    and_(
-                        Mail.user_email == user_email,
-                        Mail.mail_type == 'sent',
-                        Mail.date < cutoff_date
-                    )
-                ).count()
-            
-            # 스팸 메일함 예상 삭제 수
-            if settings.get('autoDeleteSpamMail', False):
-                preview_counts['spam'] = Mail.query.filter(
-                    and_(
-                        Mail.user_email == user_email,
-                        Mail.classification == 'spam mail.',
-                        Mail.date < cutoff_date
-                    )
-                ).count()
-            
-            # 휴지통 예상 삭제 수
-            if settings.get('autoDeleteTrashMail', False):
-                preview_counts['trash'] = Mail.query.filter(
-                    and_(
-                        Mail.user_email == user_email,
-                        Mail.tag == '휴지통',
-                        Mail.date < cutoff_date
-                    )
-                ).count()
+            # 활성화된 항목별 건수를 SUM(CASE ...)로 한 번에 계산
+            conditions = MailCleanupService._build_cleanup_conditions(settings, cutoff_date)
+            if conditions:
+                keys = list(conditions.keys())
+                counts = db.session.query(*[
+                    func.coalesce(func.sum(case((conditions[key], 1), else_=0)), 0)
+                    for key in keys
+                ]).filter(Mail.user_email == user_email).one()
+                
+                for key, count in zip(keys, counts):
+                    preview_counts[key] = int(count)
             
             print(f"[👀 삭제] 미리보기 완료: {preview_counts}")
             
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Qwen/Genie 프롬프트 토큰 예산 빌더
+
+글자 수([:800], [:1500] 등)로 자르면 한국어/영어의 글자당 토큰 수 차이 때문에
+같은 길이라도 입력 토큰 수가 몇 배씩 달라집니다. 여기서는 Qwen 토크나이저로 토큰을 세고,
+프롬프트를 섹션 단위로 나눠 우선순위대로 고정 예산 안에 채웁니다.
+- 토크나이저: Genie 번들의 tokenizer.json → HF Qwen 토크나이저 → 글자 수 추정 순 (프로세스당 1회 로딩)
+- 예산: min(GENIE_PROMPT_BUDGET_TOKENS, Genie 컨텍스트 - 생성 토큰 - 템플릿 고정 부분)
+- 섹션: 우선순위가 높은(숫자가 작은) 섹션부터 최소 토큰 → 남은 예산을 다시 우선순위 순으로 배분
+"""
+from __future__ import annotations
+import json
+import os
+import threading
+from config import Config
+
+try:
+    from tokenizers import Tokenizer
+    TOKENIZERS_AVAILABLE = True
+except ImportError:
+    TOKENIZERS_AVAILABLE = False
+
+try:
+    from transformers import AutoTokenizer
+    TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    TRANSFORMERS_AVAILABLE = False
+
+# 환경변수(선택): GENIE_BUNDLE_DIR, GENIE_CONFIG_NAME, GENIE_CONTEXT_TOKENS, GENIE_PROMPT_BUDGET_TOKENS
+GENIE_BUNDLE_DIR = os.getenv("GENIE_BUNDLE_DIR", r"C:\Genie\Qwen2_5_7B\genie_bundle")
+GENIE_CONFIG_NAME = os.getenv("GENIE_CONFIG_NAME", "genie_config.json")
+GENIE_CONTEXT_TOKENS = int(os.getenv("GENIE_CONTEXT_TOKENS", "0"))              # 0이면 genie_config.json 값 (없으면 4096)
+GENIE_PROMPT_BUDGET_TOKENS = int(os.getenv("GENIE_PROMPT_BUDGET_TOKENS", "1024"))  # 프롬프트 1개 입력 토큰 상한 (추론 비용 고정)
+DEFAULT_CONTEXT_TOKENS = 4096
+
+TRUNCATION_MARK = " ..."
+MAX_CHARS_PER_TOKEN = 6  # 자를 때 토큰화할 앞부분 길이 상한 (토큰 수 x 이 값)
+FALLBACK_INPUT_TOKENS = 384  # HF(CPU/GPU) 대체 경로의 입력 텍스트 토큰 수
+
+_counter = None
+_counter_lock = threading.Lock()
+
+
+class TokenCounter:
+    """Qwen 토크나이저 기반 토큰 수 계산/자르기 (토크나이저가 없으면 글자 종류별 추정)"""
+
+    def __init__(self):
+        self.source = "estimate"
+        self._encode = None
+        self._load()
+
+    def _load(self):
+        tokenizer_path = os.path.join(GENIE_BUNDLE_DIR, "tokenizer.json")
+        if TOKENIZERS_AVAILABLE and os.path.isfile(tokenizer_path):
+            try:
+                tokenizer = Tokenizer.from_file(tokenizer_path)
+                self._encode = lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+                self.source = tokenizer_path
+                print(f"[✅ 토크나이저] Genie 번들 tokenizer.json 로딩 완료")
+                return
+            except Exception as e:
+                print(f"[⚠️ 토크나이저] tokenizer.json 로딩 실패: {e}")
+
+        if TRANSFORMERS_AVAILABLE:
+            try:
+                tokenizer = AutoTokenizer.from_pretrained(Config.QWEN_MODEL, trust_remote_code=True)
+                self._encode = lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+                self.source = Config.QWEN_MODEL
+                print(f"[✅ 토크나이저] {Config.QWEN_MODEL} 토크나이저 로딩 완료")
+                return
+            except Exception as e:
+                print(f"[⚠️ 토크나이저] {Config.QWEN_MODEL} 로딩 실패: {e}")
+
+        print("[⚠️ 토크나이저] Qwen 토크나이저 없음 → 글자 수로 토큰 추정")
+
+    def count(self, text):
+        """텍스트 토큰 수"""
+        if not text:
+            return 0
+        if self._encode is not None:
+            return self._encode(text)
+        # 추정: 한글/한자 등 비ASCII 글자는 1글자 ≈ 1토큰, ASCII는 약 3.5글자 ≈ 1토큰
+        non_ascii = sum(1 for ch in text if ord(ch) > 127)
+        return non_ascii + int((len(text) - non_ascii) / 3.5) + 1
+
+    def truncate(self, text, max_tokens, keep="head"):
+        """max_tokens 이하로 자르기 (keep='head'면 앞부분, 'tail'이면 뒷부분 유지, 가능하면 공백 경계)"""
+        if not text or max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+
+        # 토큰화 비용을 줄이기 위해 필요한 길이만큼만 잘라서 시작
+        limit = max_tokens * MAX_CHARS_PER_TOKEN
+        text = text[:limit] if keep == "head" else text[-limit:]
+
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            piece = text[:middle] if keep == "head" else text[len(text) - middle:]
+            if self.count(piece) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+
+        if keep == "head":
+            piece = text[:low]
+            boundary = piece.rfind(" ", int(low * 0.8))
+            return piece[:boundary] if boundary > 0 else piece
+        piece = text[len(text) - low:]
+        boundary = piece.find(" ", 0, int(low * 0.2))
+        return piece[boundary + 1:] if boundary >= 0 else piece
+
+
+def get_token_counter():
+    """프로세스 공용 TokenCounter (처음 호출 시 1회 로딩)"""
+    global _counter
+    if _counter is None:
+        with _counter_lock:
+            if _counter is None:
+                _counter = TokenCounter()
+    return _counter
+
+
+def count_tokens(text):
+    return get_token_counter().count(text)
+
+
+def get_context_tokens():
+    """Genie 컨텍스트 크기 (환경변수 → genie_config.json dialog.context.size → 4096)"""
+    if GENIE_CONTEXT_TOKENS > 0:
+        return GENIE_CONTEXT_TOKENS
+    try:
+        with open(os.path.join(GENIE_BUNDLE_DIR, GENIE_CONFIG_NAME), encoding="utf-8") as f:
+            return int(json.load(f)["dialog"]["context"]["size"])
+    except Exception:
+        return DEFAULT_CONTEXT_TOKENS
+
+
+def section(name, text, priority=1, min_tokens=0, keep="head"):
+    """
+    프롬프트 섹션
+    priority: 작을수록 먼저 예산 배분 (0 = 지시문/메타데이터처럼 거의 자르지 않을 부분)
+    min_tokens: 우선 보장하는 토큰 수, keep: 잘릴 때 유지할 쪽 ('head' | 'tail')
+    """
+    return {"name": name, "text": (text or "").strip(), "priority": priority, "min_tokens": min_tokens, "keep": keep}
+
+
+def prompt_budget_tokens(max_new_tokens=256, budget_tokens=None):
+    """프롬프트 1개 입력 토큰 상한 (템플릿 포함)"""
+    return min(budget_tokens or GENIE_PROMPT_BUDGET_TOKENS, get_context_tokens() - max_new_tokens)
+
+
+def section_budget_tokens(render, names, max_new_tokens=256, budget_tokens=None):
+    """render 템플릿의 고정 부분을 뺀, 섹션 텍스트에 쓸 수 있는 토큰 수 (입력을 미리 나눌 크기 계산용)"""
+    fixed_tokens = count_tokens(render(**{name: "" for name in names}))
+    return max(0, prompt_budget_tokens(max_new_tokens, budget_tokens) - fixed_tokens)
+
+
+def build_prompt(render, sections, max_new_tokens=256, budget_tokens=None):
+    """
+    예산 안에 맞춘 섹션 텍스트로 render(**{섹션 이름: 텍스트})를 호출한 프롬프트
+    render: 섹션 이름을 키워드 인자로 받는 프롬프트 함수 (qwen_prompt_* 등)
+    budget_tokens: 입력 토큰 상한 (기본 GENIE_PROMPT_BUDGET_TOKENS), 생성 토큰과 합쳐 컨텍스트를 넘지 않게 줄임
+    """
+    counter = get_token_counter()
+    budget = prompt_budget_tokens(max_new_tokens, budget_tokens)
+    fixed_tokens = counter.count(render(**{item["name"]: "" for item in sections}))
+    available = max(0, budget - fixed_tokens)
+
+    ordered = sorted(sections, key=lambda item: item["priority"])
+    needed = {item["name"]: counter.count(item["text"]) for item in ordered}
+    allocation = {}
+
+    # 1) 최소 토큰 보장 → 2) 남은 예산을 우선순위 순으로 채움
+    for item in ordered:
+        grant = min(needed[item["name"]], item["min_tokens"], available)
+        allocation[item["name"]] = grant
+        available -= grant
+    for item in ordered:
+        grant = min(needed[item["name"]] - allocation[item["name"]], available)
+        allocation[item["name"]] += grant
+        available -= grant
+
+    values = {}
+    truncated = []
+    for item in ordered:
+        name = item["name"]
+        if allocation[name] >= needed[name]:
+            values[name] = item["text"]
+            continue
+        mark_tokens = counter.count(TRUNCATION_MARK)
+        piece = counter.truncate(item["text"], allocation[name] - mark_tokens, item["keep"])
+        if piece:
+            values[name] = piece + TRUNCATION_MARK if item["keep"] == "head" else TRUNCATION_MARK.strip() + " " + piece
+        else:
+            values[name] = ""
+        truncated.append(f"{name} {needed[name]}→{allocation[name]}")
+
+    if truncated:
+        print(f"[📏 프롬프트 예산] {budget}토큰 (고정 {fixed_tokens}) - 잘린 섹션: {', '.join(truncated)}")
+    return render(**values)
+
+
+def fit_text(text, max_tokens, keep="head"):
+    """단일 텍스트를 토큰 수 기준으로 자르기 (프롬프트 밖에서 쓰는 입력용)"""
+    return get_token_counter().truncate((text or "").strip(), max_tokens, keep)
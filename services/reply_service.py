@@ -1,8 +1,16 @@
-from services.genie_qwen import genie_reply
+import time
+from services.genie_qwen import genie_reply, genie_reply_stream
+from services.prompt_budget import build_prompt, section, fit_text
+from services.llm_streaming import stream_events, stream_hf_generate
 
 class ReplyService:
     """AI 답장 생성 전용 서비스"""
     
+    REPLY_PROMPT_BUDGET_TOKENS = 1536  # 답장 프롬프트 입력 토큰 상한 (원본 메일 본문이 먼저 잘림)
+    REPLY_OUTPUT_TOKENS = 256          # 답장 생성에 남겨 둘 토큰 수
+    TONE_SAMPLE_TOKENS = 80            # 톤 분석용 이전 메일 1개당 토큰 수
+    HF_REPLY_MAX_NEW_TOKENS = 200      # HF 경로 답장 생성 토큰 수
+    
     def __init__(self, ai_models):
         """ReplyService 초기화"""
         self.ai_models = ai_models
@@ -18,11 +26,8 @@ class ReplyService:
             if not self.ai_models.load_qwen_model():
                 return {'error': 'Qwen 모델을 로드할 수 없습니다.'}, 500
             
-            # 이전 메일 기록에서 톤 분석
-            tone_analysis = self._analyze_previous_email_tone(current_user_email, sender)
-            
-            # 프롬프트 생성 (사용자 의도 + 톤 분석 포함)
-            user_prompt = self._build_ai_reply_prompt_for_qwen(sender, subject, body, user_intent, tone_analysis)
+            # 프롬프트 생성 (이전 메일 톤 분석 + 사용자 의도 포함)
+            user_prompt = self._prepare_reply_prompt(sender, subject, body, current_user_email, user_intent)
 
             try:
                 generated_text = genie_reply(user_prompt)
@@ -41,9 +46,7 @@ class ReplyService:
                         ai_reply = generated_text.strip()
                 
                 # 불필요한 부분 정리
-                ai_reply = ai_reply.strip()
-                if ai_reply.startswith('"') and ai_reply.endswith('"'):
-                    ai_reply = ai_reply[1:-1]
+                ai_reply = self._clean_reply(ai_reply)
 
                 print(f"[프롬포트]{ai_reply}")
                 
@@ -61,7 +64,7 @@ class ReplyService:
                 with torch.no_grad():
                     outputs = self.ai_models.qwen_model.generate(
                         **inputs,
-                        max_new_tokens=200,
+                        max_new_tokens=self.HF_REPLY_MAX_NEW_TOKENS,
                         temperature=0.7,
                         do_sample=True,
                         top_p=0.9,
@@ -79,9 +82,7 @@ class ReplyService:
                     ai_reply = generated_text[len(user_prompt):].strip()
                 
                 # 불필요한 부분 정리
-                ai_reply = ai_reply.strip()
-                if ai_reply.startswith('"') and ai_reply.endswith('"'):
-                    ai_reply = ai_reply[1:-1]
+                ai_reply = self._clean_reply(ai_reply)
                 
                 print(f"[✅ AI 답장 생성 완료] User: {current_user_email}, 길이: {len(ai_reply)}자")
             
@@ -95,6 +96,53 @@ class ReplyService:
             print(f"[❗AI 답장 생성 실패] {str(e)}")
             return {'error': f'AI 답장 생성 실패: {str(e)}'}, 500
     
+    def stream_ai_reply(self, sender, subject, body, current_user_email, user_intent=""):
+        """
+        AI 답장 스트리밍 → (SSE 이벤트 제너레이터, 200) 또는 (오류 dict, 상태 코드)
+        Genie stdout / HF TextIteratorStreamer 순으로 생성되는 대로 전달, done 이벤트에 정리된 ai_reply와 TTFT 포함
+        """
+        try:
+            started_at = time.perf_counter()
+            intent_log = f", 의도: {user_intent}" if user_intent else ""
+            print(f"[🤖 AI 답장 스트리밍 요청] User: {current_user_email}, From: {sender}{intent_log}")
+            
+            if not self.ai_models.load_qwen_model():
+                return {'error': 'Qwen 모델을 로드할 수 없습니다.'}, 500
+            
+            # 톤 분석(DB 조회)과 프롬프트 생성은 요청 컨텍스트 안에서 먼저 처리
+            user_prompt = self._prepare_reply_prompt(sender, subject, body, current_user_email, user_intent)
+            
+            events = stream_events(
+                'ai_reply',
+                [
+                    ('genie', lambda: genie_reply_stream(user_prompt)),
+                    ('hf', lambda: stream_hf_generate(
+                        self.ai_models, user_prompt, self.HF_REPLY_MAX_NEW_TOKENS,
+                        temperature=0.7, do_sample=True, top_p=0.9
+                    )),
+                ],
+                finalize=lambda text: {'ai_reply': self._clean_reply(text)},
+                started_at=started_at
+            )
+            return events, 200
+            
+        except Exception as e:
+            print(f"[❗AI 답장 스트리밍 실패] {str(e)}")
+            return {'error': f'AI 답장 생성 실패: {str(e)}'}, 500
+    
+    def _prepare_reply_prompt(self, sender, subject, body, current_user_email, user_intent=""):
+        """이전 메일 톤 분석 → 답장 프롬프트"""
+        tone_analysis = self._analyze_previous_email_tone(current_user_email, sender)
+        return self._build_ai_reply_prompt_for_qwen(sender, subject, body, user_intent, tone_analysis)
+    
+    @staticmethod
+    def _clean_reply(ai_reply):
+        """답장 앞뒤 공백/따옴표 정리"""
+        ai_reply = ai_reply.strip()
+        if ai_reply.startswith('"') and ai_reply.endswith('"'):
+            ai_reply = ai_reply[1:-1]
+        return ai_reply
+    
     def _analyze_previous_email_tone(self, current_user_email, sender_email):
         """이전 메일 기록에서 톤 분석"""
         try:
@@ -116,7 +164,7 @@ class ReplyService:
             sample_texts = []
             for mail in previous_mails:
                 if mail.body and len(mail.body.strip()) > 20:
-                    clean_body = mail.body.replace('\n', ' ').strip()[:200]
+                    clean_body = fit_text(mail.body.replace('\n', ' '), self.TONE_SAMPLE_TOKENS)
                     sample_texts.append(clean_body)
             
             if not sample_texts:
@@ -228,8 +276,9 @@ class ReplyService:
         else:
             tone_instruction = "Use a polite and formal tone."
         
-        # 프롬프트 구성
-        prompt = f"""<|im_start|>system
+        # 프롬프트 구성 (원본 메일 본문은 토큰 예산 안에서만 포함)
+        def render(sender, subject, user_intent, body):
+            return f"""<|im_start|>system
 You are a professional email assistant. Write a proper email reply {language_instruction}.
 
 Guidelines:
@@ -255,4 +304,14 @@ Please write a reply email body:
 <|im_start|>assistant
 """
         
-        return prompt
\ No newline at end of file
+        return build_prompt(
+            render,
+            [
+                section("sender", sender, priority=0),
+                section("subject", subject, priority=0),
+                section("user_intent", user_intent, priority=0),
+                section("body", body, priority=1),
+            ],
+            max_new_tokens=self.REPLY_OUTPUT_TOKENS,
+            budget_tokens=self.REPLY_PROMPT_BUDGET_TOKENS
+        )
\ No newline at end of file
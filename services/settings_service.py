@@ -12,7 +12,7 @@ class SettingsService:
     def __init__(self):
         self.categories = {
             'GENERAL': ['READ', 'WRITE', 'THEME'],
-            'MY_EMAIL': ['SIGNATURE_MANAGEMENT']
+            'MY_EMAIL': ['SIGNATURE_MANAGEMENT', 'ATTACHMENT_OCR', 'ATTACHMENT_ROUTING']
         }
     
     def get_all_settings(self, user_email):
@@ -0,0 +1,264 @@
+"""
+메일 스레드 구성 + 스레드별 누적 요약
+
+Message-ID / In-Reply-To / References 헤더로 메일을 스레드에 묶고,
+스레드 요약은 매번 전체 대화를 다시 요약하지 않고 "이전 요약 + 새 메일의 새 내용"만 LLM에 넣어 갱신합니다.
+- 스레드 ID: 이미 인덱스에 있는 조상 메일의 스레드 → 없으면 References 첫 메일(스레드 시작 메일)의 mail_id
+- mail_id는 수집 시와 같은 규칙(Message-ID 해시)이라 시작 메일이 나중에 수집돼도 같은 스레드로 모임
+- 누적 요약은 수집 1회당 스레드별 LLM 1회 (메일이 1개뿐인 스레드는 메일 요약을 그대로 사용)
+- 트랜잭션: 인덱스 행 커밋 → 트랜잭션 밖에서 LLM 호출 → 짧은 트랜잭션으로 요약 저장
+"""
+import re
+import hashlib
+from datetime import datetime
+from sqlalchemy import func
+from models.db import db
+from models.tables import MailThread, MailThreadMessage
+from services.genie_qwen import genie_update_thread_summary, cut_words
+
+MESSAGE_ID_PATTERN = re.compile(r'<([^<>\s]+)>')
+# 제목 접두어 (Re: / Fwd: / 답장: / 전달: 등, 여러 번 붙은 경우 포함)
+SUBJECT_PREFIX = re.compile(r'^\s*((re|fw|fwd|aw|답장|회신|전달)\s*(\[\d+\])?\s*:\s*)+', re.IGNORECASE)
+
+
+def mail_id_from_message_id(clean_id):
+    """Message-ID(< > 제거) → mail_id (16자리 SHA-256 해시)"""
+    return hashlib.sha256(clean_id.encode()).hexdigest()[:16]
+
+
+def _message_ids(value):
+    """헤더 값 → Message-ID 목록 (< > 없이 한 개만 적힌 경우 포함)"""
+    value = str(value or '').strip()
+    found = MESSAGE_ID_PATTERN.findall(value)
+    if not found and value and ' ' not in value:
+        found = [value.strip('<>')]
+    return found
+
+
+def parse_thread_headers(msg):
+    """메일 → {'in_reply_to': Message-ID, 'references': [Message-ID, ...]} (오래된 순)"""
+    in_reply_to = _message_ids(msg.get('In-Reply-To'))
+    return {
+        'in_reply_to': in_reply_to[0] if in_reply_to else '',
+        'references': _message_ids(msg.get('References'))
+    }
+
+
+def normalize_subject(subject):
+    """Re:/Fwd: 등 접두어를 뗀 스레드 제목"""
+    return SUBJECT_PREFIX.sub('', subject or '').strip()
+
+
+class ThreadService:
+    """메일 스레드 인덱스 관리 + 누적 요약 갱신"""
+
+    def __init__(self, config):
+        self.summary_max_words = config.THREAD_SUMMARY_MAX_WORDS
+        self.delta_max_chars = config.THREAD_DELTA_MAX_CHARS
+
+    @staticmethod
+    def thread_entry(email_data, summary=''):
+        """수집한 메일 → 스레드 인덱싱 입력 (조상 mail_id는 가까운 순)"""
+        headers = email_data.get('thread_headers') or {}
+        references = [mail_id_from_message_id(ref) for ref in headers.get('references', [])]
+        parent = mail_id_from_message_id(headers['in_reply_to']) if headers.get('in_reply_to') else None
+
+        ancestors = ([parent] if parent else []) + [ref for ref in reversed(references) if ref != parent]
+        return {
+            'mail_id': str(email_data['id']),
+            'subject': email_data.get('subject', ''),
+            'from': email_data.get('from', ''),
+            'date_obj': email_data.get('date_obj'),
+            'parent': parent,
+            'ancestors': ancestors,
+            'root': references[0] if references else parent,
+            'new_content': email_data.get('new_content') or email_data.get('body') or '',
+            'summary': summary
+        }
+
+    def index_messages(self, user_email, entries, update_summary=True):
+        """
+        새로 저장한 메일을 스레드 인덱스에 추가하고 스레드 정보/누적 요약 갱신 → 갱신한 스레드 수
+        entries: thread_entry() 목록 (메일 행이 먼저 저장돼 있어야 함)
+        """
+        if not entries:
+            return 0
+
+        entries = sorted(entries, key=lambda entry: entry['date_obj'] or datetime.min)
+        known = MailThreadMessage.thread_ids_for(
+            user_email, {ancestor for entry in entries for ancestor in entry['ancestors']}
+        )
+
+        # 오래된 메일부터 스레드 결정 (같은 수집분 안의 답장도 앞 메일의 스레드를 따름)
+        entries_by_thread = {}
+        for entry in entries:
+            thread_id = next(
+                (known[ancestor] for ancestor in entry['ancestors'] if ancestor in known),
+                entry['root'] or entry['mail_id']
+            )
+            known[entry['mail_id']] = thread_id
+            db.session.merge(MailThreadMessage(
+                user_email=user_email,
+                mail_id=entry['mail_id'],
+                thread_id=thread_id,
+                parent_mail_id=entry['parent']
+            ))
+            entries_by_thread.setdefault(thread_id, []).append(entry)
+        db.session.flush()
+
+        thread_ids = list(entries_by_thread)
+        threads = {
+            thread.thread_id: thread
+            for thread in MailThread.query.filter(MailThread.user_email == user_email, MailThread.thread_id.in_(thread_ids))
+        }
+        message_counts = dict(
+            db.session.query(MailThreadMessage.thread_id, func.count())
+            .filter(MailThreadMessage.user_email == user_email, MailThreadMessage.thread_id.in_(thread_ids))
+            .group_by(MailThreadMessage.thread_id)
+        )
+
+        plans = []
+        for thread_id, new_entries in entries_by_thread.items():
+            thread = threads.get(thread_id)
+            if thread is None:
+                thread = MailThread(user_email=user_email, thread_id=thread_id, summarized_count=0)
+                db.session.add(thread)
+
+            thread.subject = thread.subject or normalize_subject(new_entries[0]['subject'])
+            thread.message_count = message_counts.get(thread_id, len(new_entries))
+            latest = max((entry['date_obj'] for entry in new_entries if entry['date_obj']), default=None)
+            if latest and (thread.last_date is None or latest > thread.last_date):
+                thread.last_date = latest
+
+            if update_summary:
+                plan = self._plan_summary(thread, new_entries)
+                if plan:
+                    plans.append(plan)
+
+        # 인덱스 행은 먼저 커밋 → LLM 호출(스레드당 최대 GENIE_TIMEOUT_SEC) 동안 행/FK 잠금을 잡지 않음
+        db.session.commit()
+
+        updates = {}
+        for plan in plans:
+            updated = self._compute_summary(plan)
+            if updated:
+                updates[plan['thread_id']] = (plan, updated)
+        summarized_threads = self._save_summaries(user_email, updates)
+
+        print(f"[🧵 스레드] 메일 {len(entries)}개 → 스레드 {len(thread_ids)}개 (누적 요약 LLM 갱신: {summarized_threads}개)")
+        return len(thread_ids)
+
+    def _plan_summary(self, thread, new_entries):
+        """
+        요약 갱신 준비 (트랜잭션 안, LLM 호출 없음) → LLM에 넣을 값 dict 또는 None
+        첫 메일은 메일 요약을 스레드 요약의 시작으로 바로 사용
+        """
+        previous = thread.summary
+        pending = new_entries
+        if not previous:
+            previous = self._entry_summary(pending[0])
+            thread.summary = previous
+            thread.summarized_count = 1
+            pending = pending[1:]
+        if not pending:
+            return None
+
+        return {
+            'thread_id': thread.thread_id,
+            'subject': thread.subject or '',
+            'previous': previous,
+            'base_count': thread.summarized_count or 0,
+            'message_count': len(pending),
+            'deltas': "\n\n".join(
+                f"[{entry['from']} | {entry['date_obj'] or ''}]\n{self._entry_delta(entry)}" for entry in pending
+            )
+        }
+
+    def _compute_summary(self, plan):
+        """이전 요약 + 새 메일 내용 → 스레드 요약 (트랜잭션 밖에서 LLM 호출, 실패 시 None)"""
+        try:
+            return genie_update_thread_summary(plan['previous'], plan['deltas'], plan['subject'], self.summary_max_words)
+        except Exception as e:
+            print(f"[⚠️ 스레드 요약 갱신 실패] {plan['thread_id']}: {e}")
+            return None
+
+    def _save_summaries(self, user_email, updates):
+        """
+        LLM 결과를 짧은 두 번째 트랜잭션으로 저장 → 저장한 스레드 수
+        LLM 호출 중 다른 수집이 같은 스레드 요약을 먼저 갱신했으면(요약한 메일 수 변경) 덮어쓰지 않음
+        """
+        if not updates:
+            return 0
+        saved = 0
+        try:
+            threads = MailThread.query.filter(
+                MailThread.user_email == user_email, MailThread.thread_id.in_(list(updates))
+            ).with_for_update().all()
+            for thread in threads:
+                plan, summary = updates[thread.thread_id]
+                if (thread.summarized_count or 0) != plan['base_count']:
+                    print(f"[⚠️ 스레드 요약] {thread.thread_id}: 다른 요청이 먼저 갱신 - 이번 결과 생략")
+                    continue
+                thread.summary = summary
+                thread.summarized_count = plan['base_count'] + plan['message_count']
+                saved += 1
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"[❗스레드 요약 저장 오류] {str(e)}")
+            return 0
+        return saved
+
+    def _entry_summary(self, entry):
+        """메일 요약 (요약이 없거나 실패 표시면 새 내용 앞부분)"""
+        summary = (entry['summary'] or '').strip()
+        if summary and not summary.startswith('('):
+            return summary
+        return cut_words(entry['new_content'].strip(), self.summary_max_words)
+
+    def _entry_delta(self, entry):
+        """누적 요약에 넣을 새 메일 내용 (길면 메일 요약으로 대체)"""
+        content = entry['new_content'].strip()
+        if len(content) <= self.delta_max_chars:
+            return content
+        return self._entry_summary(entry) if entry['summary'] else content[:self.delta_max_chars]
+
+    def group_by_thread(self, user_email, emails):
+        """
+        응답용 메일 목록 → 스레드별 묶음 (목록 순서 유지, 스레드 정보는 쿼리 2회로 조회)
+        인덱스에 없는 메일(스레드 기능 이전에 저장)은 메일 1개짜리 스레드로 취급
+        """
+        thread_of = MailThreadMessage.thread_ids_for(user_email, [str(mail['id']) for mail in emails])
+        threads = {}
+        if thread_of:
+            threads = {
+                thread.thread_id: thread
+                for thread in MailThread.query.filter(
+                    MailThread.user_email == user_email, MailThread.thread_id.in_(set(thread_of.values()))
+                )
+            }
+
+        groups = {}
+        for mail in emails:
+            thread_id = thread_of.get(str(mail['id']), str(mail['id']))
+            if thread_id not in groups:
+                thread = threads.get(thread_id)
+                groups[thread_id] = thread.to_dict() if thread else {
+                    'thread_id': thread_id,
+                    'subject': normalize_subject(mail.get('subject')),
+                    'message_count': 1,
+                    'last_date': mail.get('date'),
+                    'summary': mail.get('summary') or '',
+                    'summarized_count': 0
+                }
+                groups[thread_id]['emails'] = []
+            groups[thread_id]['emails'].append(mail)
+        return list(groups.values())
+
+    def get_thread_mail_ids(self, user_email, thread_id):
+        """스레드에 속한 mail_id 목록"""
+        return [
+            mail_id for (mail_id,) in db.session.query(MailThreadMessage.mail_id).filter_by(
+                user_email=user_email, thread_id=thread_id
+            )
+        ]
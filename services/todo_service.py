@@ -99,6 +99,42 @@ class TodoService:
                 'error': str(e)
             }
     
+    def build_todos_from_items(self, items, email_subject, email_from, email_date):
+        """통합 분석(LLM)이 돌려준 할일 항목 → extract_todos_from_email과 같은 형식의 결과"""
+        base_timestamp = int(time.time() * 1000)
+        descriptions = {
+            'meeting': f"{email_from}님과의 회의",
+            'deadline': f"{email_from}님이 요청한 마감 업무",
+            'task': f"{email_from}님이 요청한 업무",
+            'event': f"{email_from}님이 알린 일정"
+        }
+        todos = [{
+            'id': base_timestamp + index,
+            'type': item['type'],
+            'title': item['title'],
+            'description': descriptions.get(item['type'], ''),
+            'date': item.get('date'),
+            'time': item.get('time'),
+            'priority': 'medium',
+            'status': 'pending',
+            'editable_date': True,
+            'source_email': {
+                'from': email_from,
+                'subject': email_subject,
+                'date': email_date,
+                'type': 'mail_analysis'
+            }
+        } for index, item in enumerate(items)]
+
+        todos = self._deduplicate_todos(todos)
+        todos = self._assign_priority(todos)
+        return {
+            'success': True,
+            'todos': todos,
+            'total_count': len(todos),
+            'extraction_method': 'mail_analysis'
+        }
+    
     def _extract_meetings(self, text, sender, email_date, email_subject, base_timestamp, counter_start):
         """회의/미팅 추출"""
         meetings = []
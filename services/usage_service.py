@@ -9,28 +9,38 @@ from models.db import db
 class UsageService:
     """사용량 모니터링 서비스"""
     
+    @staticmethod
+    def _mail_size_expr():
+        """메일 한 건의 저장 크기(바이트) SQL 식 - MySQL LENGTH()는 바이트 단위"""
+        return (
+            func.coalesce(func.length(Mail.body), 0) +
+            func.coalesce(func.length(Mail.subject), 0) +
+            func.coalesce(func.length(Mail.raw_message), 0)
+        )
+    
+    @staticmethod
+    def _format_day(day_value):
+        """DATE() 결과를 'YYYY-MM-DD' 문자열로 변환 (DB 드라이버별 반환 타입 차이 흡수)"""
+        if day_value is None:
+            return None
+        if isinstance(day_value, str):
+            return day_value[:10]
+        return day_value.strftime('%Y-%m-%d')
+    
     @staticmethod
     def calculate_mail_storage_usage(user_email):
-        """메일 저장소 사용량 계산"""
+        """메일 저장소 사용량 계산 (SQL 집계, 행 로딩 없음)"""
         try:
             print(f"[📊 사용량] {user_email} 사용자의 메일 저장소 사용량 계산")
             
-            # 사용자의 모든 메일 조회
-            mails = Mail.query.filter_by(user_email=user_email).all()
-            
-            total_size_bytes = 0
-            total_count = 0
+            # COUNT / SUM(LENGTH(...))를 DB에서 한 번에 계산
+            total_count, total_size_bytes = db.session.query(
+                func.count(Mail.mail_id),
+                func.coalesce(func.sum(UsageService._mail_size_expr()), 0)
+            ).filter(Mail.user_email == user_email).one()
             
-            for mail in mails:
-                # 메일 본문 크기 계산
-                if mail.body:
-                    total_size_bytes += len(mail.body.encode('utf-8'))
-                if mail.subject:
-                    total_size_bytes += len(mail.subject.encode('utf-8'))
-                if mail.raw_message:
-                    total_size_bytes += len(mail.raw_message.encode('utf-8'))
-                
-                total_count += 1
+            total_count = int(total_count or 0)
+            total_size_bytes = int(total_size_bytes or 0)
             
             # MB로 변환
             total_size_mb = total_size_bytes / (1024 * 1024)
@@ -58,20 +68,24 @@ class UsageService:
             if not storage_result['success']:
                 return storage_result
             
-            # 최근 30일 메일 통계
+            # 최근 30일 분류별 통계 (GROUP BY classification)
             thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-            recent_mails = Mail.query.filter(
+            classification_rows = db.session.query(
+                Mail.classification,
+                func.count(Mail.mail_id)
+            ).filter(
                 and_(
                     Mail.user_email == user_email,
                     Mail.date >= thirty_days_ago
                 )
-            ).all()
+            ).group_by(Mail.classification).all()
             
-            # 분류별 통계
             classification_data = {}
-            for mail in recent_mails:
-                classification = mail.classification or 'unknown'
-                classification_data[classification] = classification_data.get(classification, 0) + 1
+            thirty_day_count = 0
+            for classification, count in classification_rows:
+                classification = classification or 'unknown'
+                classification_data[classification] = classification_data.get(classification, 0) + int(count)
+                thirty_day_count += int(count)
             
             # 사용량 설정 가져오기
             settings_result = UserSettings.get_or_create(user_email, 'MY_EMAIL', 'USAGE')
@@ -96,7 +110,7 @@ class UsageService:
                     'remaining_mb': max(0, allocated_quota_mb - storage_result['total_size_mb'])
                 },
                 'recent_activity': {
-                    'thirty_day_count': len(recent_mails),
+                    'thirty_day_count': thirty_day_count,
                     'classification_breakdown': classification_data
                 }
             }
@@ -106,7 +120,7 @@ class UsageService:
     
     @staticmethod
     def get_daily_mail_stats(user_email, days=7):
-        """일별 메일 통계 가져오기"""
+        """일별 메일 통계 가져오기 (GROUP BY DATE(date))"""
         try:
             print(f"[📊 사용량] {user_email} 사용자의 최근 {days}일 일별 통계")
             
@@ -119,24 +133,29 @@ class UsageService:
                 date_str = current_date.strftime('%Y-%m-%d')
                 daily_stats[date_str] = 0
             
-            # 기간 내 메일들 조회
-            mails = Mail.query.filter(
+            # 기간 내 메일 수를 날짜 단위로 DB에서 집계
+            day_column = func.date(Mail.date)
+            daily_rows = db.session.query(
+                day_column,
+                func.count(Mail.mail_id)
+            ).filter(
                 and_(
                     Mail.user_email == user_email,
                     Mail.date >= start_date
                 )
-            ).all()
+            ).group_by(day_column).all()
             
-            # 날짜별로 카운트
-            for mail in mails:
-                date_str = mail.date.strftime('%Y-%m-%d')
+            total_period_mails = 0
+            for day_value, count in daily_rows:
+                total_period_mails += int(count)
+                date_str = UsageService._format_day(day_value)
                 if date_str in daily_stats:
-                    daily_stats[date_str] += 1
+                    daily_stats[date_str] += int(count)
             
             return {
                 'success': True,
                 'daily_stats': daily_stats,
-                'total_period_mails': len(mails)
+                'total_period_mails': total_period_mails
             }
         except Exception as e:
             print(f"[❌ 사용량] 일별 통계 계산 실패: {e}")
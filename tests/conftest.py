@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 저장소 루트를 import 경로에 추가 (services.*, models.* 모듈 import용)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
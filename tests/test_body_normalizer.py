@@ -0,0 +1,81 @@
+"""services.body_normalizer 서명 제거 회귀 테스트"""
+from services.body_normalizer import normalize_body
+
+
+def new_content(text):
+    return normalize_body(text)['new_content']
+
+
+def test_keeps_english_requests_after_closing_line():
+    body = "Hi team,\n\nThanks!\nPlease send the Q3 report by Friday.\nAlso book the room for 3pm."
+    assert new_content(body) == body
+
+
+def test_keeps_korean_requests_after_closing_line():
+    body = "안녕하세요.\n감사합니다.\n내일까지 보고서 제출 부탁드립니다.\n회의는 3시입니다."
+    assert new_content(body) == body
+
+
+def test_keeps_sentence_with_contact_info_after_closing_line():
+    body = "Hi,\n\nThanks.\nPlease forward the invoice to billing@example.com today."
+    assert new_content(body) == body
+
+
+def test_strips_english_contact_signature():
+    body = (
+        "Hi team,\n\nThe meeting moved to Thursday.\n\nBest regards,\nJohn Smith\n"
+        "Senior Engineer | Acme Inc.\n+1 555-123-4567\njohn.smith@acme.com"
+    )
+    result = normalize_body(body)
+    assert result['new_content'] == "Hi team,\n\nThe meeting moved to Thursday.\n\nBest regards,"
+    assert result['stats']['signature'] is True
+
+
+def test_strips_korean_contact_signature():
+    body = "안녕하세요.\n회의 자료 공유드립니다.\n감사합니다.\n홍길동\n개발팀 과장\n010-1234-5678"
+    assert new_content(body) == "안녕하세요.\n회의 자료 공유드립니다.\n감사합니다."
+
+
+def test_strips_short_name_only_signature():
+    body = "See attached.\n\nCheers,\nJane"
+    assert new_content(body) == "See attached.\n\nCheers,"
+
+
+def test_keeps_long_name_like_block():
+    body = "Notes below.\n\nThanks,\nAlpha\nBravo\nCharlie\nDelta"
+    assert new_content(body) == body
+
+
+def test_keeps_confidential_request_in_tail():
+    body = "Hi,\n\nThe draft is attached.\n\nPlease keep this confidential until Monday."
+    assert new_content(body) == body
+
+
+def test_keeps_intended_only_for_request_in_tail():
+    body = "Hi,\n\nHere is the deck.\n\nThis deck is intended only for the board, please review it by Friday."
+    assert new_content(body) == body
+
+
+def test_keeps_korean_confidential_request_in_tail():
+    body = "안녕하세요.\n\n자료 첨부합니다.\n\n기밀 자료이니 금요일까지 검토 부탁드립니다."
+    assert new_content(body) == body
+
+
+def test_strips_legal_disclaimer_footer():
+    body = (
+        "Hi,\n\nThe meeting moved to Thursday.\n\n"
+        "This message and any attachments are confidential and may be privileged. If you are not the "
+        "intended recipient, notify the sender and delete this message."
+    )
+    result = normalize_body(body)
+    assert result['new_content'] == "Hi,\n\nThe meeting moved to Thursday."
+    assert result['stats']['footer_paragraphs'] == 1
+
+
+def test_strips_single_keyword_boilerplate_in_tail():
+    body = (
+        "안녕하세요.\n\n회의록 공유드립니다.\n\n"
+        "본 메일은 발신 전용 주소에서 발송되었으며 회신하셔도 답변을 받으실 수 없습니다. "
+        "메일 수신과 관련된 문의는 고객센터 홈페이지의 문의 게시판을 이용하시기 바랍니다."
+    )
+    assert new_content(body) == "안녕하세요.\n\n회의록 공유드립니다."